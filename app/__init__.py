@@ -20,5 +20,17 @@ def create_app(config_class=Config):
         from .routes import main_bp  # Import routes
         app.register_blueprint(main_bp)
 
+    # Browsers are started lazily; run.py pre-warms them in the serving process
+    from .driver_pool import init_driver_pool
+    init_driver_pool(app)
+
+    # Progress lives in a shared store so any worker process can report it
+    from .progress_store import init_progress_store
+    init_progress_store(app)
+
+    # Imports run on a fixed pool of workers behind a bounded queue
+    from .task_manager import init_import_scheduler
+    init_import_scheduler(app)
+
     app.logger.info("Flask app created and configured.")
     return app
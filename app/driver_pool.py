@@ -0,0 +1,161 @@
+"""
+Process-wide pool of Selenium WebDrivers shared by import tasks.
+Starting Chrome takes several seconds, so instead of launching and quitting a
+browser for every import, drivers are kept warm, leased to one scraping session
+at a time, reset when returned and recycled after a number of uses or a crash.
+"""
+import atexit
+import threading
+import logging
+import os
+import sys
+from contextlib import contextmanager
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+import scraper
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class DriverPool:
+    """A bounded pool of headless browsers; at most `size` drivers exist at once."""
+
+    def __init__(self, size=2, max_uses=20, acquire_timeout=300, headless=True, lean=True,
+                 blocked_resources=scraper.BLOCKED_RESOURCES):
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self.headless = headless
+        self.lean = lean
+        self.blocked_resources = blocked_resources
+        self._available = threading.Condition()
+        self._idle = []  # (driver, use_count) pairs ready to be leased
+        self._live = 0  # idle + leased drivers
+        self._closed = False
+
+    def _create_driver(self):
+        logger.info("Starting a new pooled browser.")
+        try:
+            return scraper.setup_driver(headless=self.headless, lean=self.lean, blocked_resources=self.blocked_resources)
+        except Exception:
+            with self._available:
+                self._live -= 1
+                self._available.notify()
+            raise
+
+    def prewarm(self):
+        """Starts browsers until the pool holds `size` drivers."""
+        while True:
+            with self._available:
+                if self._closed or self._live >= self.size:
+                    return
+                self._live += 1
+            try:
+                driver = self._create_driver()
+            except Exception as e:
+                logger.error(f"Could not pre-warm browser: {e}")
+                return
+            with self._available:
+                self._idle.append((driver, 0))
+                self._available.notify()
+
+    def prewarm_in_background(self):
+        """Pre-warms the pool without blocking the caller."""
+        threading.Thread(target=self.prewarm, name="driver-pool-prewarm", daemon=True).start()
+
+    def acquire(self):
+        """
+        Leases a driver, waiting up to acquire_timeout seconds if all are in use.
+        Returns (driver, use_count). Raises RuntimeError if none became available.
+        """
+        with self._available:
+            ready = self._available.wait_for(lambda: self._idle or self._live < self.size, timeout=self.acquire_timeout)
+            if not ready:
+                raise RuntimeError("No browser available: all pooled browsers are busy.")
+            if self._idle:
+                return self._idle.pop()
+            self._live += 1
+        return self._create_driver(), 0
+
+    def release(self, driver, use_count, discard=False):
+        """Returns a leased driver, resetting it for reuse or quitting it if it is worn out or broken."""
+        use_count += 1
+        if not discard and use_count < self.max_uses and not self._closed:
+            try:
+                self._reset(driver)
+                with self._available:
+                    self._idle.append((driver, use_count))
+                    self._available.notify()
+                return
+            except Exception as e:
+                logger.warning(f"Could not reset pooled browser, discarding it: {e}")
+        self._quit(driver)
+        with self._available:
+            self._live -= 1
+            self._available.notify()
+
+    @staticmethod
+    def _reset(driver):
+        """Clears the previous user's session so the next lease starts logged out."""
+        driver.switch_to.default_content()
+        try:
+            # Clears cookies for every domain, not just the current page's
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception:
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            logger.info("Closing pooled browser.")
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error while closing pooled browser: {e}")
+
+    @contextmanager
+    def lease(self):
+        """
+        Context manager yielding a pooled driver. Drivers that crashed while leased
+        fail their reset on return and are replaced.
+        """
+        driver, use_count = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver, use_count)
+
+    def shutdown(self):
+        """Quits every idle driver; leased drivers are quit when they are returned."""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+        for driver, _ in idle:
+            self._quit(driver)
+
+
+def init_driver_pool(app):
+    """Creates the process-wide driver pool from the app configuration."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(
+                size=app.config.get("DRIVER_POOL_SIZE", 4),
+                max_uses=app.config.get("DRIVER_POOL_MAX_USES", 20),
+                headless=app.config.get("SCRAPER_HEADLESS", True),
+                lean=app.config.get("SCRAPER_LEAN_DRIVER", True),
+                blocked_resources=app.config.get("SCRAPER_BLOCK_RESOURCES", scraper.BLOCKED_RESOURCES),
+            )
+            atexit.register(_pool.shutdown)
+    return _pool
+
+
+def get_driver_pool():
+    """Returns the process-wide driver pool (see init_driver_pool)."""
+    return _pool
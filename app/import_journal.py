@@ -0,0 +1,94 @@
+"""
+Checkpoint journal that lets a failed or cancelled import resume where it stopped.
+
+Every import (MacID, date range and target calendar) appends to its own JSON Lines
+file in CHECKPOINT_DIR:
+    {"type": "week", "monday": "2025-01-13", "events": [...]}     a fully scraped week
+    {"type": "created", "key": "<sync key>", "id": "<event id>"}   an event inserted in insert mode
+A retry of the same import skips the weeks already scraped and, in insert mode, the
+events already created. The journal is deleted once the import completes. Passwords
+are never written to it.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJournal:
+    """Append-only checkpoint file for one import."""
+
+    def __init__(self, path, max_age=24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.weeks = {}  # Monday (datetime) -> that week's scraped events
+        self.created = {}  # event sync key -> created calendar event id
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def import_key(macid, start_date, end_date, calendar_id):
+        """Identifies an import so that a retry of the same import finds its journal."""
+        raw = "|".join([macid.strip().lower(), start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), calendar_id])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+    @classmethod
+    def open(cls, directory, macid, start_date, end_date, calendar_id, max_age=24 * 3600):
+        """Opens (and loads, if present) the journal for an import."""
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        journal = cls(os.path.join(directory, f"{cls.import_key(macid, start_date, end_date, calendar_id)}.jsonl"), max_age)
+        journal.load()
+        return journal
+
+    def load(self):
+        """Reads checkpoints back, ignoring a journal older than max_age (the schedule may have changed)."""
+        if not os.path.exists(self.path):
+            return
+        if time.time() - os.path.getmtime(self.path) > self.max_age:
+            logger.info(f"Discarding stale import journal {self.path}.")
+            self.discard()
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves at most one partial line at the end
+                    logger.warning(f"Ignoring truncated record in import journal {self.path}.")
+                    break
+                if record.get("type") == "week" and isinstance(record.get("events"), list):
+                    self.weeks[datetime.strptime(record["monday"], "%Y-%m-%d")] = record["events"]
+                elif record.get("type") == "created":
+                    self.created[record["key"]] = record["id"]
+        logger.info(f"Loaded import journal: {len(self.weeks)} weeks scraped, {len(self.created)} events created.")
+
+    def _append(self, record):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record_week(self, monday, events):
+        """Checkpoints a scraped week. A week that failed to scrape (None) is not recorded, so a retry scrapes it."""
+        if events is None:
+            return
+        self._append({"type": "week", "monday": monday.strftime("%Y-%m-%d"), "events": events})
+        with self._lock:
+            self.weeks[monday] = events
+
+    def record_created(self, key, event_id):
+        self._append({"type": "created", "key": key, "id": event_id})
+        with self._lock:
+            self.created[key] = event_id
+
+    def discard(self):
+        """Deletes the journal, e.g. once the import has completed."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,247 @@
+"""
+Storage for import progress and job state, shared by the import workers and the routes.
+
+Besides progress, each store holds a claim per queued or running import (keyed by
+MacID) with its cancel flag, so duplicate submissions and cancel requests are
+handled the same whichever process receives them. The process holding a claim
+refreshes it while the import is queued or running; one that is not refreshed
+for PROGRESS_TTL seconds expires, so an import lost with a crashed process does
+not block its MacID for good.
+
+Two backends are available, selected with PROGRESS_STORE:
+    memory  bounded in-process store; entries expire after PROGRESS_TTL seconds
+            and the least recently updated are evicted beyond PROGRESS_MAX_ENTRIES.
+            Only correct with a single server process.
+    sqlite  a SQLite file (PROGRESS_DB_PATH) that survives restarts and is shared by
+            every process on the machine, e.g. several gunicorn workers
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting stream re-reads the SQLite store for updates written by other processes
+SQLITE_POLL_INTERVAL_SECONDS = 0.5
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class MemoryProgressStore:
+    """Progress kept in this process, with LRU eviction and a TTL."""
+
+    def __init__(self, max_entries=1000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # session id -> (version, updated_at, progress)
+        self._jobs = {}  # dedup key -> [session id, cancel requested, claimed_at]
+        self._changed = threading.Condition()
+
+    def _prune(self, now):
+        while self._entries:
+            session_id, (_, updated_at, _) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - updated_at < self.ttl:
+                break
+            del self._entries[session_id]
+
+    def _entry(self, session_id):
+        entry = self._entries.get(session_id)
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            return 0, None
+        return entry[0], entry[2]
+
+    def get(self, session_id):
+        with self._changed:
+            return self._entry(session_id)[1]
+
+    def set(self, session_id, progress):
+        now = time.time()
+        with self._changed:
+            version = self._entries.pop(session_id, (0, 0, None))[0] + 1
+            self._entries[session_id] = (version, now, progress)
+            self._prune(now)
+            self._changed.notify_all()
+
+    def wait_for_update(self, session_id, last_version=0, timeout=15):
+        """Blocks until the version moves past last_version or timeout passes. Returns (version, progress)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._entry(session_id)[0] != last_version, timeout=timeout)
+            return self._entry(session_id)
+
+    def claim_job(self, dedup_key, session_id):
+        """Claims dedup_key for a new import. Returns False if another import already holds it."""
+        now = time.time()
+        with self._changed:
+            job = self._jobs.get(dedup_key)
+            if job is not None and now - job[2] < self.ttl:
+                return False
+            self._jobs[dedup_key] = [session_id, False, now]
+            return True
+
+    def refresh_jobs(self, dedup_keys):
+        """Restarts the expiry of these claims, keeping imports that are still alive claimed."""
+        now = time.time()
+        with self._changed:
+            for dedup_key in dedup_keys:
+                job = self._jobs.get(dedup_key)
+                if job is not None:
+                    job[2] = now
+
+    def release_job(self, dedup_key):
+        with self._changed:
+            self._jobs.pop(dedup_key, None)
+
+    def request_cancel(self, session_id):
+        """Flags the session's claimed import as cancelled. Returns False if it has none."""
+        with self._changed:
+            jobs = [job for job in self._jobs.values() if job[0] == session_id]
+            for job in jobs:
+                job[1] = True
+            return bool(jobs)
+
+    def is_cancel_requested(self, dedup_key):
+        with self._changed:
+            job = self._jobs.get(dedup_key)
+            return bool(job and job[1])
+
+
+class SQLiteProgressStore:
+    """Progress kept in a SQLite file, readable by every process that opens it."""
+
+    def __init__(self, path, ttl=3600, prune_every=100):
+        self.path = path
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        self._changed = threading.Condition()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS progress ("
+                "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, updated_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "dedup_key TEXT PRIMARY KEY, session_id TEXT NOT NULL, cancel_requested INTEGER NOT NULL, "
+                "claimed_at REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            # WAL lets readers in other processes proceed while a worker writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _entry(self, session_id):
+        row = self._connection().execute(
+            "SELECT version, data FROM progress WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            return 0, None
+        return row[0], json.loads(row[1])
+
+    def get(self, session_id):
+        return self._entry(session_id)[1]
+
+    def set(self, session_id, progress):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO progress (session_id, version, updated_at, data) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at, "
+                "data = excluded.data",
+                (session_id, now, json.dumps(progress)),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                connection.execute("DELETE FROM progress WHERE updated_at <= ?", (now - self.ttl,))
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait_for_update(self, session_id, last_version=0, timeout=15):
+        """
+        Blocks until the version moves past last_version or timeout passes. Returns (version, progress).
+        Writes from this process wake the waiter at once; other processes' writes are seen by polling.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            version, progress = self._entry(session_id)
+            remaining = deadline - time.monotonic()
+            if version != last_version or remaining <= 0:
+                return version, progress
+            with self._changed:
+                self._changed.wait(min(remaining, SQLITE_POLL_INTERVAL_SECONDS))
+
+    def claim_job(self, dedup_key, session_id):
+        """Claims dedup_key for a new import. Returns False if any process already holds it."""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("DELETE FROM jobs WHERE claimed_at <= ?", (now - self.ttl,))
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO jobs (dedup_key, session_id, cancel_requested, claimed_at) VALUES (?, ?, 0, ?)",
+                (dedup_key, session_id, now),
+            )
+            return cursor.rowcount == 1
+
+    def refresh_jobs(self, dedup_keys):
+        """Restarts the expiry of these claims, keeping imports that are still alive claimed."""
+        now = time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                "UPDATE jobs SET claimed_at = ? WHERE dedup_key = ?", [(now, dedup_key) for dedup_key in dedup_keys]
+            )
+
+    def release_job(self, dedup_key):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM jobs WHERE dedup_key = ?", (dedup_key,))
+
+    def request_cancel(self, session_id):
+        """Flags the session's claimed import as cancelled. Returns False if it has none."""
+        with self._connection() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE session_id = ? AND claimed_at > ?",
+                (session_id, time.time() - self.ttl),
+            )
+            return cursor.rowcount > 0
+
+    def is_cancel_requested(self, dedup_key):
+        row = self._connection().execute(
+            "SELECT cancel_requested FROM jobs WHERE dedup_key = ?", (dedup_key,)
+        ).fetchone()
+        return bool(row and row[0])
+
+
+def create_progress_store(config):
+    """Builds the progress store selected by PROGRESS_STORE."""
+    ttl = config.get("PROGRESS_TTL", 3600)
+    if config.get("PROGRESS_STORE") == "sqlite":
+        logger.info(f"Storing import progress in {config.get('PROGRESS_DB_PATH')}.")
+        return SQLiteProgressStore(config.get("PROGRESS_DB_PATH"), ttl=ttl)
+    return MemoryProgressStore(max_entries=config.get("PROGRESS_MAX_ENTRIES", 1000), ttl=ttl)
+
+
+def init_progress_store(app):
+    """Creates the process-wide progress store from the app configuration."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_progress_store(app.config)
+    return _store
+
+
+def get_progress_store():
+    """Returns the process-wide progress store, defaulting to an in-memory one."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MemoryProgressStore()
+    return _store
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session, jsonify, Response, stream_with_context
 from datetime import datetime, timedelta
 import os
 import json
@@ -14,7 +14,9 @@ if parent_dir not in sys.path:
 
 import scraper # Your refactored scraper.py
 import gcal_service # Your gcal_service.py
-from .task_manager import start_import_task, get_task_progress
+import gcal_ratelimit
+import metrics
+from .task_manager import start_import_task, cancel_import_task, get_task_progress, wait_for_task_progress, TERMINAL_STATUSES
 
 # Using a Blueprint for routes. 'main' is the name of the blueprint.
 main_bp = Blueprint('main', __name__)
@@ -29,29 +31,16 @@ def index():
     
     macid_user = current_app.config.get('MACID_USER', '')
 
-    gcal_authorized = os.path.exists(current_app.config['TOKEN_FILE'])
+    gcal_authorized = gcal_service.is_authorized(current_app.config['TOKEN_FILE'])
     current_app.logger.info(f"Google Calendar authorized: {gcal_authorized}")
 
-    # Fetch calendars if authorized
-    calendars = []
-    if gcal_authorized:
-        service = gcal_service.get_calendar_service()
-        if service:
-            # This is a synchronous call during page load.
-            # Consider moving to an async call from JS if it slows down page load significantly.
-            calendars_list_items = gcal_service.list_calendars(service)
-            calendars = [{"id": cal.get("id"), "summary": cal.get("summary")} for cal in calendars_list_items]
-            current_app.logger.info(f"Fetched {len(calendars)} calendars.")
-        else:
-            current_app.logger.warning("Could not get Google Calendar service to list calendars for index page.")
-
+    # The calendar dropdown is filled asynchronously from /get_calendars so the page renders immediately
     return render_template(
         'index.html',
         default_start_date=default_start,
         default_end_date=default_end,
         macid_user=macid_user,
-        gcal_authorized=gcal_authorized,
-        calendars=calendars # Pass calendars to the template
+        gcal_authorized=gcal_authorized
     )
 
 @main_bp.route('/authorize_gcal')
@@ -79,7 +68,7 @@ def oauth2callback():
     # For run_local_server, this route primarily serves as the redirect URI.
     
     # It's good practice to check if the token file was created.
-    if os.path.exists(current_app.config['TOKEN_FILE']):
+    if gcal_service.is_authorized(current_app.config['TOKEN_FILE']):
         flash('Google Calendar authorization completed.', 'success')
         current_app.logger.info("OAuth2 callback processed, token file should be present.")
     else:
@@ -107,10 +96,39 @@ def get_import_progress():
     progress_data = get_task_progress(session_id)
     return jsonify(progress_data)
 
+@main_bp.route('/import_progress_stream')
+def import_progress_stream():
+    """Stream progress updates as Server-Sent Events until the import finishes."""
+    session_id = session.get('import_session_id')
+
+    def generate():
+        # Tell EventSource to wait a few seconds before reconnecting if the stream drops
+        yield "retry: 3000\n\n"
+        version = 0
+        while True:
+            new_version, progress_data = wait_for_task_progress(session_id, version)
+            if new_version == version:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            yield f"data: {json.dumps(progress_data)}\n\n"
+            if progress_data.get('status') in TERMINAL_STATUSES:
+                return
+
+    if not session_id:
+        default_data = {'message': 'No import in progress', 'percentage': 0, 'status': 'not_started'}
+        return Response(f"data: {json.dumps(default_data)}\n\n", mimetype='text/event-stream')
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable buffering in nginx-style proxies
+    return response
+
 @main_bp.route('/get_calendars', methods=['GET'])
 def get_calendars():
     current_app.logger.info("Get calendars route called.")
-    if not os.path.exists(current_app.config['TOKEN_FILE']):
+    if not gcal_service.is_authorized(current_app.config['TOKEN_FILE']):
         return jsonify({'status': 'error', 'message': 'Google Calendar not authorized.', 'calendars': []}), 403
 
     service = gcal_service.get_calendar_service()
@@ -118,8 +136,12 @@ def get_calendars():
         current_app.logger.error("Failed to get Google Calendar service for /get_calendars.")
         return jsonify({'status': 'error', 'message': 'Could not connect to Google Calendar.', 'calendars': []}), 500
 
+    # ?refresh=1 bypasses the calendar-list cache, e.g. after creating a new calendar
+    if request.args.get('refresh'):
+        gcal_service.invalidate_calendar_cache()
+
     try:
-        calendar_items = gcal_service.list_calendars(service)
+        calendar_items = gcal_service.get_cached_calendars(service)
         calendars = [{"id": cal.get("id"), "summary": cal.get("summaryOverride", cal.get("summary"))} for cal in calendar_items] # Use summaryOverride if available
         current_app.logger.info(f"Successfully fetched {len(calendars)} calendars via /get_calendars.")
         return jsonify({'status': 'success', 'calendars': calendars})
@@ -136,7 +158,7 @@ def import_schedule():
     
     session_id = session['import_session_id']
     
-    if not os.path.exists(current_app.config['TOKEN_FILE']):
+    if not gcal_service.is_authorized(current_app.config['TOKEN_FILE']):
         current_app.logger.warning("Google Calendar not authorized during import attempt.")
         return jsonify({'status': 'error', 'message': 'Google Calendar not authorized. Please authorize first.'}), 403
 
@@ -158,11 +180,32 @@ def import_schedule():
         return jsonify({'status': 'error', 'message': 'Invalid date format. Please use YYYY-MM-DD.'}), 400
     
     app = current_app._get_current_object()
-    start_import_task(app, session_id, macid, password, start_date, end_date, calendar_id) # Pass calendar_id
-    
-    current_app.logger.info(f"Import task started for session_id: {session_id} for calendar {calendar_id}")
+    result = start_import_task(app, session_id, macid, password, start_date, end_date, calendar_id) # Pass calendar_id
+    if result == 'duplicate':
+        current_app.logger.warning(f"Rejected import for {macid}: an import for this MacID is already in flight.")
+        return jsonify({'status': 'error', 'message': 'An import for this MacID is already queued or running.'}), 409
+    if result == 'queue_full':
+        current_app.logger.warning("Rejected import: the import queue is full.")
+        return jsonify({'status': 'error', 'message': 'The server is busy with other imports. Please try again in a few minutes.'}), 503
+
+    current_app.logger.info(f"Import task queued for session_id: {session_id} for calendar {calendar_id}")
     return jsonify({'status': 'success', 'message': 'Import process initiated. Monitoring progress...'})
 
+@main_bp.route('/cancel_import', methods=['POST'])
+def cancel_import():
+    """Cancel the current session's queued or running import."""
+    session_id = session.get('import_session_id')
+    if not session_id or not cancel_import_task(current_app._get_current_object(), session_id):
+        return jsonify({'status': 'error', 'message': 'No import in progress to cancel.'}), 404
+    current_app.logger.info(f"Cancellation requested for session_id: {session_id}")
+    return jsonify({'status': 'success', 'message': 'Cancelling import...'})
+
+@main_bp.route('/metrics')
+def prometheus_metrics():
+    """Stage timing histograms and Calendar API counters in the Prometheus text format."""
+    body = metrics.render_prometheus(gcal_ratelimit.get_metrics(), prefix='mosaicsync_gcal_')
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 # Need to register this blueprint in app/__init__.py
 # Modify app/__init__.py:
 # from .routes import main_bp
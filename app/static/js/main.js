@@ -8,6 +8,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const progressBar = document.getElementById('progress-bar');
     const progressMessage = document.getElementById('progress-message');
     let progressIntervalId = null;
+    let progressEventSource = null;
+    const cancelButton = document.getElementById('cancelImportBtn');
 
     const calendarSelect = document.getElementById('calendar_id');
     const calendarLoadError = document.getElementById('calendar-load-error');
@@ -24,6 +26,43 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 50);
     }
 
+    // Stop whichever progress mechanism (stream or polling) is active
+    function stopProgressUpdates() {
+        if (progressEventSource) {
+            progressEventSource.close();
+            progressEventSource = null;
+        }
+        clearInterval(progressIntervalId);
+        progressIntervalId = null;
+    }
+
+    // Poll /get_import_progress; used when Server-Sent Events are unavailable
+    function startProgressPolling() {
+        stopProgressUpdates();
+        progressIntervalId = setInterval(fetchProgress, 1500);
+        fetchProgress();
+    }
+
+    // Receive progress updates as they happen, falling back to polling if the stream fails
+    function startProgressUpdates() {
+        stopProgressUpdates();
+        if (!window.EventSource) {
+            startProgressPolling();
+            return;
+        }
+        progressEventSource = new EventSource('/import_progress_stream');
+        progressEventSource.onmessage = function(event) {
+            applyProgress(JSON.parse(event.data));
+        };
+        progressEventSource.onerror = function() {
+            // A stream that never delivers (e.g. a buffering proxy) falls back to polling
+            if (progressEventSource && progressEventSource.readyState === EventSource.CLOSED) {
+                console.warn('Progress stream closed; falling back to polling.');
+                startProgressPolling();
+            }
+        };
+    }
+
     // Function to fetch and update progress
     async function fetchProgress() {
         try {
@@ -33,104 +72,98 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (progressMessage) progressMessage.textContent = 'Error fetching progress.';
                 return;
             }
-            const data = await response.json();
+            applyProgress(await response.json());
+        } catch (error) {
+            console.error('Error in fetchProgress:', error);
+            if (progressMessage) progressMessage.textContent = 'Failed to update progress.';
+        }
+    }
 
-            if (progressBar) {
-                const roundedProgress = Math.floor(data.percentage || 0);
-                progressBar.style.width = roundedProgress + '%';
-                progressBar.textContent = roundedProgress + '%';
-                progressBar.setAttribute('aria-valuenow', roundedProgress);
-                // Ensure no error class persists if we are now processing or completed successfully
-                if (data.status !== 'error') {
-                    progressBar.classList.remove('bg-danger');
-                }
-            }
-            if (progressMessage) {
-                progressMessage.textContent = data.message || 'Processing...';
+    // Update the progress bar and message from a progress update
+    function applyProgress(data) {
+        if (progressBar) {
+            const roundedProgress = Math.floor(data.percentage || 0);
+            progressBar.style.width = roundedProgress + '%';
+            progressBar.textContent = roundedProgress + '%';
+            progressBar.setAttribute('aria-valuenow', roundedProgress);
+            // Ensure no error class persists if we are now processing or completed successfully
+            if (data.status !== 'error') {
+                progressBar.classList.remove('bg-danger');
             }
+        }
+        if (progressMessage) {
+            progressMessage.textContent = data.message || 'Processing...';
+        }
 
-            // Check for terminal states to stop polling
-            // Ensure these strings exactly match the statuses sent by task_manager.py
-            const terminalSuccessStates = ['complete', 'complete_with_info', 'complete_with_warnings']; // Changed 'completed' to 'complete'
-            const terminalErrorStates = ['error'];
-            const terminalStates = [...terminalSuccessStates, ...terminalErrorStates];
-
-            if (terminalStates.includes(data.status)) {
-                clearInterval(progressIntervalId);
-                
-                if (terminalSuccessStates.includes(data.status)) {
-                    if (progressMessage) progressMessage.textContent = data.message || 'Import complete!';
-                    if (progressBar) {
-                        progressBar.style.width = '100%';
-                        progressBar.textContent = '100%';
-                        progressBar.setAttribute('aria-valuenow', '100');
-                        progressBar.classList.remove('bg-danger'); // Ensure no error style
-                        progressBar.classList.add('bg-success');
-                    }
-                    if (submitButton) {
-                        submitButton.disabled = false;
-                        submitButton.innerHTML = '<i class="fas fa-check-circle mr-2"></i> Done!';
-                    }
-                } else { // Error state
-                    if (progressMessage) progressMessage.textContent = data.message || 'An error occurred.';
-                    if (progressBar) {
-                        progressBar.classList.add('bg-danger');
-                        progressBar.classList.remove('bg-success');
-                    }
-                    if (submitButton) {
-                        submitButton.disabled = false;
-                        submitButton.innerHTML = '<i class="fas fa-exclamation-triangle mr-2"></i> Import Failed';
-                    }
-                }
+        // Check for terminal states to stop polling
+        // Ensure these strings exactly match the statuses sent by task_manager.py
+        const terminalSuccessStates = ['complete', 'complete_with_info', 'complete_with_warnings']; // Changed 'completed' to 'complete'
+        const terminalErrorStates = ['error'];
+        const terminalStates = [...terminalSuccessStates, ...terminalErrorStates, 'cancelled'];
 
-                // Optionally hide progress bar and reset button after a delay
-                setTimeout(() => {
-                    if (progressContainer) progressContainer.style.display = 'none';
-                    if (progressBar) {
-                        progressBar.style.width = '0%';
-                        progressBar.textContent = '0%';
-                        progressBar.setAttribute('aria-valuenow', '0');
-                        progressBar.classList.remove('bg-success', 'bg-danger');
-                    }
-                    if (submitButton) { // Reset button for another import
-                        submitButton.innerHTML = '<i class="fas fa-sync mr-2"></i> Import Schedule';
-                    }
-                }, 5000);
+        if (cancelButton) cancelButton.style.display = terminalStates.includes(data.status) ? 'none' : 'inline-block';
 
-            } else if (data.status === 'not_started' && progressContainer.style.display === 'block') {
-                console.log("Progress status: not_started, but UI was active. Continuing to poll.");
+        if (terminalStates.includes(data.status)) {
+            stopProgressUpdates();
+            
+            if (data.status === 'cancelled') {
+                if (progressMessage) progressMessage.textContent = data.message || 'Import cancelled.';
+                if (submitButton) {
+                    submitButton.disabled = false;
+                    submitButton.innerHTML = '<i class="fas fa-ban mr-2"></i> Import Cancelled';
+                }
+            } else if (terminalSuccessStates.includes(data.status)) {
+                if (progressMessage) progressMessage.textContent = data.message || 'Import complete!';
+                if (progressBar) {
+                    progressBar.style.width = '100%';
+                    progressBar.textContent = '100%';
+                    progressBar.setAttribute('aria-valuenow', '100');
+                    progressBar.classList.remove('bg-danger'); // Ensure no error style
+                    progressBar.classList.add('bg-success');
+                }
+                if (submitButton) {
+                    submitButton.disabled = false;
+                    submitButton.innerHTML = '<i class="fas fa-check-circle mr-2"></i> Done!';
+                }
+            } else { // Error state
+                if (progressMessage) progressMessage.textContent = data.message || 'An error occurred.';
+                if (progressBar) {
+                    progressBar.classList.add('bg-danger');
+                    progressBar.classList.remove('bg-success');
+                }
+                if (submitButton) {
+                    submitButton.disabled = false;
+                    submitButton.innerHTML = '<i class="fas fa-exclamation-triangle mr-2"></i> Import Failed';
+                }
             }
-        } catch (error) {
-            console.error('Error in fetchProgress:', error);
-            if (progressMessage) progressMessage.textContent = 'Failed to update progress.';
+
+            // Optionally hide progress bar and reset button after a delay
+            setTimeout(() => {
+                if (progressContainer) progressContainer.style.display = 'none';
+                if (progressBar) {
+                    progressBar.style.width = '0%';
+                    progressBar.textContent = '0%';
+                    progressBar.setAttribute('aria-valuenow', '0');
+                    progressBar.classList.remove('bg-success', 'bg-danger');
+                }
+                if (submitButton) { // Reset button for another import
+                    submitButton.innerHTML = '<i class="fas fa-sync mr-2"></i> Import Schedule';
+                }
+            }, 5000);
+
+        } else if (data.status === 'not_started' && progressContainer.style.display === 'block') {
+            console.log("Progress status: not_started, but UI was active. Waiting for updates.");
         }
     }
 
     // Function to load calendars into the dropdown
-    async function loadCalendars() {
+    async function loadCalendars(refresh = false) {
         if (!calendarSelect) return; // Should not happen if gcal is authorized, as element is conditional
 
-        // Check if calendars are pre-populated by the template.
-        // The template adds a "Loading..." option first, then actual calendars.
-        if (calendarSelect.options.length > 1 && 
-            calendarSelect.options[0].value === "" && 
-            calendarSelect.options[0].disabled) {
-            
-            console.log('Calendars pre-populated by template. Removing placeholder.');
-            calendarSelect.remove(0); // Remove the "Loading calendars..." placeholder
-
-            // Ensure an option is selected if the template didn't explicitly select one
-            // (e.g., no "primary" calendar was found by the template).
-            if (calendarSelect.options.length > 0 && calendarSelect.selectedIndex === -1) {
-                calendarSelect.options[0].selected = true;
-            }
-            return; // Calendars are already loaded and placeholder removed.
-        }
-
-        // If not pre-populated (or only placeholder exists), fetch them.
         console.log('Fetching calendars dynamically...');
         try {
-            const response = await fetch('/get_calendars');
+            // The server caches the calendar list; refresh=1 asks it to list them again
+            const response = await fetch(refresh ? '/get_calendars?refresh=1' : '/get_calendars');
             const data = await response.json();
 
             // Clear existing options (e.g., "Loading..." or error messages)
@@ -222,9 +255,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
                 if (importResponse.ok && importResult.status === 'success') {
                     if (progressMessage) progressMessage.textContent = importResult.message || 'Import initiated. Fetching progress...';
-                    clearInterval(progressIntervalId);
-                    progressIntervalId = setInterval(fetchProgress, 1500);
-                    fetchProgress();
+                    startProgressUpdates();
                 } else {
                     throw new Error(importResult.message || 'Failed to start import process.');
                 }
@@ -251,6 +282,22 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Cancel the queued or running import; the progress stream reports when it has stopped
+    if (cancelButton) {
+        cancelButton.addEventListener('click', async function() {
+            cancelButton.disabled = true;
+            try {
+                const response = await fetch('/cancel_import', { method: 'POST' });
+                const data = await response.json();
+                if (progressMessage) progressMessage.textContent = data.message;
+            } catch (error) {
+                console.error('Error cancelling import:', error);
+            } finally {
+                cancelButton.disabled = false;
+            }
+        });
+    }
+
     // Enhance form field interactions
     const formControls = document.querySelectorAll('.form-control');
     formControls.forEach(input => {
@@ -307,6 +354,19 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    const refreshCalendarsLink = document.getElementById('refresh-calendars');
+    if (refreshCalendarsLink) {
+        refreshCalendarsLink.addEventListener('click', function(e) {
+            e.preventDefault();
+            calendarSelect.innerHTML = '';
+            const loadingOption = new Option('Loading calendars...', '');
+            loadingOption.disabled = true;
+            loadingOption.selected = true;
+            calendarSelect.add(loadingOption);
+            loadCalendars(true);
+        });
+    }
+
     // Initial actions on page load
     if (calendarSelect) { 
         loadCalendars();
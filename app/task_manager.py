@@ -4,8 +4,10 @@ This module provides functionality to run tasks in the background while
 updating progress that can be queried by the main application.
 """
 import threading
+import queue
 import time
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import timedelta
 import logging
 import os
 from flask import current_app
@@ -17,19 +19,46 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 import scraper
 import gcal_service
+import gcal_async
+import recurrence
+import metrics
+from week_cache import WeekCache
+from .driver_pool import get_driver_pool
+from .progress_store import get_progress_store
+from .import_journal import ImportJournal
 
 logger = logging.getLogger(__name__)
 
-# Global dictionary to store task progress
-task_progress = {}
 
-class ImportTask(threading.Thread):
-    """Thread class for handling schedule imports in the background."""
+# Statuses after which a task's progress no longer changes
+TERMINAL_STATUSES = ("complete", "complete_with_info", "complete_with_warnings", "error", "cancelled")
+# How many times per PROGRESS_TTL the scheduler refreshes the claims of its imports
+CLAIM_REFRESHES_PER_TTL = 4
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class ImportCancelled(Exception):
+    """Raised inside an import when the user has cancelled it."""
+
+
+NOT_STARTED_PROGRESS = {
+    "message": "No import in progress",
+    "percentage": 0,
+    "status": "not_started"
+}
+
+
+def set_task_progress(session_id, progress):
+    """Store a task's progress and wake up any clients streaming it."""
+    get_progress_store().set(session_id, progress)
+
+class ImportTask:
+    """A schedule import, run in the background by an ImportScheduler worker."""
     
     def __init__(self, app, session_id, macid, password, start_date, end_date, calendar_id): # Added calendar_id
         """Initialize the import task with user credentials and date range."""
-        threading.Thread.__init__(self)
-        self.daemon = True  # Make thread a daemon so it closes when the main app closes
         self.app = app  # Store Flask app for creating context
         self.session_id = session_id
         self.macid = macid
@@ -37,183 +66,679 @@ class ImportTask(threading.Thread):
         self.start_date = start_date
         self.end_date = end_date
         self.calendar_id = calendar_id # Store calendar_id
-        # Initialize task progress
-        task_progress[session_id] = {
-            "message": "Starting import process...",
-            "percentage": 0,
-            "status": "running"
-        }
+        self.mondays = scraper.week_mondays(start_date, end_date)
+        self.stage = "driver"
+        self.cancel_requested = threading.Event()
+        # One in-flight import per MacID
+        self.dedup_key = macid.strip().lower()
+        self.journal = None
+        self.week_cache = None
+        # Mondays of weeks that could not be scraped; sync leaves the calendar alone there
+        self.failed_weeks = set()
+        self.failed_weeks_lock = threading.Lock()
+        # Time spent per stage (login, week_parse, gcal_batch, ...), reported with the progress
+        self.timings = metrics.JobTimings()
+        self.submitted_at = time.perf_counter()
     
-    def update_progress(self, message, percentage, status="running"):
+    def update_progress(self, message, percentage, status="running", queue_position=None, stages=None):
         """Update the progress of the current task."""
-        task_progress[self.session_id] = {
+        progress = {
             "message": message,
             "percentage": percentage,
             "status": status
         }
+        if queue_position is not None:
+            progress["queue_position"] = queue_position
+        if stages is not None:
+            progress["stages"] = stages
+        progress["timings"] = self.timings.snapshot()
+        set_task_progress(self.session_id, progress)
         logger.info(f"Progress updated: {percentage}% - {message}")
+
+    def check_cancelled(self):
+        """Raise ImportCancelled if the user asked to cancel; called between weeks and batches."""
+        # The cancel request may have reached another server process, which can only flag it in the store
+        if self.cancel_requested.is_set() or get_progress_store().is_cancel_requested(self.dedup_key):
+            raise ImportCancelled()
     
+    def open_journal(self):
+        """Load this import's checkpoint journal so a retry resumes instead of starting over."""
+        checkpoint_dir = current_app.config.get("CHECKPOINT_DIR")
+        if not checkpoint_dir:
+            return
+        try:
+            self.journal = ImportJournal.open(
+                checkpoint_dir, self.macid, self.start_date, self.end_date, self.calendar_id,
+                max_age=current_app.config.get("CHECKPOINT_MAX_AGE", 24 * 3600)
+            )
+        except OSError as e:
+            logger.warning(f"Import checkpoints disabled, could not open journal: {e}")
+            self.journal = None
+
+    def open_week_cache(self):
+        """Open the week cache, which lets unchanged weeks skip parsing and, in sync mode, publishing."""
+        cache_dir = current_app.config.get("WEEK_CACHE_DIR")
+        if not cache_dir:
+            return
+        try:
+            self.week_cache = WeekCache(
+                cache_dir,
+                ttl=current_app.config.get("WEEK_CACHE_TTL", 7 * 24 * 3600),
+                max_entries=current_app.config.get("WEEK_CACHE_MAX_ENTRIES", 500)
+            )
+        except OSError as e:
+            logger.warning(f"Week cache disabled, could not open {cache_dir}: {e}")
+            self.week_cache = None
+
+    def sync_target(self):
+        """
+        What a week was published as, for the week cache: a different calendar or
+        event shape (recurring series vs. single events) needs a fresh sync.
+        """
+        if current_app.config.get("COLLAPSE_RECURRING_EVENTS"):
+            return f"{self.calendar_id}|recurring|{current_app.config.get('EXCLUDED_DATES')}"
+        return f"{self.calendar_id}|weekly"
+
+    def is_week_synced(self, monday):
+        """Whether the week is unchanged since it was last synced to this calendar (sync mode only)."""
+        if not self.week_cache or current_app.config.get("IMPORT_MODE") != "sync":
+            return False
+        return self.week_cache.is_synced(self.macid, monday, self.sync_target())
+
+    def mark_weeks_synced(self, mondays):
+        if not self.week_cache or current_app.config.get("IMPORT_MODE") != "sync":
+            return
+        for monday in mondays:
+            if monday in self.failed_weeks:
+                continue
+            try:
+                self.week_cache.mark_synced(self.macid, monday, self.sync_target())
+            except OSError as e:
+                logger.warning(f"Could not record sync of week {monday.strftime('%Y-%m-%d')} in the week cache: {e}")
+
+    def failed_week_strings(self):
+        """The failed weeks' Mondays as "YYYY-MM-DD", as gcal_service and recurrence take them."""
+        with self.failed_weeks_lock:
+            return sorted(monday.strftime("%Y-%m-%d") for monday in self.failed_weeks)
+
+    def note_failed_weeks(self, message, status):
+        """Adds any weeks that could not be scraped to a final (message, status)."""
+        if not self.failed_weeks:
+            return message, status
+        message += (f" {len(self.failed_weeks)} week(s) could not be scraped and were left unchanged: "
+                    f"{', '.join(self.failed_week_strings())}.")
+        if status in ("complete", "complete_with_info"):
+            status = "complete_with_warnings"
+        return message, status
+
+    def finish(self, message, status):
+        """Report the final progress, dropping the journal once nothing is left to resume."""
+        if self.journal and status in ("complete", "complete_with_info"):
+            self.journal.discard()
+        self.update_progress(message, 100, status)
+
     def run(self):
         """Run the import process."""
-        driver = None
-        
         # Create application context for this thread
-        with self.app.app_context():
-            try:
-                self.update_progress("Setting up browser driver...", 10)
-                driver = scraper.setup_driver()
-                
+        with self.app.app_context(), metrics.track_job(self.timings):
+            metrics.observe("queue_wait", time.perf_counter() - self.submitted_at)
+            self.open_journal()
+            self.open_week_cache()
+            # Collapsing recurring events needs the whole term, so it cannot publish week by week
+            if current_app.config.get("PIPELINE_IMPORTS") and not current_app.config.get("COLLAPSE_RECURRING_EVENTS"):
+                self.run_pipelined()
+            else:
+                if current_app.config.get("PIPELINE_IMPORTS"):
+                    logger.info("PIPELINE_IMPORTS is on but COLLAPSE_RECURRING_EVENTS is too; "
+                                "scraping every week before publishing.")
+                self.run_sequential()
+
+    def connect_calendar(self, percentage):
+        """Get the Calendar service, reporting an error and returning None if it is unavailable."""
+        self.update_progress('Connecting to Google Calendar...', percentage)
+        if not gcal_service.is_authorized(current_app.config["TOKEN_FILE"]):
+            self.update_progress('Error: Google Calendar not authorized.', percentage, 'error')
+            return None
+        gcal = gcal_service.get_calendar_service()
+        if not gcal:
+            self.update_progress('Error: Could not connect to Google Calendar.', percentage, 'error')
+        return gcal
+
+    def run_sequential(self):
+        """Scrape the whole range, then publish it."""
+        try:
+            all_schedule_data = self.scrape_schedule()
+        except ImportCancelled:
+            self.update_progress('Import cancelled.', self.get_current_percentage(), 'cancelled')
+            return
+        except Exception as e:
+            logger.error(f"Error during scraping process: {e}", exc_info=True)
+            if self.stage == "driver":
+                self.update_progress(f'Error setting up browser: {str(e)}', 10, 'error')
+            else:
+                self.update_progress(
+                    f'Error during scraping: {str(e)}',
+                    self.get_current_percentage(),
+                    'error'
+                )
+            return
+
+        try:
+            scraper_progress_end_percentage = 70
+            self.update_progress(
+                f'Scraping complete. Found {len(all_schedule_data)} events. Processing...',
+                scraper_progress_end_percentage
+            )
+            
+            if not all_schedule_data:
+                if len(self.failed_weeks) == len(self.mondays):
+                    self.update_progress('Error: none of the requested weeks could be scraped.',
+                                         scraper_progress_end_percentage, 'error')
+                    return
+                self.finish(*self.note_failed_weeks('No schedule data found for the given dates.', 'complete_with_info'))
+                return
+            
+            if current_app.config.get("COLLAPSE_RECURRING_EVENTS"):
+                all_schedule_data = recurrence.group_recurring_events(
+                    all_schedule_data, current_app.config.get("EXCLUDED_DATES"),
+                    failed_weeks=self.failed_week_strings()
+                )
+                self.update_progress(
+                    f'Grouped schedule into {len(all_schedule_data)} calendar events.',
+                    scraper_progress_end_percentage
+                )
+
+            # The whole range is synced at once, so it can only be skipped if no week changed
+            if not self.failed_weeks and all(self.is_week_synced(monday) for monday in self.mondays):
+                self.finish(
+                    f'Schedule unchanged since the last sync: {len(all_schedule_data)} events already up to date.',
+                    'complete'
+                )
+                return
+
+            gcal = self.connect_calendar(75)
+            if not gcal:
+                return
+            
+            range_start = self.mondays[0].strftime("%Y-%m-%d")
+            range_end = (self.mondays[-1] + timedelta(days=6)).strftime("%Y-%m-%d")
+            self.check_cancelled()
+            final_message, final_status = self.publish_events(gcal, all_schedule_data, range_start, range_end)
+            if final_status == "complete":
+                self.mark_weeks_synced(self.mondays)
+            self.finish(*self.note_failed_weeks(final_message, final_status))
+        
+        except ImportCancelled:
+            self.update_progress(
+                'Import cancelled. Events already sent to Google Calendar were kept.',
+                self.get_current_percentage(),
+                'cancelled'
+            )
+        except Exception as e:
+            logger.error(f"Error during calendar import: {e}", exc_info=True)
+            self.update_progress(
+                f'Error during calendar import: {str(e)}',
+                self.get_current_percentage(),
+                'error'
+            )
+
+    def run_pipelined(self):
+        """
+        Scrape and publish at the same time: the scraper (producer thread) puts each
+        finished week on a bounded queue and this thread publishes it right away,
+        syncing one week's window at a time, so the import takes about as long as
+        the slower of the two stages rather than their sum.
+        """
+        total_weeks = len(self.mondays)
+        week_queue = queue.Queue(maxsize=current_app.config.get("PIPELINE_QUEUE_SIZE", 4))
+        stop_producer = threading.Event()
+        producer_errors = []
+        progress_lock = threading.Lock()
+        stages = {
+            "scrape": {"done": 0, "total": total_weeks},
+            "publish": {"done": 0, "total": total_weeks},
+        }
+        totals = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+
+        def report(message):
+            # 20% for setup, then the two stages share the rest equally
+            with progress_lock:
+                fraction = (stages["scrape"]["done"] + stages["publish"]["done"]) / (2 * total_weeks) if total_weeks else 1
+                snapshot = {name: dict(stage) for name, stage in stages.items()}
+            self.update_progress(message, 20 + int(fraction * 75), stages=snapshot)
+
+        def on_week(monday, events):
+            if stop_producer.is_set():
+                raise ImportCancelled()
+            with progress_lock:
+                stages["scrape"]["done"] += 1
+            found = f'{len(events)} events' if events is not None else 'failed'
+            report(f'Scraped week {stages["scrape"]["done"]}/{total_weeks} '
+                   f'(starting {monday.strftime("%Y-%m-%d")}, {found})...')
+            # Block while the publisher is behind, but give up if it has stopped
+            while not stop_producer.is_set():
                 try:
-                    self.update_progress("Logging into portal...", 15)
-                    scraper.login_to_portal(driver, self.macid, self.password)
-                    
-                    self.update_progress("Navigating to weekly schedule page...", 20)
-                    scraper.navigate_to_weekly_schedule(driver)
-                    
-                    current_monday = self.start_date - timedelta(days=self.start_date.weekday())
-                    loop_end_date = self.end_date
-                    
-                    driver.switch_to.default_content()
-                    total_weeks = (loop_end_date - current_monday).days // 7 + 1
-                    if total_weeks <= 0:
-                        total_weeks = 1
-                    
-                    all_schedule_data = []
-                    weeks_processed = 0
-                    scraper_progress_start_percentage = 30
-                    scraper_progress_range = 40
-                    
-                    while current_monday <= loop_end_date:
-                        weeks_processed += 1
-                        current_progress_percentage = scraper_progress_start_percentage
-                        if total_weeks > 0:
-                            current_progress_percentage += int((weeks_processed / total_weeks) * scraper_progress_range)
-                        
-                        self.update_progress(
-                            f'Scraping week {weeks_processed}/{total_weeks} (starting {current_monday.strftime("%Y-%m-%d")})...',
-                            current_progress_percentage
-                        )
-                        
-                        weekly_events = scraper.scrape_week_data(driver, current_monday)
-                        if weekly_events:
-                            all_schedule_data.extend(weekly_events)
-                        current_monday += timedelta(days=7)
-                        # Add a small delay to ensure progress updates are visible
-                        time.sleep(0.1)  
-                    
-                    self.update_progress(
-                        f'Scraping complete. Found {len(all_schedule_data)} events. Processing...',
-                        scraper_progress_start_percentage + scraper_progress_range
-                    )
-                    
-                    if not all_schedule_data:
-                        self.update_progress(
-                            'No schedule data found for the given dates.',
-                            100,
-                            'complete_with_info'
-                        )
-                        return
-                    
-                    token_file = current_app.config["TOKEN_FILE"]
-                    self.update_progress('Connecting to Google Calendar...', 75)
-                    if not os.path.exists(token_file):
-                        self.update_progress(
-                            'Error: Google Calendar not authorized.',
-                            75,
-                            'error'
-                        )
-                        return
-                    
-                    gcal = gcal_service.get_calendar_service()
-                    if not gcal:
-                        self.update_progress(
-                            'Error: Could not connect to Google Calendar.',
-                            75,
-                            'error'
-                        )
-                        return
-                    
-                    events_created_count = 0
-                    events_failed_count = 0
-                    total_events_to_create = len(all_schedule_data)
-                    
-                    gcal_progress_start_percentage = 80
-                    gcal_progress_range = 20
-                    
-                    for i, event_data in enumerate(all_schedule_data):
-                        current_gcal_progress = gcal_progress_start_percentage
-                        if total_events_to_create > 0:
-                            current_gcal_progress += int(((i + 1) / total_events_to_create) * gcal_progress_range)
-                        
-                        self.update_progress(
-                            f'Adding event {i+1}/{total_events_to_create} to Google Calendar ({event_data.get("course", "Event")})...',
-                            current_gcal_progress
-                        )
-                        
-                        try:
-                            if "time" not in event_data or "date" not in event_data:
-                                logger.warning(f"Skipping event due to missing time/date: {event_data}")
-                                events_failed_count += 1
-                                continue
-                            
-                            created = gcal_service.create_calendar_event(gcal, event_data, self.calendar_id) # Pass calendar_id
-                            if created:
-                                events_created_count += 1
-                            else:
-                                events_failed_count += 1
-                        except Exception as e:
-                            logger.error(f"Error creating calendar event: {e}", exc_info=True)
-                            events_failed_count += 1
-                        
-                        # Add a small delay to ensure progress updates are visible
-                        time.sleep(0.1)
-                    
-                    final_message = f"Successfully created {events_created_count} events. Failed: {events_failed_count} events."
-                    if events_created_count == 0 and events_failed_count > 0:
-                        final_status = "error"
-                    elif events_failed_count > 0:
-                        final_status = "complete_with_warnings"
-                    else:
-                        final_status = "complete"
-                    
-                    self.update_progress(final_message, 100, final_status)
-                
+                    week_queue.put((monday, events), timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+            raise ImportCancelled()
+
+        def produce():
+            with self.app.app_context():
+                try:
+                    self.scrape_schedule(on_week=on_week)
                 except Exception as e:
-                    logger.error(f"Error during scraping process: {e}", exc_info=True)
-                    self.update_progress(
-                        f'Error during scraping: {str(e)}',
-                        self.get_current_percentage(),
-                        'error'
-                    )
+                    producer_errors.append(e)
                 finally:
-                    if driver:
-                        logger.info("Closing Selenium driver.")
-                        driver.quit()
-                        
-            except Exception as e:
-                logger.error(f"Error during driver setup: {e}", exc_info=True)
-                self.update_progress(
-                    f'Error setting up browser: {str(e)}',
-                    10,
-                    'error'
+                    week_queue.put(None)
+
+        gcal = self.connect_calendar(5)
+        if not gcal:
+            return
+
+        producer = threading.Thread(target=metrics.propagate_context(produce), name=f"import-scraper-{self.session_id[:8]}", daemon=True)
+        producer.start()
+        outcome = None
+        try:
+            while True:
+                item = week_queue.get()
+                if item is None:
+                    break
+                monday, events = item
+                self.check_cancelled()
+                week_start = monday.strftime("%Y-%m-%d")
+                week_end = (monday + timedelta(days=6)).strftime("%Y-%m-%d")
+                if events is None:
+                    # Not scraped, so nothing is known about this week; leave its events alone
+                    logger.warning(f"Week of {week_start} could not be scraped; not publishing it.")
+                    counts = {}
+                elif self.is_week_synced(monday):
+                    logger.info(f"Week of {week_start} is unchanged since the last sync; not publishing it.")
+                    counts = {"unchanged": len(events)}
+                else:
+                    counts = self.send_events(gcal, events, week_start, week_end)
+                    if counts is None:
+                        logger.error(f"Could not read existing events for the week of {week_start}; skipping it.")
+                        counts = {"failed": len(events)}
+                    elif not counts["failed"]:
+                        self.mark_weeks_synced([monday])
+                for name, value in counts.items():
+                    totals[name] += value
+                with progress_lock:
+                    stages["publish"]["done"] += 1
+                report(f'Published week {stages["publish"]["done"]}/{total_weeks} '
+                       f'({week_start}) to Google Calendar...')
+            if producer_errors:
+                raise producer_errors[0]
+        except ImportCancelled:
+            outcome = ('Import cancelled. Events already sent to Google Calendar were kept.', 'cancelled')
+        except Exception as e:
+            logger.error(f"Error during pipelined import: {e}", exc_info=True)
+            if self.stage == "driver" and producer_errors:
+                outcome = (f'Error setting up browser: {str(e)}', 'error')
+            elif producer_errors:
+                outcome = (f'Error during scraping: {str(e)}', 'error')
+            else:
+                outcome = (f'Error during calendar import: {str(e)}', 'error')
+        finally:
+            stop_producer.set()
+            # Drain the queue so a producer blocked on put() can see the stop flag and exit
+            while producer.is_alive():
+                try:
+                    week_queue.get(timeout=0.5)
+                except queue.Empty:
+                    pass
+
+        # Reported only once the producer has stopped, so its progress cannot overwrite the outcome
+        if outcome:
+            self.update_progress(outcome[0], self.get_current_percentage(), outcome[1])
+            return
+        if not any(totals.values()):
+            if len(self.failed_weeks) == total_weeks:
+                self.update_progress('Error: none of the requested weeks could be scraped.',
+                                     self.get_current_percentage(), 'error')
+                return
+            self.finish(*self.note_failed_weeks('No schedule data found for the given dates.', 'complete_with_info'))
+            return
+        self.finish(*self.note_failed_weeks(*self.summarize(totals)))
+
+    def scrape_schedule(self, on_week=None):
+        """
+        Scrape every week in the requested range, using SCRAPER_MAX_WORKERS parallel
+        portal sessions. Weeks already in the checkpoint journal are not scraped
+        again. Returns the scraped events in date order; weeks that could not be
+        scraped are added to self.failed_weeks instead.
+
+        If on_week(monday, events) is given it is called for every week (journalled
+        ones first, events None for a failed week) and reports progress itself
+        instead of the per-week messages.
+        """
+        stage_percentages = {"driver": 10, "login": 15, "navigate": 20}
+        scraper_progress_start_percentage = 30
+        scraper_progress_range = 40
+        total_weeks = len(self.mondays)
+        weeks_lock = threading.Lock()
+        weekly_results = {}
+        if self.journal:
+            weekly_results = {monday: events for monday, events in self.journal.weeks.items() if monday in self.mondays}
+        weeks_processed = [len(weekly_results)]
+        mondays_to_scrape = [monday for monday in self.mondays if monday not in weekly_results]
+
+        def report_stage(stage, message):
+            self.check_cancelled()
+            self.stage = stage
+            self.update_progress(message, stage_percentages.get(stage, self.get_current_percentage()))
+
+        def report_week(current_monday, weekly_events):
+            self.stage = "scrape"
+            # A failed week is not journalled, so a retry scrapes it again
+            if self.journal and weekly_events is not None:
+                self.journal.record_week(current_monday, weekly_events)
+            if weekly_events is None:
+                with self.failed_weeks_lock:
+                    self.failed_weeks.add(current_monday)
+            with weeks_lock:
+                if weekly_events is not None:
+                    weekly_results[current_monday] = weekly_events
+                weeks_processed[0] += 1
+                done = weeks_processed[0]
+            if on_week:
+                on_week(current_monday, weekly_events)
+                self.check_cancelled()
+                return
+            current_progress_percentage = scraper_progress_start_percentage
+            if total_weeks > 0:
+                current_progress_percentage += int((done / total_weeks) * scraper_progress_range)
+            found = f'{len(weekly_events)} events' if weekly_events is not None else 'failed'
+            self.update_progress(
+                f'Scraped week {done}/{total_weeks} (starting {current_monday.strftime("%Y-%m-%d")}, {found})...',
+                current_progress_percentage
+            )
+            self.check_cancelled()
+
+        if weekly_results:
+            self.update_progress(
+                f'Resuming import: {len(weekly_results)}/{total_weeks} weeks already scraped.',
+                self.get_current_percentage() if on_week else scraper_progress_start_percentage
+            )
+            if on_week:
+                for monday in sorted(weekly_results):
+                    on_week(monday, weekly_results[monday])
+        if mondays_to_scrape:
+            scraper.scrape_weeks_parallel(
+                self.macid,
+                self.password,
+                mondays_to_scrape,
+                max_workers=current_app.config.get("SCRAPER_MAX_WORKERS", 1),
+                fetch_mode=current_app.config.get("SCRAPER_FETCH_MODE"),
+                on_week_done=report_week,
+                on_stage=report_stage,
+                driver_session=get_driver_pool().lease,
+                week_cache=self.week_cache,
+                extract_mode=current_app.config.get("SCRAPER_EXTRACT_MODE", scraper.EXTRACT_MODE),
+            )
+        return [event for monday in sorted(weekly_results) for event in weekly_results[monday]]
+
+    def publish_events(self, gcal, events, range_start, range_end):
+        """
+        Publish events to the target calendar, either as an incremental sync or as
+        plain inserts depending on IMPORT_MODE. Returns (final message, final status).
+        """
+        gcal_progress_start_percentage = 80
+        gcal_progress_range = 20
+
+        def report_gcal_progress(done, total):
+            self.check_cancelled()
+            current_gcal_progress = gcal_progress_start_percentage
+            if total > 0:
+                current_gcal_progress += int((done / total) * gcal_progress_range)
+            self.update_progress(
+                f'Sent {done}/{total} changes to Google Calendar...',
+                current_gcal_progress
+            )
+
+        if current_app.config.get("IMPORT_MODE") == "sync":
+            start_message = f'Syncing {len(events)} events with Google Calendar...'
+        else:
+            start_message = f'Adding {len(events)} events to Google Calendar...'
+        self.update_progress(start_message, gcal_progress_start_percentage)
+        counts = self.send_events(gcal, events, range_start, range_end, report_gcal_progress)
+        if counts is None:
+            return 'Error: Could not read existing events from Google Calendar.', 'error'
+        return self.summarize(counts)
+
+    def send_events(self, gcal, events, range_start, range_end, progress_callback=None):
+        """
+        Send one set of events to the calendar. In sync mode the calendar is made to
+        match events between range_start and range_end, except in weeks that could
+        not be scraped. Returns a dict of "inserted",
+        "updated", "deleted", "unchanged" and "failed" counts, or None if the
+        existing events could not be listed.
+        """
+        publisher = self.async_publisher()
+        if current_app.config.get("IMPORT_MODE") == "sync":
+            failed_weeks = self.failed_week_strings()
+            if publisher:
+                return publisher.sync_calendar_events(
+                    events, self.calendar_id, range_start, range_end, progress_callback=progress_callback,
+                    failed_weeks=failed_weeks
                 )
-    
+            return gcal_service.sync_calendar_events(
+                gcal, events, self.calendar_id, range_start, range_end, progress_callback=progress_callback,
+                failed_weeks=failed_weeks
+            )
+
+        # Events a previous attempt of this import already created are not inserted again
+        already_created = 0
+        if self.journal:
+            pending_events = [event for event in events if gcal_service.event_sync_key(event) not in self.journal.created]
+            already_created = len(events) - len(pending_events)
+            events = pending_events
+            if already_created:
+                logger.info(f"Skipping {already_created} events created by an earlier attempt of this import.")
+
+        def record_created(event, created_event):
+            self.journal.record_created(gcal_service.event_sync_key(event), created_event.get("id"))
+        on_created = record_created if self.journal else None
+
+        if publisher:
+            results = publisher.create_calendar_events(
+                events, self.calendar_id, progress_callback=progress_callback, on_created=on_created
+            )
+        else:
+            results = gcal_service.create_calendar_events_batch(
+                gcal, events, self.calendar_id, progress_callback=progress_callback, on_created=on_created
+            )
+        for result in results:
+            if result["error"]:
+                logger.warning(f"Failed to create event {result['event']}: {result['error']}")
+        return {
+            "inserted": already_created + sum(1 for result in results if result["created"]),
+            "updated": 0,
+            "deleted": 0,
+            "unchanged": 0,
+            "failed": sum(1 for result in results if not result["created"]),
+        }
+
+    def async_publisher(self):
+        """The shared asyncio publisher if GCAL_PUBLISHER is 'async', else None for the batch publisher."""
+        if current_app.config.get("GCAL_PUBLISHER") != "async":
+            return None
+        publisher = gcal_async.get_publisher()
+        if publisher is None:
+            logger.warning("GCAL_PUBLISHER is 'async' but aiohttp is not installed; using the batch publisher.")
+        return publisher
+
+    def summarize(self, counts):
+        """Turn publishing counts into the final (message, status)."""
+        events_succeeded_count = counts["inserted"] + counts["updated"] + counts["deleted"] + counts["unchanged"]
+        events_failed_count = counts["failed"]
+        if current_app.config.get("IMPORT_MODE") == "sync":
+            final_message = (
+                f"Sync complete: {counts['inserted']} added, {counts['updated']} updated, "
+                f"{counts['deleted']} removed, {counts['unchanged']} unchanged. Failed: {events_failed_count}."
+            )
+        else:
+            final_message = f"Successfully created {events_succeeded_count} events. Failed: {events_failed_count} events."
+
+        if events_succeeded_count == 0 and events_failed_count > 0:
+            final_status = "error"
+        elif events_failed_count > 0:
+            final_status = "complete_with_warnings"
+        else:
+            final_status = "complete"
+        return final_message, final_status
+
     def get_current_percentage(self):
         """Get the current percentage from the task progress."""
-        return task_progress.get(self.session_id, {}).get("percentage", 0)
+        return get_task_progress(self.session_id).get("percentage", 0)
 
 
 def get_task_progress(session_id):
     """Get the current progress of a task."""
-    return task_progress.get(session_id, {
-        "message": "No import in progress",
-        "percentage": 0,
-        "status": "not_started"
-    })
+    return get_progress_store().get(session_id) or dict(NOT_STARTED_PROGRESS)
+
+
+def wait_for_task_progress(session_id, last_version=0, timeout=15):
+    """
+    Block until the task's progress changes past last_version or timeout seconds pass.
+    Returns (version, progress); the version is unchanged if the wait timed out.
+    """
+    version, progress = get_progress_store().wait_for_update(session_id, last_version, timeout)
+    return version, progress or dict(NOT_STARTED_PROGRESS)
+
+
+class ImportScheduler:
+    """
+    Runs imports on a fixed pool of worker threads fed by a bounded FIFO queue.
+    Submissions are rejected when the queue is full or the same MacID already has
+    an import queued or running, so load beyond the pool waits or is turned away
+    instead of starting more browsers.
+
+    The queue and worker pool belong to this process, but the per-MacID claims and
+    cancel flags live in the progress store, so with the sqlite store a duplicate or
+    a cancel is caught whichever server process receives it. A heartbeat thread
+    refreshes the claims of this process's queued and running imports, so a long
+    import does not lose its claim to PROGRESS_TTL.
+    """
+
+    def __init__(self, workers=2, queue_size=10):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._in_flight = {}  # dedup key -> queued or running ImportTask
+        self._threads = []
+
+    def _start_workers(self):
+        # Started on first use so that importing the app does not spawn threads
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"import-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._refresh_claims, name="import-claim-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def _refresh_claims(self):
+        store = get_progress_store()
+        # Several refreshes per TTL, so one delayed by a busy store does not let a claim lapse
+        interval = max(store.ttl / CLAIM_REFRESHES_PER_TTL, 1)
+        while True:
+            time.sleep(interval)
+            with self._condition:
+                dedup_keys = list(self._in_flight)
+            if not dedup_keys:
+                continue
+            try:
+                store.refresh_jobs(dedup_keys)
+            except Exception as e:
+                logger.warning(f"Could not refresh import claims: {e}")
+
+    def submit(self, task):
+        """Queue a task. Returns "queued", "duplicate" (same MacID in flight) or "queue_full"."""
+        with self._condition:
+            if task.dedup_key in self._in_flight:
+                return "duplicate"
+            if len(self._queue) >= self.queue_size:
+                return "queue_full"
+            if not get_progress_store().claim_job(task.dedup_key, task.session_id):
+                return "duplicate"
+            self._start_workers()
+            self._in_flight[task.dedup_key] = task
+            self._queue.append(task)
+            self._report_queue_positions()
+            self._condition.notify()
+        return "queued"
+
+    def cancel(self, session_id):
+        """Cancel a queued or running task. Returns False if the session has no such task."""
+        with self._condition:
+            task = next((t for t in self._in_flight.values() if t.session_id == session_id), None)
+            if task is None:
+                # Queued or running in another process, which stops it at its next check
+                return get_progress_store().request_cancel(session_id)
+            task.cancel_requested.set()
+            if task in self._queue:
+                # Never started, so it can be dropped right away
+                self._queue.remove(task)
+                del self._in_flight[task.dedup_key]
+                get_progress_store().release_job(task.dedup_key)
+                task.update_progress('Import cancelled.', 0, 'cancelled')
+                self._report_queue_positions()
+            else:
+                task.update_progress('Cancelling import...', task.get_current_percentage())
+        return True
+
+    def _report_queue_positions(self):
+        """Tell every waiting task its position; called with the condition held."""
+        for position, task in enumerate(self._queue, start=1):
+            task.update_progress(
+                f'Waiting for a free import slot ({position} in queue)...', 0, 'queued', queue_position=position
+            )
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue)
+                task = self._queue.popleft()
+                self._report_queue_positions()
+            try:
+                task.check_cancelled()
+                task.update_progress("Starting import process...", 0)
+                task.run()
+            except ImportCancelled:
+                task.update_progress('Import cancelled.', 0, 'cancelled')
+            except Exception as e:
+                logger.error(f"Import task for session {task.session_id} crashed: {e}", exc_info=True)
+                task.update_progress(f'Unexpected error: {str(e)}', task.get_current_percentage(), 'error')
+            finally:
+                with self._condition:
+                    self._in_flight.pop(task.dedup_key, None)
+                    get_progress_store().release_job(task.dedup_key)
+
+
+def init_import_scheduler(app):
+    """Creates the process-wide import scheduler from the app configuration."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ImportScheduler(
+                workers=app.config.get("IMPORT_WORKERS", 2),
+                queue_size=app.config.get("IMPORT_QUEUE_SIZE", 10),
+            )
+    return _scheduler
 
 
 def start_import_task(app, session_id, macid, password, start_date, end_date, calendar_id): # Added calendar_id
-    """Start an import task in the background."""
+    """Queue an import task. Returns the ImportScheduler.submit result."""
     task = ImportTask(app, session_id, macid, password, start_date, end_date, calendar_id) # Pass calendar_id
-    task.start()
-    return True
+    return init_import_scheduler(app).submit(task)
+
+
+def cancel_import_task(app, session_id):
+    """Cancel the session's queued or running import. Returns False if there is none."""
+    return init_import_scheduler(app).cancel(session_id)
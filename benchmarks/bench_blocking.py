@@ -0,0 +1,95 @@
+"""
+Measures what the lean browser's resource blocking misses on the live portal.
+
+Resource types are blocked by URL pattern (scraper.RESOURCE_URL_PATTERNS), which
+cannot see a request's type. This logs in with the lean profile and Chrome's
+performance log turned on, loads the weekly schedule (and optionally more weeks),
+then reports per resource type how many requests were blocked and how many loaded
+anyway, with their URLs, so patterns can be added for what slips through.
+
+Usage:
+    python benchmarks/bench_blocking.py                       # the schedule page only
+    python benchmarks/bench_blocking.py --weeks 2025-01-13 2025-01-20
+        # log in with MACID_USER/MACID_PASS; exits 1 if any blocked type got through
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from selenium import webdriver
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+import scraper
+
+
+def resource_requests(performance_log):
+    """
+    Returns {request id: {"type", "url", "blocked", "bytes"}} from Chrome performance log
+    entries. "type" is the lower-cased DevTools resource type ("image", "stylesheet", ...).
+    """
+    requests = {}
+    for entry in performance_log:
+        message = json.loads(entry["message"])["message"]
+        params = message.get("params", {})
+        request_id = params.get("requestId")
+        if message.get("method") == "Network.requestWillBeSent":
+            requests[request_id] = {
+                "type": params.get("type", "other").lower(),
+                "url": params["request"]["url"],
+                "blocked": False,
+                "bytes": 0,
+            }
+        elif request_id in requests and message.get("method") == "Network.loadingFailed":
+            requests[request_id]["blocked"] = bool(params.get("blockedReason"))
+        elif request_id in requests and message.get("method") == "Network.loadingFinished":
+            requests[request_id]["bytes"] = params.get("encodedDataLength", 0)
+    return requests
+
+
+def missed_requests(requests, resource_types):
+    """The requests of a blocked resource type that were not blocked."""
+    return [request for request in requests.values() if request["type"] in resource_types and not request["blocked"]]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Report what resource blocking lets through on the live portal.")
+    arg_parser.add_argument("--weeks", nargs="*", default=[], metavar="MONDAY", help="Also load these weeks (YYYY-MM-DD).")
+    args = arg_parser.parse_args()
+
+    options = scraper.lean_chrome_options(scraper.HEADLESS, scraper.BLOCKED_RESOURCES)
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    driver = webdriver.Chrome(options=options)
+    performance_log = []
+    try:
+        scraper.block_resources(driver, scraper.BLOCKED_RESOURCES)
+        scraper.login_to_portal(driver, scraper.MACID, scraper.PASSWORD)
+        scraper.navigate_to_weekly_schedule(driver)
+        for week in args.weeks:
+            scraper.scrape_week_data(driver, datetime.strptime(week, "%Y-%m-%d"))
+        performance_log = driver.get_log("performance")
+    finally:
+        driver.quit()
+
+    requests = resource_requests(performance_log)
+    counts = defaultdict(lambda: {"blocked": 0, "loaded": 0, "bytes": 0})
+    for request in requests.values():
+        count = counts[request["type"]]
+        count["blocked" if request["blocked"] else "loaded"] += 1
+        count["bytes"] += request["bytes"]
+    print(f"{'type':<12} {'blocked':>8} {'loaded':>8} {'KiB':>8}")
+    for resource_type, count in sorted(counts.items()):
+        print(f"{resource_type:<12} {count['blocked']:>8} {count['loaded']:>8} {count['bytes'] / 1024:>8.0f}")
+
+    missed = missed_requests(requests, scraper.BLOCKED_RESOURCES)
+    for request in missed:
+        print(f"missed {request['type']}: {request['url']}")
+    return 1 if missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Offline load test for the calendar publishing side of an import, run against
+the local fake Calendar API (fake_gcal_server.py) so no Google account is needed.
+
+A term is synthesised by repeating the golden events of the parser fixtures for
+--weeks weeks, then published with each strategy:
+    sequential  one create_calendar_event call per event (the original behaviour)
+    batch       create_calendar_events_batch
+    sync        sync_calendar_events on an empty calendar, then again unchanged
+    recurring   group_recurring_events + sync_calendar_events
+
+Usage:
+    python benchmarks/bench_import.py --weeks 13 --latency-ms 30
+    python benchmarks/bench_import.py --error-rate-429 0.05 --concurrency 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+if benchmarks_dir not in sys.path:
+    sys.path.append(benchmarks_dir)
+import gcal_service
+import recurrence
+import fake_gcal_server
+
+FIXTURES_DIR = os.path.join(benchmarks_dir, "fixtures")
+TERM_START = datetime(2025, 1, 6)
+
+
+def synthesise_term(weeks):
+    """Repeats the standard fixture week for the given number of weeks."""
+    with open(os.path.join(FIXTURES_DIR, "standard_week.json"), encoding="utf-8") as f:
+        template = json.load(f)
+    template_monday = datetime.strptime(template["week_of"], "%Y-%m-%d")
+    events = []
+    for week in range(weeks):
+        monday = TERM_START + timedelta(days=7 * week)
+        for event in template["events"]:
+            day_offset = datetime.strptime(event["date"], "%Y-%m-%d") - template_monday
+            events.append({**event, "week_of": monday.strftime("%Y-%m-%d"),
+                           "date": (monday + day_offset).strftime("%Y-%m-%d")})
+    return events
+
+
+def publish_sequential(service, events, calendar_id):
+    created = sum(1 for event in events if gcal_service.create_calendar_event(service, event, calendar_id))
+    return f"{created}/{len(events)} created"
+
+
+def publish_batch(service, events, calendar_id):
+    results = gcal_service.create_calendar_events_batch(service, events, calendar_id)
+    return f"{sum(1 for r in results if r['created'])}/{len(events)} created"
+
+
+def publish_sync(service, events, calendar_id):
+    range_start = events[0]["date"]
+    range_end = max(event["date"] for event in events)
+    first = gcal_service.sync_calendar_events(service, events, calendar_id, range_start, range_end)
+    second = gcal_service.sync_calendar_events(service, events, calendar_id, range_start, range_end)
+    return f"first {first}, re-run {second}"
+
+
+def publish_recurring(service, events, calendar_id):
+    return publish_sync(service, recurrence.group_recurring_events(events), calendar_id)
+
+
+STRATEGIES = {
+    "sequential": publish_sequential,
+    "batch": publish_batch,
+    "sync": publish_sync,
+    "recurring": publish_recurring,
+}
+
+
+def fetch_stats(api_root):
+    with urllib.request.urlopen(api_root + "_stats") as response:
+        return json.loads(response.read())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark calendar publishing against a fake Calendar API.")
+    arg_parser.add_argument("--weeks", type=int, default=13)
+    arg_parser.add_argument("--strategy", choices=sorted(STRATEGIES), action="append",
+                            help="Strategy to run (repeatable). Defaults to all.")
+    arg_parser.add_argument("--concurrency", type=int, default=1, help="Simultaneous imports, each to its own calendar.")
+    arg_parser.add_argument("--latency-ms", type=int, default=20, help="Simulated per-call API latency.")
+    arg_parser.add_argument("--error-rate-429", type=float, default=0.0)
+    arg_parser.add_argument("--error-rate-503", type=float, default=0.0)
+    args = arg_parser.parse_args()
+
+    server, api_root = fake_gcal_server.start_in_background(
+        extra_calendars=args.concurrency, latency_ms=args.latency_ms,
+        error_rate_429=args.error_rate_429, error_rate_503=args.error_rate_503,
+    )
+    gcal_service.API_ROOT = api_root
+    gcal_service.logging.getLogger().setLevel(gcal_service.logging.WARNING)
+    events = synthesise_term(args.weeks)
+    calendar_ids = [f"cal{index}@group.calendar.google.com" for index in range(args.concurrency)]
+    print(f"{len(events)} events over {args.weeks} weeks, {args.concurrency} concurrent import(s), "
+          f"{args.latency_ms} ms latency, 429 rate {args.error_rate_429}, 503 rate {args.error_rate_503}")
+
+    try:
+        for strategy_name in args.strategy or list(STRATEGIES):
+            server.RequestHandlerClass.state.reset(args.concurrency)
+            publish = STRATEGIES[strategy_name]
+
+            def run_import(calendar_id):
+                service = gcal_service.get_calendar_service()
+                return publish(service, events, calendar_id)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                outcomes = list(executor.map(run_import, calendar_ids))
+            elapsed = time.perf_counter() - started
+            stats = fetch_stats(api_root)
+            throughput = len(events) * args.concurrency / elapsed
+            print(f"{strategy_name:<10} {elapsed:7.2f} s  {throughput:8.1f} events/s  "
+                  f"http={stats['http_requests']} api_calls={stats['api_calls']} "
+                  f"429s={stats['injected_429']} 503s={stats['injected_503']}  {outcomes[0]}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
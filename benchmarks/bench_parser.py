@@ -0,0 +1,161 @@
+"""
+Offline benchmark and regression check for the weekly schedule parsers.
+
+Every fixtures/<name>.html page is a weekly schedule page in the portal's layout
+(built by make_fixtures.py, or recorded with --record) and fixtures/<name>.json is
+its golden output:
+    {"week_of": "2025-01-13", "events": [ ...scraper event dicts... ]}
+The goldens are written by make_fixtures.py from its class lists, or by hand for
+recorded pages, never from the parsers being checked.
+
+Usage:
+    python benchmarks/bench_parser.py                  # check + benchmark all parsers
+    python benchmarks/bench_parser.py --parser grid -n 200
+    python benchmarks/bench_parser.py --record 2025-01-13 2025-01-20
+        # log in with MACID_USER/MACID_PASS and save those weeks as new fixtures
+        # (scrub names/student numbers before committing recorded pages)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+import scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def parse_grid(page_html, base_date):
+    return scraper.parse_schedule_html(page_html, base_date)
+
+
+def parse_legacy(page_html, base_date):
+    return scraper.parse_html_to_events(BeautifulSoup(page_html, "html.parser"), base_date)
+
+
+PARSERS = {
+    "grid": parse_grid,
+    "legacy": parse_legacy,
+}
+# Fixtures a parser is known to get wrong; reported, but not counted as a failure
+KNOWN_MISPARSES = {
+    "legacy": {"first_week_sunday_lab"},
+}
+
+
+def load_fixtures():
+    """Returns a list of (name, page_html, golden) tuples, golden being None if missing."""
+    fixtures = []
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if not filename.endswith(".html"):
+            continue
+        name = filename[:-len(".html")]
+        with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+            page_html = f.read()
+        golden = None
+        golden_path = os.path.join(FIXTURES_DIR, f"{name}.json")
+        if os.path.exists(golden_path):
+            with open(golden_path, encoding="utf-8") as f:
+                golden = json.load(f)
+        fixtures.append((name, page_html, golden))
+    return fixtures
+
+
+def _sorted_events(events):
+    return sorted(events, key=lambda e: (e["date"], e["time"], e["course"], e["type"]))
+
+
+def check_parser(parse, fixtures):
+    """Returns a list of fixture names whose parsed output differs from the golden JSON."""
+    mismatches = []
+    for name, page_html, golden in fixtures:
+        if golden is None:
+            continue
+        base_date = datetime.strptime(golden["week_of"], "%Y-%m-%d")
+        if _sorted_events(parse(page_html, base_date)) != _sorted_events(golden["events"]):
+            mismatches.append(name)
+    return mismatches
+
+
+def benchmark_parser(parse, fixtures, iterations):
+    """Returns (pages per second, peak traced memory in bytes) over all fixtures."""
+    pages = [(page_html, datetime.strptime(golden["week_of"], "%Y-%m-%d")) for _, page_html, golden in fixtures if golden]
+
+    tracemalloc.start()
+    for page_html, base_date in pages:
+        parse(page_html, base_date)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for page_html, base_date in pages:
+            parse(page_html, base_date)
+    elapsed = time.perf_counter() - started
+    return (iterations * len(pages)) / elapsed if elapsed else float("inf"), peak_memory
+
+
+def record_fixtures(week_strings):
+    """Logs into the portal and saves the weekly schedule page for each given Monday."""
+    mondays = [datetime.strptime(week, "%Y-%m-%d") for week in week_strings]
+    with scraper.new_driver_session() as driver:
+        scraper.login_to_portal(driver, scraper.MACID, scraper.PASSWORD)
+        scraper.navigate_to_weekly_schedule(driver)
+        fetcher = scraper.create_http_fetcher(driver)
+        if fetcher is None:
+            print("Could not capture the portal session.")
+            return
+        for monday in mondays:
+            name = f"recorded_{monday.strftime('%Y_%m_%d')}"
+            with open(os.path.join(FIXTURES_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+                f.write(fetcher.fetch_week_html(monday))
+            with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump({"week_of": monday.strftime("%Y-%m-%d"), "events": []}, f, indent=2)
+                f.write("\n")
+            print(f"Recorded {name}.html; fill in {name}.json with the classes on the page, read off by hand.")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the weekly schedule parsers on recorded pages.")
+    arg_parser.add_argument("--parser", choices=sorted(PARSERS), action="append",
+                            help="Parser to run (repeatable). Defaults to all.")
+    arg_parser.add_argument("-n", "--iterations", type=int, default=50, help="Passes over the corpus per parser.")
+    arg_parser.add_argument("--record", nargs="+", metavar="MONDAY", help="Record live pages for these weeks (YYYY-MM-DD).")
+    args = arg_parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        return 0
+
+    fixtures = load_fixtures()
+
+    total_bytes = sum(len(page_html) for _, page_html, _ in fixtures)
+    print(f"Corpus: {len(fixtures)} pages, {total_bytes / 1024:.0f} KiB, lxml {'available' if scraper.lxml else 'not installed'}")
+    print(f"{'parser':<8} {'pages/s':>10} {'peak KiB':>10}  correctness")
+
+    exit_code = 0
+    for parser_name in args.parser or sorted(PARSERS):
+        parse = PARSERS[parser_name]
+        mismatches = check_parser(parse, fixtures)
+        pages_per_second, peak_memory = benchmark_parser(parse, fixtures, args.iterations)
+        known = [name for name in mismatches if name in KNOWN_MISPARSES.get(parser_name, ())]
+        unexpected = [name for name in mismatches if name not in known]
+        correctness = "ok" if not unexpected else "MISMATCH: " + ", ".join(unexpected)
+        if known:
+            correctness += f" (known misparse: {', '.join(known)})"
+        print(f"{parser_name:<8} {pages_per_second:>10.1f} {peak_memory / 1024:>10.0f}  {correctness}")
+        if unexpected:
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
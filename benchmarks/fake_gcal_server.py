@@ -0,0 +1,296 @@
+"""
+Local stand-in for the Google Calendar v3 API, for load-testing the import
+pipeline offline and in CI.
+
+Supports the calls MosaicSync makes: calendarList.list, events.insert/list/get/
+patch/update/delete and the batch endpoint, plus injected 429/503 errors and
+latency, and 401s for access tokens listed as rejected. The discovery document is served from googleapiclient's bundled copy
+with its rootUrl pointed at this server.
+
+Run it, then point the app at it with GCAL_API_ROOT:
+    python benchmarks/fake_gcal_server.py --port 8089 --error-rate-429 0.05
+    GCAL_API_ROOT=http://127.0.0.1:8089/ python run.py
+
+GET /_stats returns request counters and POST /_reset clears all events.
+"""
+import argparse
+import email.parser
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+EVENTS_PATH = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$")
+CALENDAR_LIST_PATH = "/calendar/v3/users/me/calendarList"
+DISCOVERY_PATH = "/discovery/v1/apis/calendar/v3/rest"
+BATCH_PATH = "/batch/calendar/v3"
+
+HTTP_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+                409: "Conflict", 410: "Gone", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+def _error_body(code, message, reason):
+    return {"error": {"code": code, "message": message, "errors": [{"reason": reason, "message": message}]}}
+
+
+class FakeCalendarState:
+    """In-memory calendars and events, shared by all request threads."""
+
+    def __init__(self, extra_calendars=0, error_rate_429=0.0, error_rate_503=0.0, latency_ms=0, rejected_tokens=()):
+        self.lock = threading.Lock()
+        self.error_rate_429 = error_rate_429
+        self.error_rate_503 = error_rate_503
+        self.latency_ms = latency_ms
+        # Bearer tokens answered with 401, as Google answers an expired access token
+        self.rejected_tokens = set(rejected_tokens)
+        self.calendars = {}
+        self.stats = {}
+        self.reset(extra_calendars)
+
+    def reset(self, extra_calendars=0):
+        with self.lock:
+            self.calendars = {"primary": {"summary": "Primary", "events": {}}}
+            for index in range(extra_calendars):
+                self.calendars[f"cal{index}@group.calendar.google.com"] = {"summary": f"Calendar {index}", "events": {}}
+            self.stats = {"http_requests": 0, "api_calls": 0, "batches": 0, "injected_429": 0, "injected_503": 0,
+                          "rejected_401": 0}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    def call(self, method, path, query, body):
+        """Executes one API call and returns (status, response dict or None)."""
+        self.count("api_calls")
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        roll = random.random()
+        if roll < self.error_rate_429:
+            self.count("injected_429")
+            return 429, _error_body(429, "Rate Limit Exceeded", "rateLimitExceeded")
+        if roll < self.error_rate_429 + self.error_rate_503:
+            self.count("injected_503")
+            return 503, _error_body(503, "Backend Error", "backendError")
+
+        if path == CALENDAR_LIST_PATH and method == "GET":
+            return self._list_calendars(query)
+        match = EVENTS_PATH.match(path)
+        if not match:
+            return 404, _error_body(404, "Not Found", "notFound")
+        calendar_id = unquote(match.group(1))
+        event_id = unquote(match.group(2)) if match.group(2) else None
+        with self.lock:
+            calendar = self.calendars.get(calendar_id)
+            if calendar is None:
+                return 404, _error_body(404, "Not Found", "notFound")
+            events = calendar["events"]
+            if event_id is None:
+                if method == "POST":
+                    return self._insert(events, body)
+                if method == "GET":
+                    return self._list_events(events, query)
+            else:
+                if event_id in events and events[event_id].get("status") == "cancelled" and method == "DELETE":
+                    # Google answers a second delete of an event with 410
+                    return 410, _error_body(410, "Resource has been deleted", "deleted")
+                if event_id not in events or events[event_id].get("status") == "cancelled":
+                    return 404, _error_body(404, "Not Found", "notFound")
+                if method == "GET":
+                    return 200, events[event_id]
+                if method == "DELETE":
+                    events[event_id]["status"] = "cancelled"
+                    return 204, None
+                if method == "PATCH":
+                    events[event_id].update(body or {})
+                    return 200, events[event_id]
+                if method == "PUT":
+                    events[event_id] = {**(body or {}), "id": event_id, "status": "confirmed"}
+                    return 200, events[event_id]
+        return 400, _error_body(400, "Unsupported request", "badRequest")
+
+    def _list_calendars(self, query):
+        with self.lock:
+            items = [{"kind": "calendar#calendarListEntry", "id": calendar_id, "summary": calendar["summary"],
+                      "primary": calendar_id == "primary"} for calendar_id, calendar in self.calendars.items()]
+        return 200, self._page(items, query, "calendar#calendarList", default_page_size=100)
+
+    @staticmethod
+    def _insert(events, body):
+        event_id = (body or {}).get("id") or uuid.uuid4().hex
+        if event_id in events:
+            return 409, _error_body(409, "The requested identifier already exists.", "duplicate")
+        event = {**(body or {}), "id": event_id, "status": "confirmed", "kind": "calendar#event",
+                 "htmlLink": f"https://calendar.example/event?eid={event_id}"}
+        events[event_id] = event
+        return 200, event
+
+    def _list_events(self, events, query):
+        time_min = query.get("timeMin", [""])[0][:10]
+        time_max = query.get("timeMax", [""])[0][:10]
+        wanted_properties = [prop.split("=", 1) for prop in query.get("privateExtendedProperty", [])]
+        items = []
+        for event in events.values():
+            if event.get("status") == "cancelled":
+                continue
+            start = event.get("start", {})
+            start_date = (start.get("dateTime") or start.get("date") or "")[:10]
+            # Recurring events overlap the range if their series starts before its end
+            if time_max and start_date >= time_max:
+                continue
+            if time_min and start_date < time_min and not event.get("recurrence"):
+                continue
+            private = event.get("extendedProperties", {}).get("private", {})
+            if any(private.get(name) != value for name, value in wanted_properties):
+                continue
+            items.append(event)
+        return 200, self._page(items, query, "calendar#events", default_page_size=250)
+
+    @staticmethod
+    def _page(items, query, kind, default_page_size):
+        page_size = int(query.get("maxResults", [default_page_size])[0])
+        offset = int(query.get("pageToken", ["0"])[0] or 0)
+        page = {"kind": kind, "items": items[offset:offset + page_size]}
+        if offset + page_size < len(items):
+            page["nextPageToken"] = str(offset + page_size)
+        return page
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = b"" if payload is None else (payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8"))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        self.state.count("http_requests")
+        parsed = urlparse(self.path)
+        raw_body = self._read_body()
+
+        if parsed.path == DISCOVERY_PATH:
+            return self._send(200, self._discovery_document())
+        if parsed.path == "/_stats":
+            with self.state.lock:
+                return self._send(200, dict(self.state.stats))
+        if parsed.path == "/_reset" and method == "POST":
+            self.state.reset()
+            return self._send(204, None)
+        if parsed.path == BATCH_PATH and method == "POST":
+            return self._handle_batch(raw_body)
+
+        authorization = self.headers.get("Authorization", "")
+        if authorization.startswith("Bearer ") and authorization[len("Bearer "):] in self.state.rejected_tokens:
+            self.state.count("rejected_401")
+            return self._send(401, _error_body(401, "Invalid Credentials", "authError"))
+
+        body = json.loads(raw_body) if raw_body else None
+        status, payload = self.state.call(method, parsed.path, parse_qs(parsed.query), body)
+        self._send(status, payload)
+
+    def _handle_batch(self, raw_body):
+        self.state.count("batches")
+        message = email.parser.BytesParser().parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode("utf-8") + b"\r\n\r\n" + raw_body
+        )
+        boundary = uuid.uuid4().hex
+        parts = []
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().split("\n", 1)
+            method, target, _ = request_line.split(" ", 2)
+            inner = email.parser.Parser().parsestr(rest)
+            inner_body = inner.get_payload()
+            parsed = urlparse(target)
+            status, payload = self.state.call(
+                method, parsed.path, parse_qs(parsed.query), json.loads(inner_body) if inner_body.strip() else None
+            )
+            content_id = part["Content-ID"].strip()[1:-1]
+            response_body = "" if payload is None else json.dumps(payload)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\nContent-Length: {len(response_body)}\r\n\r\n"
+                f"{response_body}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        self._send(200, "".join(parts).encode("utf-8"), f"multipart/mixed; boundary={boundary}")
+
+    def _discovery_document(self):
+        import googleapiclient
+        documents_dir = os.path.join(os.path.dirname(googleapiclient.__file__), "discovery_cache", "documents")
+        with open(os.path.join(documents_dir, "calendar.v3.json"), encoding="utf-8") as f:
+            document = json.load(f)
+        root_url = f"http://{self.headers['Host']}/"
+        document["rootUrl"] = root_url
+        document["baseUrl"] = root_url + document["servicePath"]
+        document["batchPath"] = BATCH_PATH.lstrip("/")
+        return document
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def make_server(host="127.0.0.1", port=0, **state_options):
+    """Creates (but does not start) a fake server; port 0 picks a free port."""
+    handler = type("BoundFakeCalendarHandler", (FakeCalendarHandler,), {"state": FakeCalendarState(**state_options)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_in_background(**options):
+    """Starts a fake server on a daemon thread and returns (server, api_root)."""
+    server = make_server(**options)
+    threading.Thread(target=server.serve_forever, name="fake-gcal", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Run a local fake Google Calendar v3 API.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8089)
+    arg_parser.add_argument("--extra-calendars", type=int, default=3, help="Secondary calendars to create.")
+    arg_parser.add_argument("--error-rate-429", type=float, default=0.0, help="Fraction of API calls answered with 429.")
+    arg_parser.add_argument("--error-rate-503", type=float, default=0.0, help="Fraction of API calls answered with 503.")
+    arg_parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to every API call.")
+    args = arg_parser.parse_args()
+
+    server = make_server(args.host, args.port, extra_calendars=args.extra_calendars,
+                         error_rate_429=args.error_rate_429, error_rate_503=args.error_rate_503,
+                         latency_ms=args.latency_ms)
+    print(f"Fake Google Calendar API listening on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Builds the weekly schedule pages in fixtures/ and their golden JSON from the class
+lists below. The golden events are written straight from the lists, without going
+through either parser, so bench_parser.py checks the parsers against an
+independent answer; the lists are short enough to check against the pages by eye.
+
+The pages follow the layout of the portal's weekly schedule table, which both
+parsers in scraper.py are written against:
+  - a header row of <th> cells: "Time", then "Monday<br />Jan 13" ... "Sunday";
+  - one row per half hour from 8:00 to 21:30;
+  - the time label of each hour is a PSLEVEL3GRID cell with rowspan="2", so an
+    hour's row has 8 grid cells (label + 7 days) and the half-hour row after it 7;
+  - a class is one cell in its day's column, starting at the half-hour slot its
+    start time falls in, with rowspan = the number of half-hour slots it covers;
+    days that are free in a slot get an empty cell.
+Around the table is PeopleSoft chrome of about the size of a real page (scripts,
+hidden form fields, labels), so parser benchmarks include the cost of skipping it.
+
+    python benchmarks/make_fixtures.py    # rewrites fixtures/<name>.html and <name>.json
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+FIRST_SLOT_MINUTES = 8 * 60
+SLOT_COUNT = 28  # 8:00 to 21:30
+
+# name -> (Monday of the week, [(day, course, section, type, "H:MM - H:MM", location), ...])
+FIXTURES = {
+    "empty_week": ("2025-02-17", []),
+    # The first week of term starts on a Wednesday
+    "first_week": ("2025-01-06", [
+        ("Wednesday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Wednesday", "PHYS 1D03", "C01", "Lecture", "13:30 - 14:10", "JHE 376"),
+        ("Thursday", "CHEM 1E03", "C01", "Lecture", "8:30 - 9:10", "TSH 120"),
+        ("Thursday", "MATH 1ZA3", "T07", "Tutorial", "14:30 - 15:10", "HH 109"),
+        ("Friday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Friday", "PHYS 1D03", "C01", "Lecture", "13:30 - 14:10", "JHE 376"),
+    ]),
+    # The first-week misparse: a Sunday class covering several half-hour rows. The legacy
+    # parser's rowspan carry-over (delayArr) wraps from Sunday into the next row's time
+    # label, so every class after the lab is dated days late; the grid parser is not affected
+    "first_week_sunday_lab": ("2025-01-06", [
+        ("Wednesday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Wednesday", "PHYS 1D03", "C01", "Lecture", "13:30 - 14:10", "JHE 376"),
+        ("Thursday", "CHEM 1E03", "C01", "Lecture", "8:30 - 9:10", "TSH 120"),
+        ("Thursday", "MATH 1ZA3", "T07", "Tutorial", "14:30 - 15:10", "HH 109"),
+        ("Friday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Sunday", "ENG 1P13", "L05", "Lab", "8:30 - 10:20", "ETB 228"),
+    ]),
+    "standard_week": ("2025-01-13", [
+        ("Monday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Monday", "MATH 1ZA3", "C02", "Lecture", "11:30 - 12:10", "MDCL 1305"),
+        ("Monday", "ENG 1D04", "C01", "Lecture", "15:30 - 16:10", "ITB AB102"),
+        ("Tuesday", "CHEM 1E03", "C01", "Lecture", "8:30 - 9:10", "TSH 120"),
+        ("Tuesday", "MATH 1ZA3", "C02", "Lecture", "11:30 - 12:10", "MDCL 1305"),
+        ("Wednesday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Wednesday", "PHYS 1D03", "C01", "Lecture", "13:30 - 14:10", "JHE 376"),
+        ("Thursday", "CHEM 1E03", "C01", "Lecture", "8:30 - 9:10", "TSH 120"),
+        ("Thursday", "MATH 1ZA3", "T07", "Tutorial", "14:30 - 15:10", "HH 109"),
+        ("Friday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Friday", "PHYS 1D03", "C01", "Lecture", "13:30 - 14:10", "JHE 376"),
+    ]),
+    # Three-hour labs that push later cells in their rows to the right
+    "multi_hour_labs": ("2025-01-20", [
+        ("Monday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Monday", "MATH 1ZA3", "C02", "Lecture", "11:30 - 12:10", "MDCL 1305"),
+        ("Tuesday", "MATH 1ZA3", "C02", "Lecture", "11:30 - 12:10", "MDCL 1305"),
+        ("Tuesday", "ENG 1P13", "L05", "Lab", "14:30 - 17:10", "ETB 228"),
+        ("Wednesday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Thursday", "MATH 1ZA3", "T07", "Tutorial", "14:30 - 15:10", "HH 109"),
+        ("Thursday", "ENG 1D04", "L03", "Lab", "18:30 - 20:10", "ITB 237"),
+        ("Friday", "ENG 1P13", "C01", "Lecture", "9:30 - 10:10", "BSB B136"),
+        ("Friday", "CHEM 1E03", "L12", "Laboratory", "14:30 - 17:10", "ABB 217"),
+    ]),
+    # Cells of different lengths covering the same rows, starting on the hour and
+    # the half hour, and classes on Saturday and Sunday
+    "overlapping_rowspans": ("2025-01-27", [
+        ("Monday", "ENG 1P13", "L05", "Lab", "8:30 - 11:10", "ETB 228"),
+        ("Monday", "ENG 1D04", "C01", "Lecture", "11:30 - 12:10", "ITB AB102"),
+        ("Tuesday", "MATH 1ZA3", "C02", "Lecture", "9:30 - 10:40", "MDCL 1305"),
+        ("Wednesday", "CHEM 1E03", "L12", "Laboratory", "8:30 - 11:10", "ABB 217"),
+        ("Thursday", "PHYS 1D03", "T03", "Tutorial", "10:30 - 12:10", "JHE 326H"),
+        ("Friday", "ENG 1P13", "C01", "Core", "8:30 - 12:10", "PGCLL B138"),
+        ("Saturday", "ENG 1D04", "T02", "Tutorial", "9:00 - 9:40", "ITB 137"),
+        ("Sunday", "MATH 1ZA3", "T07", "Tutorial", "20:30 - 21:40", "HH 109"),
+    ]),
+}
+
+
+def _minutes(clock):
+    hours, minutes = clock.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _slots(time_range):
+    """(first half-hour slot index, number of slots) covered by "H:MM - H:MM"."""
+    start, end = (_minutes(part) for part in time_range.split("-"))
+    first = (start - FIRST_SLOT_MINUTES) // 30
+    last = (end - 1 - FIRST_SLOT_MINUTES) // 30
+    return first, last - first + 1
+
+
+def schedule_table(monday, classes):
+    starts = {}  # (slot, day index) -> class
+    covered = set()  # (slot, day index) taken by a class that started in an earlier slot
+    for entry in classes:
+        day_index = DAYS.index(entry[0])
+        first, count = _slots(entry[4])
+        if first < 0 or first + count > SLOT_COUNT:
+            raise ValueError(f"{entry} is outside the schedule hours")
+        for slot in range(first, first + count):
+            if (slot, day_index) in starts or (slot, day_index) in covered:
+                raise ValueError(f"{entry} overlaps another class on {entry[0]}")
+            if slot != first:
+                covered.add((slot, day_index))
+        starts[(first, day_index)] = entry
+
+    header = "".join(
+        f'<th class="SSSWEEKLYDAYHEADER" scope="col">{day}<br />{(monday + timedelta(days=index)).strftime("%b %d")}</th>'
+        for index, day in enumerate(DAYS)
+    )
+    lines = [
+        '<table cellspacing="0" cellpadding="2" width="100%" class="PSLEVEL3GRID" id="WEEKLY_SCHED_HTMLAREA">',
+        f'<tr><th class="SSSWEEKLYDAYHEADER" scope="col">Time</th>{header}</tr>',
+    ]
+    for slot in range(SLOT_COUNT):
+        row_class = "PSLEVEL3GRIDODDROW" if slot // 2 % 2 == 0 else "PSLEVEL3GRIDEVENROW"
+        cells = []
+        if slot % 2 == 0:
+            minutes = FIRST_SLOT_MINUTES + slot * 30
+            cells.append(f'<td class="{row_class}" rowspan="2"><span class="SSSTEXTWEEKLYTIME">'
+                         f'{minutes // 60}:{minutes % 60:02d}</span></td>')
+        for day_index in range(len(DAYS)):
+            if (slot, day_index) in covered:
+                continue
+            entry = starts.get((slot, day_index))
+            if entry is None:
+                cells.append(f'<td class="{row_class}" rowspan="1">&nbsp;</td>')
+                continue
+            _, course, section, class_type, time_range, location = entry
+            cells.append(f'<td class="{row_class}" rowspan="{_slots(time_range)[1]}"><span class="SSSTEXTWEEKLY">'
+                         f'{course} - {section}<br />{class_type}<br />{time_range}<br />{location}</span></td>')
+        lines.append(f"<tr>{''.join(cells)}</tr>")
+    lines.append("</table>")
+    return "\n".join(lines)
+
+
+def page(monday, classes):
+    sunday = monday + timedelta(days=6)
+    chrome = [
+        "<!DOCTYPE html>",
+        '<html dir="ltr" lang="en"><head><title>My Weekly Schedule</title>',
+        '<link rel="stylesheet" type="text/css" href="/cs/prcsprd/cache/PSSTYLEDEF_TANGERINE_1.css" />',
+        '<script language="JavaScript">',
+    ]
+    chrome += [
+        f"var ptsg_{n} = 'PT_PAGE_SCRIPT_{n:04d}'; function ptFn{n}(a,b) "
+        f"{{ return submitAction_win0(document.win0, 'ICAction_{n}'); }}"
+        for n in range(400)
+    ]
+    chrome.append("</script>")
+    chrome += [
+        f'<input type="hidden" name="ICHidden{n}" id="ICHidden{n}" value="{"x" * 40}" />' for n in range(300)
+    ]
+    chrome.append('<div class="PSPAGECONTAINER">' + "".join(
+        f'<div class="PSTEXT" id="win0div{n}"><span class="PSEDITBOX_DISPONLY">Label {n}</span></div>' for n in range(300)
+    ) + "</div>")
+    chrome += [
+        '</head><body class="PSPAGE">',
+        '<form name="win0" method="post" action="/psc/prcsprd/EMPLOYEE/SA/c/SA_LEARNER_SERVICES.SSR_SSENRL_SCHD_W.GBL" autocomplete="off">',
+        '<input type="hidden" name="ICType" id="ICType" value="Panel" />',
+        '<input type="hidden" name="ICStateNum" id="ICStateNum" value="5" />',
+        '<input type="hidden" name="ICAction" id="ICAction" value="None" />',
+        '<input type="hidden" name="ICSID" id="ICSID" value="fixtureSID" />',
+        '<div id="WAIT_win0" style="display:none"><img src="/cs/prcsprd/cache/PT_PROCESSING_1.gif" /></div>',
+        f'<span class="PSEDITBOX_DISPONLY">Week of {monday.strftime("%d/%m/%Y")} - {sunday.strftime("%d/%m/%Y")}</span>',
+        f'<input type="text" name="DERIVED_CLASS_S_START_DT" id="DERIVED_CLASS_S_START_DT" value="{monday.strftime("%d/%m/%Y")}" class="PSEDITBOX" />',
+        "<a id=\"DERIVED_CLASS_S_SSR_REFRESH_CAL$8$\" href=\"javascript:submitAction_win0(document.win0,'DERIVED_CLASS_S_SSR_REFRESH_CAL$8$');\">Refresh Calendar</a>",
+        schedule_table(monday, classes),
+        "</form></body></html>",
+    ]
+    return "\n".join(chrome) + "\n"
+
+
+def golden_events(monday, classes):
+    """The scraper event dicts the page for classes should parse to, in bench_parser's order."""
+    events = [
+        {
+            "week_of": monday.strftime("%Y-%m-%d"),
+            "date": (monday + timedelta(days=DAYS.index(day))).strftime("%Y-%m-%d"),
+            "course": course,
+            "type": class_type,
+            "time": time_range,
+            "location": location,
+        }
+        for day, course, _, class_type, time_range, location in classes
+    ]
+    return sorted(events, key=lambda e: (e["date"], e["time"], e["course"], e["type"]))
+
+
+def main():
+    for name, (week_of, classes) in FIXTURES.items():
+        monday = datetime.strptime(week_of, "%Y-%m-%d")
+        with open(os.path.join(FIXTURES_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(page(monday, classes))
+        with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"week_of": week_of, "events": golden_events(monday, classes)}, f, indent=2)
+            f.write("\n")
+        print(f"Wrote {name}.html and {name}.json ({len(classes)} classes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Bulk import: scrape and publish the schedules of many accounts in one run,
+without the web interface.
+
+    python bulk_import.py accounts.csv --output-dir bulk_results
+
+The manifest is a CSV file with a header row, or JSON Lines (.jsonl) with one
+object per line. Each row describes one account:
+    macid         MacID to log in with
+    password_env  name of the environment variable holding that account's password
+    start_date    first day to import (YYYY-MM-DD)
+    end_date      last day to import (YYYY-MM-DD)
+    calendar_id   target calendar (optional, default "primary")
+    token_file    Google token authorizing that calendar (optional, default token.json)
+
+Accounts are scraped by a bounded pool of scraper workers sharing one pool of
+headless browsers. Each scraped schedule is handed to a bounded pool of publisher
+workers, so publishing one account overlaps with scraping the next. For every
+account the output directory gets <macid>.jsonl (the scraped events) and
+<macid>.json (the outcome, counts and stage timings). summary.json covers the whole
+run. Passwords are never written anywhere.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from config import Config
+import gcal_service
+import metrics
+import recurrence
+import scraper
+from week_cache import WeekCache
+from app.driver_pool import DriverPool
+
+MANIFEST_FIELDS = ("macid", "password_env", "start_date", "end_date", "calendar_id", "token_file")
+REQUIRED_FIELDS = ("macid", "password_env", "start_date", "end_date")
+
+
+def load_manifest(path):
+    """
+    Reads and validates a CSV or JSONL manifest. Returns a list of account dicts
+    with parsed dates; raises ValueError naming the offending row.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            rows = []
+            for number, line in enumerate((line for line in f if line.strip()), start=1):
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    raise ValueError(f"Manifest row {number}: not valid JSON.")
+        else:
+            rows = list(csv.DictReader(f))
+
+    accounts = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise ValueError(f"Manifest row {number}: expected an object with the manifest fields.")
+        row = {field: str(row.get(field) or "").strip() for field in MANIFEST_FIELDS}
+        missing = [field for field in REQUIRED_FIELDS if not row[field]]
+        if missing:
+            raise ValueError(f"Manifest row {number}: missing {', '.join(missing)}.")
+        if row["macid"].lower() in seen:
+            raise ValueError(f"Manifest row {number}: {row['macid']} is listed more than once.")
+        seen.add(row["macid"].lower())
+        try:
+            start_date = datetime.strptime(row["start_date"], "%Y-%m-%d")
+            end_date = datetime.strptime(row["end_date"], "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"Manifest row {number}: dates must be YYYY-MM-DD.")
+        if end_date < start_date:
+            raise ValueError(f"Manifest row {number}: end_date is before start_date.")
+        accounts.append({
+            "macid": row["macid"],
+            "password_env": row["password_env"],
+            "start_date": start_date,
+            "end_date": end_date,
+            "calendar_id": row["calendar_id"] or "primary",
+            "token_file": row["token_file"] or None,
+        })
+    return accounts
+
+
+class BulkImport:
+    """One bulk run: a scraper pool feeding a publisher pool, writing a result per account."""
+
+    def __init__(self, accounts, output_dir, scrape_workers=2, publish_workers=2, sessions_per_account=1,
+                 import_mode=Config.IMPORT_MODE, collapse=Config.COLLAPSE_RECURRING_EVENTS,
+                 excluded_dates=Config.EXCLUDED_DATES, week_cache=None, dry_run=False):
+        self.accounts = accounts
+        self.output_dir = output_dir
+        self.scrape_workers = scrape_workers
+        self.publish_workers = publish_workers
+        self.sessions_per_account = sessions_per_account
+        self.import_mode = import_mode
+        self.collapse = collapse
+        self.excluded_dates = excluded_dates
+        self.week_cache = week_cache
+        self.dry_run = dry_run
+        # Enough browsers for every scraper worker's sessions, and no more
+        self.driver_pool = DriverPool(
+            size=scrape_workers * sessions_per_account,
+            max_uses=Config.DRIVER_POOL_MAX_USES,
+            headless=Config.SCRAPER_HEADLESS,
+            lean=Config.SCRAPER_LEAN_DRIVER,
+            blocked_resources=Config.SCRAPER_BLOCK_RESOURCES,
+        )
+
+    def _file_name(self, account, extension):
+        safe_macid = "".join(c if c.isalnum() or c in "-_." else "_" for c in account["macid"].lower())
+        return os.path.join(self.output_dir, f"{safe_macid}.{extension}")
+
+    def new_result(self, account):
+        return {
+            "macid": account["macid"],
+            "start_date": account["start_date"].strftime("%Y-%m-%d"),
+            "end_date": account["end_date"].strftime("%Y-%m-%d"),
+            "calendar_id": account["calendar_id"],
+            "status": "pending",
+            "message": "",
+            "events_scraped": 0,
+            "failed_weeks": [],
+            "counts": None,
+            "timings": metrics.JobTimings(),
+            "started_at": time.time(),
+        }
+
+    def scrape(self, account, result):
+        """Scrapes one account and writes its events file. Returns the events, or None on failure."""
+        with metrics.track_job(result["timings"]):
+            password = os.environ.get(account["password_env"])
+            if not password:
+                result.update(status="error", message=f"Environment variable {account['password_env']} is not set.")
+                return None
+            logging.info(f"Scraping {account['macid']} ({result['start_date']} to {result['end_date']}).")
+            failed_weeks = []
+            try:
+                events = scraper.scrape_weeks_parallel(
+                    account["macid"],
+                    password,
+                    scraper.week_mondays(account["start_date"], account["end_date"]),
+                    max_workers=self.sessions_per_account,
+                    fetch_mode=Config.SCRAPER_FETCH_MODE,
+                    driver_session=self.driver_pool.lease,
+                    week_cache=self.week_cache,
+                    extract_mode=Config.SCRAPER_EXTRACT_MODE,
+                    failed_weeks=failed_weeks,
+                )
+            except Exception as e:
+                logging.error(f"Scraping failed for {account['macid']}: {e}")
+                result.update(status="error", message=f"Error during scraping: {e}")
+                return None
+
+        with scraper.ScheduleWriter(self._file_name(account, "jsonl"), "jsonl") as writer:
+            writer.write_week(events)
+        result["events_scraped"] = len(events)
+        result["failed_weeks"] = [monday.strftime("%Y-%m-%d") for monday in failed_weeks]
+        if failed_weeks and len(failed_weeks) == len(scraper.week_mondays(account["start_date"], account["end_date"])):
+            result.update(status="error", message="None of the requested weeks could be scraped.")
+            return None
+        return events
+
+    def publish(self, account, result, events):
+        """Publishes one account's events to its calendar and records the outcome in result."""
+        with metrics.track_job(result["timings"]):
+            if not events:
+                result.update(status="complete_with_warnings" if result["failed_weeks"] else "complete_with_info",
+                              message="No schedule data found for the given dates." + self._failed_weeks_note(result))
+                return
+            if self.dry_run:
+                result.update(status="complete", message=f"Dry run: scraped {len(events)} events, nothing published.")
+                return
+            if self.collapse:
+                events = recurrence.group_recurring_events(events, self.excluded_dates,
+                                                           failed_weeks=result["failed_weeks"])
+
+            if account["token_file"]:
+                service = gcal_service.get_calendar_service_for_token(account["token_file"])
+            else:
+                service = gcal_service.get_calendar_service()
+            if not service:
+                result.update(status="error", message="Could not connect to Google Calendar.")
+                return
+
+            mondays = scraper.week_mondays(account["start_date"], account["end_date"])
+            range_start = mondays[0].strftime("%Y-%m-%d")
+            range_end = (mondays[-1] + timedelta(days=6)).strftime("%Y-%m-%d")
+            if self.import_mode == "sync":
+                counts = gcal_service.sync_calendar_events(service, events, account["calendar_id"], range_start, range_end,
+                                                           failed_weeks=result["failed_weeks"])
+                if counts is None:
+                    result.update(status="error", message="Could not read existing events from Google Calendar.")
+                    return
+            else:
+                created = gcal_service.create_calendar_events_batch(service, events, account["calendar_id"])
+                created_count = sum(1 for outcome in created if outcome["created"])
+                counts = {"inserted": created_count, "updated": 0, "deleted": 0, "unchanged": 0,
+                          "failed": len(created) - created_count}
+
+        succeeded = counts["inserted"] + counts["updated"] + counts["deleted"] + counts["unchanged"]
+        if succeeded == 0 and counts["failed"] > 0:
+            status = "error"
+        elif counts["failed"] > 0 or result["failed_weeks"]:
+            status = "complete_with_warnings"
+        else:
+            status = "complete"
+        result.update(
+            status=status,
+            counts=counts,
+            message=(f"{counts['inserted']} added, {counts['updated']} updated, {counts['deleted']} removed, "
+                     f"{counts['unchanged']} unchanged. Failed: {counts['failed']}." + self._failed_weeks_note(result)),
+        )
+
+    @staticmethod
+    def _failed_weeks_note(result):
+        if not result["failed_weeks"]:
+            return ""
+        return (f" {len(result['failed_weeks'])} week(s) could not be scraped and were left unchanged: "
+                f"{', '.join(result['failed_weeks'])}.")
+
+    def write_result(self, account, result):
+        result["duration_seconds"] = round(time.time() - result.pop("started_at"), 3)
+        result["timings"] = result["timings"].snapshot()
+        with open(self._file_name(account, "json"), "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        logging.info(f"{account['macid']}: {result['status']} - {result['message']}")
+
+    def run(self):
+        """Imports every account and returns the list of results (also written to summary.json)."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        results = {account["macid"]: self.new_result(account) for account in self.accounts}
+        started = time.time()
+        try:
+            with ThreadPoolExecutor(self.scrape_workers, thread_name_prefix="bulk-scrape") as scrapers, \
+                    ThreadPoolExecutor(self.publish_workers, thread_name_prefix="bulk-publish") as publishers:
+                scrape_futures = {
+                    scrapers.submit(self.scrape, account, results[account["macid"]]): account
+                    for account in self.accounts
+                }
+                publish_futures = {}
+                # Hand each schedule to a publisher as soon as it is scraped
+                for future in as_completed(scrape_futures):
+                    account = scrape_futures[future]
+                    result = results[account["macid"]]
+                    try:
+                        events = future.result()
+                    except Exception as e:
+                        logging.error(f"Scraping failed for {account['macid']}: {e}")
+                        result.update(status="error", message=f"Error during scraping: {e}")
+                        events = None
+                    if events is None:
+                        self.write_result(account, result)
+                        continue
+                    publish_futures[publishers.submit(self.publish, account, result, events)] = account
+                for future in as_completed(publish_futures):
+                    account = publish_futures[future]
+                    result = results[account["macid"]]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logging.error(f"Publishing failed for {account['macid']}: {e}")
+                        result.update(status="error", message=f"Error during calendar import: {e}")
+                    self.write_result(account, result)
+        finally:
+            self.driver_pool.shutdown()
+
+        ordered = [results[account["macid"]] for account in self.accounts]
+        statuses = {}
+        for result in ordered:
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        summary = {
+            "accounts": len(ordered),
+            "statuses": statuses,
+            "duration_seconds": round(time.time() - started, 3),
+            "results": [
+                {field: result[field] for field in ("macid", "status", "message", "events_scraped", "failed_weeks",
+                                                   "duration_seconds")}
+                for result in ordered
+            ],
+        }
+        with open(os.path.join(self.output_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return ordered
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Import the schedules of many accounts listed in a manifest.")
+    arg_parser.add_argument("manifest", help="CSV (with header) or JSONL file of accounts.")
+    arg_parser.add_argument("-o", "--output-dir", default="bulk_results", help="Where result files are written.")
+    arg_parser.add_argument("--scrape-workers", type=int, default=2, help="Accounts scraped at once.")
+    arg_parser.add_argument("--publish-workers", type=int, default=2, help="Accounts published at once.")
+    arg_parser.add_argument("--sessions-per-account", type=int, default=1,
+                            help="Parallel portal sessions per account (max 4).")
+    arg_parser.add_argument("--mode", choices=("sync", "insert"), default=Config.IMPORT_MODE,
+                            help="sync (no duplicates on re-import) or insert.")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Scrape and write events files, but publish nothing.")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        accounts = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not read manifest: {e}")
+        return 2
+    if not accounts:
+        logging.error("The manifest lists no accounts.")
+        return 2
+
+    week_cache = None
+    if Config.WEEK_CACHE_DIR:
+        week_cache = WeekCache(Config.WEEK_CACHE_DIR, ttl=Config.WEEK_CACHE_TTL, max_entries=Config.WEEK_CACHE_MAX_ENTRIES)
+    bulk_import = BulkImport(
+        accounts,
+        args.output_dir,
+        scrape_workers=max(1, args.scrape_workers),
+        publish_workers=max(1, args.publish_workers),
+        sessions_per_account=max(1, min(args.sessions_per_account, scraper.MAX_WORKERS_LIMIT)),
+        import_mode=args.mode,
+        week_cache=week_cache,
+        dry_run=args.dry_run,
+    )
+    results = bulk_import.run()
+
+    failed = [result for result in results if result["status"] == "error"]
+    logging.info(f"Bulk import finished: {len(results) - len(failed)}/{len(results)} accounts succeeded. "
+                 f"Summary written to {os.path.join(args.output_dir, 'summary.json')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
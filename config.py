@@ -11,3 +11,57 @@ class Config:
     # For example, path to credentials.json if not in root, or default start/end dates
     CREDENTIALS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'credentials.json')
     TOKEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'token.json')
+    # 'http' fetches each week with a direct form POST after logging in with the browser;
+    # 'browser' clicks through every week in Chrome
+    SCRAPER_FETCH_MODE = os.environ.get('SCRAPER_FETCH_MODE', 'http').lower()
+    # How weeks scraped in the browser are read: 'script' extracts just the schedule cells in the
+    # page; 'page_source' downloads the whole page and parses it in Python
+    SCRAPER_EXTRACT_MODE = os.environ.get('SCRAPER_EXTRACT_MODE', 'script').lower()
+    # Number of logged-in portal sessions used to scrape weeks in parallel (capped at 4)
+    SCRAPER_MAX_WORKERS = int(os.environ.get('SCRAPER_MAX_WORKERS', '2'))
+    # Pool of headless browsers reused across imports. Size it to at least
+    # SCRAPER_MAX_WORKERS times the number of imports expected to run at once.
+    SCRAPER_HEADLESS = os.environ.get('SCRAPER_HEADLESS', 'true').lower() == 'true'
+    # Lean browser profile (no extensions/GPU, small window, eager page loads) that also skips
+    # downloading the comma-separated resource types in SCRAPER_BLOCK_RESOURCES
+    SCRAPER_LEAN_DRIVER = os.environ.get('SCRAPER_LEAN_DRIVER', 'true').lower() == 'true'
+    SCRAPER_BLOCK_RESOURCES = [t.strip().lower() for t in os.environ.get('SCRAPER_BLOCK_RESOURCES', 'image,stylesheet,font,media').split(',') if t.strip()]
+    DRIVER_POOL_SIZE = int(os.environ.get('DRIVER_POOL_SIZE', '4'))
+    DRIVER_POOL_MAX_USES = int(os.environ.get('DRIVER_POOL_MAX_USES', '20'))
+    DRIVER_POOL_PREWARM = os.environ.get('DRIVER_POOL_PREWARM', 'true').lower() == 'true'
+    # 'sync' updates the calendar to match the scraped schedule (no duplicates on re-import);
+    # 'insert' always creates new events
+    IMPORT_MODE = os.environ.get('IMPORT_MODE', 'sync').lower()
+    # 'batch' sends Calendar API changes through googleapiclient batch requests; 'async' sends them
+    # concurrently from one shared asyncio loop (needs aiohttp; falls back to 'batch' without it)
+    GCAL_PUBLISHER = os.environ.get('GCAL_PUBLISHER', 'batch').lower()
+    # Collapse repeating weekly classes into one recurring calendar event each
+    COLLAPSE_RECURRING_EVENTS = os.environ.get('COLLAPSE_RECURRING_EVENTS', 'true').lower() == 'true'
+    # Comma-separated YYYY-MM-DD dates (holidays, reading week) to leave out of recurring events
+    EXCLUDED_DATES = [d.strip() for d in os.environ.get('EXCLUDED_DATES', '').split(',') if d.strip()]
+    # Imports run at once (each uses up to SCRAPER_MAX_WORKERS pooled browsers);
+    # further imports wait in a queue of IMPORT_QUEUE_SIZE and are turned away beyond that
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '2'))
+    IMPORT_QUEUE_SIZE = int(os.environ.get('IMPORT_QUEUE_SIZE', '10'))
+    # Where import progress and job state (one import per MacID, cancel requests) are
+    # kept: 'memory' (this process only, so run a single server process) or 'sqlite'
+    # (survives restarts and is shared by several worker processes, e.g. gunicorn -w 4)
+    PROGRESS_STORE = os.environ.get('PROGRESS_STORE', 'memory').lower()
+    PROGRESS_DB_PATH = os.environ.get('PROGRESS_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'progress.db')
+    # Seconds a finished (or abandoned) import's progress is kept
+    PROGRESS_TTL = int(os.environ.get('PROGRESS_TTL', '3600'))
+    PROGRESS_MAX_ENTRIES = int(os.environ.get('PROGRESS_MAX_ENTRIES', '1000'))
+    # Scraped weeks and created events are checkpointed here so a failed import resumes
+    # on retry; set CHECKPOINT_DIR to an empty value to disable
+    CHECKPOINT_DIR = os.environ.get('CHECKPOINT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints'))
+    CHECKPOINT_MAX_AGE = int(os.environ.get('CHECKPOINT_MAX_AGE', str(24 * 3600)))
+    # Parsed weeks, keyed by MacID and week, with the hash of their schedule table. Unchanged
+    # weeks are not re-parsed and, in sync mode, not re-synced; set WEEK_CACHE_DIR empty to disable
+    WEEK_CACHE_DIR = os.environ.get('WEEK_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'week_cache'))
+    WEEK_CACHE_TTL = int(os.environ.get('WEEK_CACHE_TTL', str(7 * 24 * 3600)))
+    WEEK_CACHE_MAX_ENTRIES = int(os.environ.get('WEEK_CACHE_MAX_ENTRIES', '500'))
+    # Publish each week while later weeks are still being scraped. Only used when
+    # COLLAPSE_RECURRING_EVENTS is off, since collapsing needs the whole term first;
+    # with the default COLLAPSE_RECURRING_EVENTS=true, imports scrape everything, then publish.
+    PIPELINE_IMPORTS = os.environ.get('PIPELINE_IMPORTS', 'true').lower() == 'true'
+    PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '4'))
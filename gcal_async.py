@@ -0,0 +1,336 @@
+"""
+Asynchronous Google Calendar publisher.
+
+googleapiclient requests block a thread each, so every running import holds
+threads that mostly wait on Google. This publisher talks to the Calendar v3 REST
+endpoints with aiohttp instead: one event loop on a background thread, shared by
+every import, sends requests over a pooled keep-alive connection with at most
+GCAL_ASYNC_CONCURRENCY requests in flight and a timeout per request.
+
+Requests share gcal_ratelimit's token bucket and retry policy with the batch
+publisher in gcal_service, a 401 refreshes the access token and retries once, and the two produce the same results, so ImportTask
+can use either (GCAL_PUBLISHER=batch|async). aiohttp is optional; without it
+get_publisher() returns None and imports keep using the batch publisher.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import datetime
+import logging
+import os
+import threading
+import time
+from urllib.parse import quote
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional; imports fall back to the batch publisher
+    aiohttp = None
+
+import gcal_ratelimit
+import gcal_service
+import metrics
+
+DEFAULT_API_ROOT = "https://www.googleapis.com/"
+MAX_CONCURRENCY = int(os.environ.get("GCAL_ASYNC_CONCURRENCY", "10"))
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("GCAL_ASYNC_TIMEOUT", "30"))
+# How often the calling thread reports progress and checks its callbacks while the loop works
+POLL_INTERVAL_SECONDS = 0.25
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+class _PublishJob:
+    """Progress of one publish call, handed from the event loop back to the calling thread."""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.created = []  # (scraped event, created event) not yet passed to on_created
+        self.lock = threading.Lock()
+
+    def request_finished(self, created=None):
+        with self.lock:
+            self.done += 1
+            if created is not None:
+                self.created.append(created)
+
+    def take(self):
+        with self.lock:
+            created, self.created = self.created, []
+            return self.done, created
+
+
+class AsyncCalendarPublisher:
+    """Publishes events from a shared asyncio loop; the public methods block like gcal_service's."""
+
+    def __init__(self, concurrency=MAX_CONCURRENCY, timeout=REQUEST_TIMEOUT_SECONDS):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._session = None
+        self._semaphore = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="gcal-async", daemon=True)
+        self._thread.start()
+
+    async def _get_session(self):
+        # Created on the loop, since aiohttp sessions are bound to the loop that made them
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    @staticmethod
+    def _api_base():
+        return (gcal_service.API_ROOT or DEFAULT_API_ROOT).rstrip("/") + "/calendar/v3"
+
+    @staticmethod
+    def _auth_headers():
+        """Bearer header from gcal_service's cached credentials ({} for a local API, None if unauthorized)."""
+        if gcal_service.API_ROOT:
+            return {}
+        creds = gcal_service.get_credentials()
+        if creds is None or not creds.token:
+            return None
+        return {"Authorization": f"Bearer {creds.token}"}
+
+    @staticmethod
+    def _refreshed_auth_header(auth_header):
+        """The bearer header after refreshing the token the API rejected, or None. Blocks; run off the loop."""
+        creds = gcal_service.refresh_credentials(auth_header[len("Bearer "):])
+        if creds is None or not creds.token:
+            return None
+        return f"Bearer {creds.token}"
+
+    def _run(self, coroutine, job, progress_callback=None, on_created=None):
+        """
+        Runs coroutine on the loop and waits for it, calling progress_callback and
+        on_created from this thread. If a callback raises (e.g. the import was
+        cancelled) the outstanding requests are cancelled and the exception re-raised.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        reported = -1
+        try:
+            while True:
+                try:
+                    result = future.result(timeout=POLL_INTERVAL_SECONDS)
+                    finished = True
+                except concurrent.futures.TimeoutError:
+                    finished = False
+                done, created = job.take()
+                if on_created:
+                    for scraped_event, created_event in created:
+                        on_created(scraped_event, created_event)
+                if progress_callback and done != reported:
+                    reported = done
+                    progress_callback(done, job.total)
+                if finished:
+                    return result
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def _request(self, method, path, headers, params=None, body=None, insert_id=None,
+                       max_retries=gcal_ratelimit.MAX_RETRIES):
+        """
+        Sends one API request, throttled and retried like gcal_ratelimit.execute_with_retry.
+        A 401 refreshes the access token in headers, which the publish call's other
+        requests share, and is retried once. Returns (response dict, None) or (None, error message).
+        """
+        session = await self._get_session()
+        url = self._api_base() + path
+        stage = f"gcal_async_{method.lower()}"
+        attempt = 0
+        auth_refreshed = False
+        while True:
+            wait = gcal_ratelimit.get_bucket().reserve()
+            if wait > 0:
+                gcal_ratelimit.record("throttle_wait_seconds", wait)
+                await asyncio.sleep(wait)
+            gcal_ratelimit.record("requests")
+
+            status, payload, message = None, None, None
+            # Kept to tell on a 401 whether another request has refreshed the token since
+            sent_auth = headers.get("Authorization")
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.request(method, url, params=params, json=body, headers=headers) as response:
+                        status = response.status
+                        if status != 204:
+                            payload = await response.json(content_type=None)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    message = f"{type(e).__name__}: {e}"
+                finally:
+                    metrics.observe(stage, time.perf_counter() - started)
+
+            if status is not None and 200 <= status < 300:
+                return payload or {}, None
+            if insert_id and attempt > 0 and status == 409:
+                # An earlier attempt of this insert went through
+                return {"id": insert_id}, None
+            if status == 401 and not auth_refreshed and sent_auth:
+                auth_refreshed = True
+                refreshed = await self._loop.run_in_executor(None, self._refreshed_auth_header, sent_auth)
+                if refreshed:
+                    # Concurrent requests may have refreshed it already; either way the header is current now
+                    headers["Authorization"] = refreshed
+                    logging.info(f"Calendar API {method} returned 401; retrying with a refreshed access token.")
+                    continue
+
+            reasons = ()
+            if status is not None:
+                message = f"<HttpError {status}>"
+            if isinstance(payload, dict):
+                error = payload.get("error", {})
+                message = f"<HttpError {status}: {error.get('message', '')}>"
+                reasons = {detail.get("reason") for detail in error.get("errors", []) if isinstance(detail, dict)}
+            # Connection errors and timeouts (no status) are as transient as a 503
+            retryable = status is None or gcal_ratelimit.is_retryable_status(status, reasons)
+            if attempt >= max_retries or not retryable:
+                gcal_ratelimit.record("failures")
+                return None, message
+            delay = gcal_ratelimit.backoff_delay(attempt)
+            gcal_ratelimit.record("retries")
+            gcal_ratelimit.record("backoff_wait_seconds", delay)
+            logging.warning(f"Calendar API {method} returned {status or message}; retrying (attempt {attempt + 1}/{max_retries}).")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _events_path(calendar_id, event_id=None):
+        path = f"/calendars/{quote(calendar_id, safe='')}/events"
+        if event_id:
+            path += f"/{quote(event_id, safe='')}"
+        return path
+
+    async def _create_events(self, job, headers, scraped_events, calendar_id, results):
+        async def insert(index, event_body):
+            response, error = await self._request(
+                "POST", self._events_path(calendar_id), headers, body=event_body, insert_id=event_body["id"]
+            )
+            results[index]["created"] = response
+            results[index]["error"] = error
+            job.request_finished((scraped_events[index], response) if response else None)
+
+        inserts = []
+        for index, event_data in enumerate(scraped_events):
+            # Stamp the sync key even on plain inserts so a later sync recognises these events
+            event_body = gcal_service.build_sync_event_body(event_data)
+            if event_body:
+                event_body["id"] = gcal_ratelimit.new_event_id()
+                inserts.append(insert(index, event_body))
+            else:
+                results[index]["error"] = "Missing or invalid date/time."
+                job.request_finished()
+        await asyncio.gather(*inserts)
+
+    def create_calendar_events(self, scraped_events, calendar_id='primary', progress_callback=None, on_created=None):
+        """Same as gcal_service.create_calendar_events_batch, sending the inserts concurrently."""
+        results = [{"event": event_data, "created": None, "error": None} for event_data in scraped_events]
+        headers = self._auth_headers()
+        if headers is None:
+            logging.error("Calendar credentials are not available.")
+            for result in results:
+                result["error"] = "Calendar credentials are not available."
+            return results
+
+        job = _PublishJob(len(results))
+        self._run(self._create_events(job, headers, scraped_events, calendar_id, results), job,
+                  progress_callback, on_created)
+        created_count = sum(1 for result in results if result["created"])
+        logging.info(f"Async insert finished: {created_count}/{len(results)} events created. API metrics: {gcal_ratelimit.get_metrics()}")
+        return results
+
+    async def _list_synced_events(self, headers, calendar_id, time_min, time_max):
+        events = []
+        params = {
+            "timeMin": time_min,
+            "timeMax": time_max,
+            "privateExtendedProperty": f"{gcal_service.SYNC_MARKER_PROPERTY}=1",
+            "singleEvents": "false",
+            "maxResults": "2500",
+        }
+        while True:
+            response, error = await self._request("GET", self._events_path(calendar_id), headers, params=params)
+            if error:
+                logging.error(f"An error occurred listing existing events: {error}")
+                return None
+            events.extend(response.get("items", []))
+            if not response.get("nextPageToken"):
+                return events
+            params = {**params, "pageToken": response["nextPageToken"]}
+
+    async def _sync(self, job, headers, scraped_events, calendar_id, range_start, range_end, failed_weeks):
+        # Pad the query by a day on each side; compute_sync_plan filters on the exact dates
+        time_min = (datetime.datetime.strptime(range_start, "%Y-%m-%d") - datetime.timedelta(days=1)).strftime("%Y-%m-%dT00:00:00Z")
+        time_max = (datetime.datetime.strptime(range_end, "%Y-%m-%d") + datetime.timedelta(days=2)).strftime("%Y-%m-%dT00:00:00Z")
+        existing_events = await self._list_synced_events(headers, calendar_id, time_min, time_max)
+        if existing_events is None:
+            return None
+
+        plan = gcal_service.compute_sync_plan(scraped_events, existing_events, range_start, range_end, failed_weeks)
+        logging.info(
+            f"Sync plan for {calendar_id}: {len(plan['insert'])} to insert, {len(plan['update'])} to update, "
+            f"{len(plan['delete'])} to delete, {plan['unchanged']} unchanged."
+        )
+        job.total = len(plan["insert"]) + len(plan["update"]) + len(plan["delete"])
+        summary = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": plan["unchanged"], "failed": len(plan["invalid"])}
+
+        async def send(counter, method, path, body=None, insert_id=None):
+            _, error = await self._request(method, path, headers, body=body, insert_id=insert_id)
+            if error and counter == "deleted" and error.startswith(("<HttpError 404", "<HttpError 410")):
+                error = None  # Already gone, which is what a delete wants
+            if error:
+                logging.error(f"Sync {method} {path} failed: {error}")
+                summary["failed"] += 1
+            else:
+                summary[counter] += 1
+            job.request_finished()
+
+        requests = []
+        for _, event_body in plan["insert"]:
+            insert_body = {**event_body, "id": gcal_ratelimit.new_event_id()}
+            requests.append(send("inserted", "POST", self._events_path(calendar_id), insert_body, insert_body["id"]))
+        for event_id, _, event_body in plan["update"]:
+            requests.append(send("updated", "PATCH", self._events_path(calendar_id, event_id), event_body))
+        for event_id in plan["delete"]:
+            requests.append(send("deleted", "DELETE", self._events_path(calendar_id, event_id)))
+        await asyncio.gather(*requests)
+        return summary
+
+    def sync_calendar_events(self, scraped_events, calendar_id, range_start, range_end, progress_callback=None,
+                             failed_weeks=()):
+        """Same as gcal_service.sync_calendar_events, sending the changes concurrently."""
+        headers = self._auth_headers()
+        if headers is None:
+            logging.error("Calendar credentials are not available.")
+            return None
+        job = _PublishJob(0)
+        summary = self._run(self._sync(job, headers, scraped_events, calendar_id, range_start, range_end, failed_weeks),
+                            job, progress_callback)
+        logging.info(f"Async sync finished. API metrics: {gcal_ratelimit.get_metrics()}")
+        return summary
+
+
+def get_publisher():
+    """Returns the process-wide async publisher, or None if aiohttp is not installed."""
+    global _publisher
+    if aiohttp is None:
+        return None
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = AsyncCalendarPublisher()
+            # Close pooled connections cleanly instead of leaving them to the interpreter's teardown
+            atexit.register(_publisher.close)
+    return _publisher
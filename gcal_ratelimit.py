@@ -0,0 +1,158 @@
+"""
+Shared throttling and retry layer for Google Calendar API calls.
+
+All requests made by gcal_service go through a process-wide token bucket sized
+to the Calendar API per-user quota, so concurrent imports share one budget
+instead of each bursting into 403/429 errors. Rate-limit and server errors are
+retried with jittered exponential backoff; inserts carry a client-generated
+event id so a retried insert can never create a duplicate.
+"""
+import os
+import random
+import threading
+import time
+import logging
+import uuid
+
+from googleapiclient.errors import HttpError
+
+import metrics
+
+# Calendar's default per-user quota is 600 queries per minute, counted per request even
+# inside a batch. Google enforces it per minute, not per second, so a minute's worth may go
+# out at once and the bucket only refills at the sustained rate; a lower project quota still
+# surfaces as 403/429 rate-limit errors, which are backed off and retried.
+QUOTA_PER_MINUTE = float(os.environ.get("GCAL_QUOTA_PER_MINUTE", "600"))
+MAX_QPS = float(os.environ.get("GCAL_MAX_QPS", str(QUOTA_PER_MINUTE / 60)))
+BURST = float(os.environ.get("GCAL_BURST", str(QUOTA_PER_MINUTE)))
+MAX_RETRIES = int(os.environ.get("GCAL_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 32.0
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# 403 is only retryable when Google reports it as a rate limit rather than a permission problem
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve tokens and sleep off any deficit."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Takes tokens (going into debt if needed) and returns how long to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens=1):
+        """Blocks until the tokens are available."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            record("throttle_wait_seconds", wait)
+            time.sleep(wait)
+
+
+_bucket = TokenBucket(MAX_QPS, BURST)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "requests": 0,
+    "retries": 0,
+    "failures": 0,
+    "throttle_wait_seconds": 0.0,
+    "backoff_wait_seconds": 0.0,
+}
+
+
+def get_bucket():
+    """Returns the process-wide token bucket shared by every Calendar API caller."""
+    return _bucket
+
+
+def record(metric, amount=1):
+    with _metrics_lock:
+        _metrics[metric] = _metrics.get(metric, 0) + amount
+
+
+def get_metrics():
+    """Returns a snapshot of the retry/throttling counters."""
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def new_event_id():
+    """Client-generated event id (base32hex-safe) that makes inserts idempotent across retries."""
+    return uuid.uuid4().hex
+
+
+def error_status(error):
+    """HTTP status of an HttpError, or None for other exceptions."""
+    if isinstance(error, HttpError):
+        return error.resp.status
+    return None
+
+
+def is_retryable_status(status, reasons=()):
+    """Whether a response status (and, for 403, the error reasons Google gave) is worth retrying."""
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status == 403:
+        return bool(set(reasons) & RATE_LIMIT_REASONS)
+    return False
+
+
+def is_retryable(error):
+    """Whether an API error is a transient quota or server error worth retrying."""
+    status = error_status(error)
+    reasons = ()
+    if status == 403:
+        reasons = {detail.get("reason") for detail in (error.error_details or []) if isinstance(detail, dict)}
+    return is_retryable_status(status, reasons)
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def sleep_before_retry(attempt):
+    delay = backoff_delay(attempt)
+    record("retries")
+    record("backoff_wait_seconds", delay)
+    time.sleep(delay)
+
+
+def execute_with_retry(request, max_retries=MAX_RETRIES, insert_id=None):
+    """
+    Executes a single API request under the shared rate limit, retrying transient
+    errors. insert_id is the client-generated id of an insert: if a retry of that
+    insert reports 409 the earlier attempt did succeed, so {"id": insert_id} is
+    returned instead of an error. Raises the last HttpError if retries run out.
+    """
+    # e.g. "gcal_calendar.events.list"; timed per attempt, excluding throttling and backoff
+    stage = f"gcal_{getattr(request, 'methodId', None) or 'request'}"
+    attempt = 0
+    while True:
+        _bucket.acquire()
+        record("requests")
+        try:
+            with metrics.span(stage):
+                return request.execute()
+        except HttpError as error:
+            if insert_id and attempt > 0 and error_status(error) == 409:
+                return {"id": insert_id}
+            if attempt >= max_retries or not is_retryable(error):
+                record("failures")
+                raise
+            logging.warning(f"Calendar API returned {error_status(error)}; retrying (attempt {attempt + 1}/{max_retries}).")
+            sleep_before_retry(attempt)
+            attempt += 1
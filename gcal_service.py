@@ -1,12 +1,22 @@
 import os
 import sys  # Added sys import
 import datetime
+import hashlib
+import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+import google_auth_httplib2
+import httplib2
+import gcal_ratelimit
+import metrics
 
 # If modifying these SCOPES, delete the file token.json.
 SCOPES = [
@@ -28,12 +38,118 @@ def resource_path(relative_path):
 CREDENTIALS_FILE = resource_path('credentials.json')
 TOKEN_FILE = resource_path('token.json')
 
+# Maximum number of requests sent in a single batch HTTP call (Calendar API limit is 50)
+BATCH_CHUNK_SIZE = 50
+
+# Private extended properties used to recognise events created by MosaicSync on re-sync
+SYNC_MARKER_PROPERTY = "mosaicsync"
+SYNC_KEY_PROPERTY = "mosaicsyncKey"
+SYNC_HASH_PROPERTY = "mosaicsyncHash"
+# Event fields covered by the content hash; a change in any of them triggers an update
+SYNC_MANAGED_FIELDS = ("summary", "location", "description", "start", "end", "recurrence")
+
+# Point the client at a local stand-in API instead of Google (see benchmarks/fake_gcal_server.py),
+# e.g. GCAL_API_ROOT=http://127.0.0.1:8089/. No OAuth credentials are used in this mode.
+API_ROOT = os.environ.get("GCAL_API_ROOT")
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def get_calendar_service():
-    """Shows basic usage of the Google Calendar API.
-    Prints the start and name of the next 10 events on the user's calendar.
+def is_authorized(token_file=TOKEN_FILE):
+    """Whether the Calendar API can be used without running the OAuth flow."""
+    return bool(API_ROOT) or os.path.exists(token_file)
+
+
+# Refresh the cached access token this long before it expires, so a request never races the expiry
+CREDENTIAL_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# Process-wide service/credentials cache, rebuilt only when token.json changes
+_service_cache_lock = threading.Lock()
+_service_cache = {"service": None, "creds": None, "token_mtime": None, "api_root": None}
+# Held while loading credentials, which can wait on the browser OAuth flow; kept separate
+# from _service_cache_lock so threads using an already cached service never block on it
+_credentials_load_lock = threading.Lock()
+# Services for token files other than TOKEN_FILE (see get_calendar_service_for_token),
+# least recently used first and capped at TOKEN_SERVICE_CACHE_SIZE
+TOKEN_SERVICE_CACHE_SIZE = int(os.environ.get("GCAL_TOKEN_SERVICE_CACHE_SIZE", "64"))
+_token_services_lock = threading.Lock()
+_token_services = OrderedDict()  # absolute token path -> (token mtime, service)
+# Loading a token file is serialized per file, striped over a fixed set of locks, so a slow
+# refresh for one account neither blocks get_calendar_service nor most other accounts
+_token_load_locks = [threading.Lock() for _ in range(16)]
+
+
+# Calendar lists change rarely; cache them per account so page loads don't wait on the API
+CALENDAR_CACHE_TTL_SECONDS = int(os.environ.get("CALENDAR_CACHE_TTL", "300"))
+_calendar_cache_lock = threading.Lock()
+_calendar_cache = {}  # cache key -> (monotonic time listed, calendar items)
+
+
+def _token_mtime():
+    try:
+        return os.path.getmtime(TOKEN_FILE)
+    except OSError:
+        return None
+
+
+def _request_builder(creds=None):
     """
+    Returns a requestBuilder giving each thread its own HTTP connection.
+    httplib2 is not thread-safe, so one cached service can only be shared by
+    concurrent imports if threads do not share the service's Http object;
+    reusing the thread's Http keeps its connection alive between requests.
+    """
+    local = threading.local()
+
+    def build_request(http, *args, **kwargs):
+        thread_http = getattr(local, "http", None)
+        if thread_http is None:
+            thread_http = httplib2.Http()
+            if creds is not None:
+                thread_http = google_auth_httplib2.AuthorizedHttp(creds, http=thread_http)
+            local.http = thread_http
+        return HttpRequest(thread_http, *args, **kwargs)
+    return build_request
+
+
+def _build_local_service(api_root):
+    """Builds a Calendar service against a local stand-in API, using its discovery document."""
+    discovery_url = api_root.rstrip("/") + "/discovery/v1/apis/calendar/v3/rest"
+    try:
+        return build("calendar", "v3", http=httplib2.Http(), discoveryServiceUrl=discovery_url,
+                     requestBuilder=_request_builder(), static_discovery=False, cache_discovery=False)
+    except Exception as e:
+        logging.error(f"Could not build calendar service for local API at {api_root}: {e}")
+        return None
+
+
+def _save_credentials(creds):
+    with open(TOKEN_FILE, "w") as token:
+        token.write(creds.to_json())
+
+
+def _expires_soon(creds):
+    if not creds.expiry:
+        return False
+    # google-auth keeps expiry as a naive UTC datetime
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < CREDENTIAL_REFRESH_MARGIN
+
+
+def _refresh_cached_credentials(creds):
+    """Refreshes cached credentials that are about to expire and saves them. Returns False if they can no longer be used."""
+    if not creds.refresh_token:
+        return False
+    try:
+        creds.refresh(Request())
+    except Exception as e:
+        logging.warning(f"Could not refresh cached credentials: {e}")
+        return False
+    _save_credentials(creds)
+    return True
+
+
+def _load_credentials():
+    """Loads credentials from token.json, refreshing them or running the OAuth flow as needed."""
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -42,8 +158,8 @@ def get_calendar_service():
         # Ensure SCOPES includes all necessary permissions when loading credentials
         creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
     # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    if not creds or not creds.valid or _expires_soon(creds):
+        if creds and creds.refresh_token:
             try:
                 creds.refresh(Request())
             except Exception as e:
@@ -54,6 +170,8 @@ def get_calendar_service():
                     logging.info("Token scopes do not match required scopes. Forcing re-authentication.")
                 os.remove(TOKEN_FILE) # Remove invalid or insufficient token
                 creds = None # Force re-authentication
+        else:
+            creds = None
         if not creds: # If still no creds (either never existed or refresh failed)
             if not os.path.exists(CREDENTIALS_FILE):
                 logging.error(f"Credentials file '{CREDENTIALS_FILE}' not found. "
@@ -63,18 +181,147 @@ def get_calendar_service():
             # Specify a fixed port for the local server
             creds = flow.run_local_server(port=8080) # Or any other available port
         # Save the credentials for the next run
-        with open(TOKEN_FILE, "w") as token:
-            token.write(creds.to_json())
+        _save_credentials(creds)
+    return creds
 
-    try:
-        service = build("calendar", "v3", credentials=creds)
-        return service
-    except HttpError as error:
-        logging.error(f"An error occurred building the calendar service: {error}")
+
+def get_credentials():
+    """Returns the cached OAuth credentials, loading or refreshing them if needed (None in local API mode)."""
+    if API_ROOT or get_calendar_service() is None:
         return None
-    except Exception as e:
-        logging.error(f"An unexpected error occurred: {e}")
+    return _service_cache["creds"]
+
+
+def refresh_credentials(rejected_token):
+    """
+    Refreshes the cached OAuth credentials after the API answered 401 to
+    rejected_token, unless another thread has already replaced that token.
+    Returns the credentials, or None if they can no longer be refreshed.
+    """
+    creds = get_credentials()
+    if creds is None:
         return None
+    with _credentials_load_lock:
+        if creds.token != rejected_token:
+            return creds
+        if not _refresh_cached_credentials(creds):
+            return None
+        with _service_cache_lock:
+            _service_cache["token_mtime"] = _token_mtime()
+    return creds
+
+
+def get_calendar_service_for_token(token_file):
+    """
+    Returns a Calendar service authorized by token_file instead of TOKEN_FILE, e.g.
+    one token per account in a bulk import. Never starts the interactive OAuth flow:
+    returns None if the token is missing or can no longer be refreshed. Requests
+    refresh the access token by themselves once it expires.
+    """
+    if API_ROOT:
+        return get_calendar_service()
+    token_path = os.path.abspath(token_file)
+    with _token_load_locks[hash(token_path) % len(_token_load_locks)]:
+        try:
+            token_mtime = os.path.getmtime(token_path)
+        except OSError:
+            logging.error(f"Token file '{token_file}' not found.")
+            return None
+        with _token_services_lock:
+            cached = _token_services.get(token_path)
+            if cached and cached[0] == token_mtime:
+                _token_services.move_to_end(token_path)
+                return cached[1]
+        try:
+            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+            if not creds.valid or _expires_soon(creds):
+                creds.refresh(Request())
+                with open(token_path, "w") as token:
+                    token.write(creds.to_json())
+                token_mtime = os.path.getmtime(token_path)
+            with metrics.span("gcal_service_build"):
+                service = build("calendar", "v3", credentials=creds, requestBuilder=_request_builder(creds),
+                                static_discovery=True, cache_discovery=False)
+        except Exception as e:
+            logging.error(f"Could not load Google credentials from '{token_file}': {e}")
+            return None
+        with _token_services_lock:
+            _token_services[token_path] = (token_mtime, service)
+            _token_services.move_to_end(token_path)
+            while len(_token_services) > TOKEN_SERVICE_CACHE_SIZE:
+                _token_services.popitem(last=False)
+        return service
+
+
+def invalidate_service_cache():
+    """Drops the cached service and credentials, e.g. after token.json was replaced."""
+    with _service_cache_lock:
+        _service_cache.update(service=None, creds=None, token_mtime=None, api_root=None)
+    invalidate_calendar_cache()
+
+
+def _cached_oauth_service():
+    """Returns (service, creds) cached for the unchanged token.json, or (None, None). Needs _service_cache_lock."""
+    cached = _service_cache["service"]
+    if cached is not None and _service_cache["api_root"] is None and _service_cache["token_mtime"] == _token_mtime():
+        return cached, _service_cache["creds"]
+    return None, None
+
+
+def get_calendar_service():
+    """
+    Returns a Calendar API service, cached for the whole process. The service is
+    safe to share between threads; the credentials behind it are refreshed ahead
+    of expiry and everything is reloaded when token.json changes on disk.
+    """
+    with _service_cache_lock:
+        if API_ROOT:
+            cached = _service_cache["service"]
+            if cached is None or _service_cache["api_root"] != API_ROOT:
+                with metrics.span("gcal_service_build"):
+                    cached = _build_local_service(API_ROOT)
+                _service_cache.update(service=cached, creds=None, token_mtime=None, api_root=API_ROOT)
+            return cached
+        cached, creds = _cached_oauth_service()
+        if cached is not None and creds.valid and not _expires_soon(creds):
+            return cached
+
+    # Refreshing the token is a network round-trip and loading can run the OAuth flow and
+    # wait for the user, so both happen outside _service_cache_lock, one thread at a time.
+    # While one thread refreshes, the others keep using a token that has not expired yet.
+    still_valid = cached is not None and creds.valid
+    if not _credentials_load_lock.acquire(blocking=not still_valid):
+        return cached
+    try:
+        with _service_cache_lock:
+            cached, creds = _cached_oauth_service()
+        if cached is not None:
+            if creds.valid and not _expires_soon(creds):
+                return cached
+            if _refresh_cached_credentials(creds):
+                with _service_cache_lock:
+                    _service_cache["token_mtime"] = _token_mtime()
+                return cached
+        creds = _load_credentials()
+        if creds is None:
+            return None
+        try:
+            # The discovery document bundled with google-api-python-client avoids a network fetch
+            with metrics.span("gcal_service_build"):
+                service = build("calendar", "v3", credentials=creds, requestBuilder=_request_builder(creds),
+                                static_discovery=True, cache_discovery=False)
+        except HttpError as error:
+            logging.error(f"An error occurred building the calendar service: {error}")
+            return None
+        except Exception as e:
+            logging.error(f"An unexpected error occurred: {e}")
+            return None
+        with _service_cache_lock:
+            _service_cache.update(service=service, creds=creds, token_mtime=_token_mtime(), api_root=None)
+        return service
+    finally:
+        _credentials_load_lock.release()
+
 
 def parse_event_time(event_date_str, time_range_str, timezone="America/Toronto"):
     """
@@ -111,23 +358,11 @@ def parse_event_time(event_date_str, time_range_str, timezone="America/Toronto")
         return None, None
 
 
-def create_calendar_event(service, scraped_event_data, calendar_id='primary'):
+def build_event_body(scraped_event_data):
     """
-    Creates a new event in Google Calendar.
-    scraped_event_data is a dictionary from the scraper, e.g.:
-    {
-        "week_of": "2025-01-27",
-        "date": "2025-01-30",
-        "course": "ENG 1P13",
-        "type": "Lecture",
-        "time": "09:30 - 10:20",
-        "location": "BSB B136"
-    }
+    Builds the Google Calendar event resource for a scraped event.
+    Returns None if the event is missing its date/time or they cannot be parsed.
     """
-    if not service:
-        logging.error("Calendar service is not available.")
-        return None
-
     event_date_str = scraped_event_data.get("date")
     time_range_str = scraped_event_data.get("time")
 
@@ -161,28 +396,506 @@ def create_calendar_event(service, scraped_event_data, calendar_id='primary'):
         #     ],
         # },
     }
+    # Set by recurrence.group_recurring_events when weekly occurrences were collapsed
+    if scraped_event_data.get("recurrence"):
+        event_body["recurrence"] = scraped_event_data["recurrence"]
+    return event_body
+
 
+def create_calendar_event(service, scraped_event_data, calendar_id='primary'):
+    """
+    Creates a new event in Google Calendar.
+    scraped_event_data is a dictionary from the scraper, e.g.:
+    {
+        "week_of": "2025-01-27",
+        "date": "2025-01-30",
+        "course": "ENG 1P13",
+        "type": "Lecture",
+        "time": "09:30 - 10:20",
+        "location": "BSB B136"
+    }
+    """
+    if not service:
+        logging.error("Calendar service is not available.")
+        return None
+
+    event_body = build_event_body(scraped_event_data)
+    if not event_body:
+        return None
+
+    event_body["id"] = gcal_ratelimit.new_event_id()
     try:
-        logging.info(f"Creating event: {event_summary} on {event_date_str}")
-        created_event = service.events().insert(calendarId=calendar_id, body=event_body).execute()
+        logging.info(f"Creating event: {event_body['summary']} on {scraped_event_data.get('date')}")
+        request = service.events().insert(calendarId=calendar_id, body=event_body)
+        created_event = gcal_ratelimit.execute_with_retry(request, insert_id=event_body["id"])
         logging.info(f"Event created: {created_event.get('htmlLink')}")
         return created_event
     except HttpError as error:
         logging.error(f"An error occurred creating event: {error}")
-        # Consider more specific error handling, e.g., for 409 (duplicate) if you implement duplicate checking
+        # Duplicate checking is handled by sync_calendar_events; this function always inserts
         return None
     except Exception as e:
         logging.error(f"An unexpected error occurred during event creation: {e}")
         return None
 
+
+def _insert_id(request):
+    """Client-generated event id of an insert request, if it has one."""
+    if request.method != "POST" or not request.body:
+        return None
+    try:
+        return json.loads(request.body).get("id")
+    except (ValueError, AttributeError):
+        return None
+
+
+def execute_batch(service, requests, chunk_size=BATCH_CHUNK_SIZE, progress_callback=None,
+                  max_retries=gcal_ratelimit.MAX_RETRIES, result_callback=None):
+    """
+    Executes API requests through the Calendar API batch endpoint, chunk_size
+    requests per HTTP round-trip, under the shared rate limit. Requests that fail
+    with a transient quota or server error are retried in later batches with
+    jittered exponential backoff.
+
+    requests is a list of (request_id, HttpRequest) pairs. Returns a dict mapping
+    each request_id to a (response, error_message) tuple, where exactly one of the
+    two is None. progress_callback(done, total) is called after every chunk, and
+    result_callback(request_id, response, error_message) as soon as each request's
+    outcome is final.
+    """
+    outcomes = {}
+    total = len(requests)
+    request_map = dict(requests)
+    state = {"attempt": 0, "retry": [], "finished": []}
+
+    def finish(request_id, response, error):
+        outcomes[request_id] = (response, error)
+        state["finished"].append(request_id)
+
+    def handle_response(request_id, response, exception):
+        if exception is None:
+            finish(request_id, response, None)
+            return
+        insert_id = _insert_id(request_map[request_id])
+        if insert_id and state["attempt"] > 0 and gcal_ratelimit.error_status(exception) == 409:
+            # An earlier attempt of this insert went through; the event already exists
+            finish(request_id, {"id": insert_id}, None)
+        elif request_map[request_id].method == "DELETE" and state["attempt"] > 0 and \
+                gcal_ratelimit.error_status(exception) in (404, 410):
+            # An earlier attempt of this delete went through
+            finish(request_id, {}, None)
+        elif state["attempt"] < max_retries and gcal_ratelimit.is_retryable(exception):
+            state["retry"].append(request_id)
+        else:
+            gcal_ratelimit.record("failures")
+            finish(request_id, None, str(exception))
+
+    pending = [request_id for request_id, _ in requests]
+    while pending:
+        state["retry"] = []
+        for chunk_start in range(0, len(pending), chunk_size):
+            chunk = pending[chunk_start:chunk_start + chunk_size]
+            batch = service.new_batch_http_request(callback=handle_response)
+            for request_id in chunk:
+                batch.add(request_map[request_id], request_id=request_id)
+
+            # Every request inside a batch counts against the quota individually
+            gcal_ratelimit.get_bucket().acquire(len(chunk))
+            gcal_ratelimit.record("requests", len(chunk))
+            try:
+                logging.info(f"Sending batch of {len(chunk)} Calendar API requests.")
+                with metrics.span("gcal_batch"):
+                    batch.execute()
+            except Exception as e:
+                retry_whole_chunk = state["attempt"] < max_retries and gcal_ratelimit.is_retryable(e)
+                logging.error(f"An error occurred sending request batch: {e}")
+                for request_id in chunk:
+                    if request_id in outcomes or request_id in state["retry"]:
+                        continue
+                    if retry_whole_chunk:
+                        state["retry"].append(request_id)
+                    else:
+                        gcal_ratelimit.record("failures")
+                        finish(request_id, None, str(e))
+
+            # Reported after batch.execute() so a failing callback is not mistaken for a failed batch
+            finished, state["finished"] = state["finished"], []
+            if result_callback:
+                for request_id in finished:
+                    result_callback(request_id, *outcomes[request_id])
+            if progress_callback:
+                progress_callback(len(outcomes), total)
+
+        pending = state["retry"]
+        if pending:
+            logging.warning(f"Retrying {len(pending)} rate-limited or failed requests (attempt {state['attempt'] + 1}/{max_retries}).")
+            gcal_ratelimit.sleep_before_retry(state["attempt"])
+            state["attempt"] += 1
+
+    return outcomes
+
+
+def create_calendar_events_batch(service, scraped_events, calendar_id='primary',
+                                 chunk_size=BATCH_CHUNK_SIZE, progress_callback=None, on_created=None):
+    """
+    Creates many events through the Calendar API batch endpoint, sending
+    chunk_size inserts per HTTP round-trip instead of one request per event.
+
+    Returns a list aligned with scraped_events. Each entry is a dict:
+    {"event": <scraped event>, "created": <created event or None>, "error": <message or None>}
+
+    progress_callback, if given, is called as progress_callback(done, total)
+    after every chunk so the caller can report progress. on_created(scraped_event,
+    created_event), if given, is called for each event as soon as it is created,
+    e.g. to checkpoint it.
+    """
+    results = [{"event": event_data, "created": None, "error": None} for event_data in scraped_events]
+    total = len(results)
+
+    if not service:
+        logging.error("Calendar service is not available.")
+        for result in results:
+            result["error"] = "Calendar service is not available."
+        return results
+
+    # Build the event bodies up front so unparseable events fail without using a batch slot
+    requests = []
+    for index, event_data in enumerate(scraped_events):
+        # Stamp the sync key even on plain inserts so a later sync recognises these events
+        event_body = build_sync_event_body(event_data)
+        if event_body:
+            event_body["id"] = gcal_ratelimit.new_event_id()
+            requests.append((str(index), service.events().insert(calendarId=calendar_id, body=event_body)))
+        else:
+            results[index]["error"] = "Missing or invalid date/time."
+
+    skipped = total - len(requests)
+
+    def report_progress(done, _):
+        if progress_callback:
+            progress_callback(skipped + done, total)
+
+    def report_result(request_id, response, error):
+        if on_created and response:
+            on_created(scraped_events[int(request_id)], response)
+
+    outcomes = execute_batch(service, requests, chunk_size, report_progress, result_callback=report_result)
+    for request_id, (response, error) in outcomes.items():
+        result = results[int(request_id)]
+        if error:
+            logging.error(f"An error occurred creating event {result['event']}: {error}")
+        result["created"] = response
+        result["error"] = error
+
+    created_count = sum(1 for result in results if result["created"])
+    logging.info(f"Batch insert finished: {created_count}/{total} events created. API metrics: {gcal_ratelimit.get_metrics()}")
+    return results
+
+
+def event_sync_key(scraped_event_data):
+    """
+    Returns the stable key identifying a scraped event across re-imports.
+    Recurring events are keyed by weekday rather than date so that a changed
+    term range updates the existing series instead of replacing it. A sync over
+    a shorter range shares the key too, which is why compute_sync_plan leaves a
+    series that extends past the synced range alone.
+    """
+    if scraped_event_data.get("recurrence"):
+        return _series_sync_key(scraped_event_data)
+    course = scraped_event_data.get("course", "")
+    event_type = scraped_event_data.get("type", "")
+    start_time = scraped_event_data.get("time", "").split("-")[0].strip()
+    raw_key = f"{course}|{event_type}|{scraped_event_data.get('date', '')}|{start_time}"
+    return hashlib.sha1(raw_key.encode("utf-8")).hexdigest()[:20]
+
+
+def _series_sync_key(scraped_event_data):
+    """The key of the weekly series the event belongs (or would belong) to, whether or not it recurs."""
+    course = scraped_event_data.get("course", "")
+    event_type = scraped_event_data.get("type", "")
+    start_time = scraped_event_data.get("time", "").split("-")[0].strip()
+    weekday = datetime.datetime.strptime(scraped_event_data["date"], "%Y-%m-%d").strftime("%a")
+    raw_key = f"{course}|{event_type}|weekly-{weekday}|{start_time}"
+    return hashlib.sha1(raw_key.encode("utf-8")).hexdigest()[:20]
+
+
+def _event_content_hash(event_body):
+    """Hash of the fields MosaicSync manages, used to detect events that need updating."""
+    managed = {field: event_body.get(field) for field in SYNC_MANAGED_FIELDS}
+    return hashlib.sha1(json.dumps(managed, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+
+def build_sync_event_body(scraped_event_data):
+    """
+    Builds the event body like build_event_body and stamps it with the sync key and
+    content hash in extendedProperties so later runs can find and diff it.
+    """
+    event_body = build_event_body(scraped_event_data)
+    if not event_body:
+        return None
+    event_body["extendedProperties"] = {
+        "private": {
+            SYNC_MARKER_PROPERTY: "1",
+            SYNC_KEY_PROPERTY: event_sync_key(scraped_event_data),
+            SYNC_HASH_PROPERTY: _event_content_hash(event_body),
+        }
+    }
+    return event_body
+
+
+def list_synced_events(service, calendar_id, time_min, time_max):
+    """
+    Lists the events previously created by MosaicSync that overlap [time_min, time_max]
+    (RFC3339 strings), following nextPageToken. Recurring events are returned as their
+    series rather than expanded into instances.
+    Returns None if the events could not be listed.
+    """
+    events = []
+    page_token = None
+    try:
+        while True:
+            response = gcal_ratelimit.execute_with_retry(service.events().list(
+                calendarId=calendar_id,
+                timeMin=time_min,
+                timeMax=time_max,
+                privateExtendedProperty=f"{SYNC_MARKER_PROPERTY}=1",
+                singleEvents=False,
+                maxResults=2500,
+                pageToken=page_token,
+            ))
+            events.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return events
+    except HttpError as error:
+        logging.error(f"An error occurred listing existing events: {error}")
+        return None
+    except Exception as e:
+        logging.error(f"An unexpected error occurred while listing existing events: {e}")
+        return None
+
+
+def _event_date_span(existing_event):
+    """
+    First and last dates ("YYYY-MM-DD") an existing calendar event covers. For a
+    series this follows its RRULE's COUNT/INTERVAL or UNTIL; a series with neither
+    never ends.
+    """
+    start = existing_event.get("start", {})
+    first_date = (start.get("dateTime") or start.get("date") or "")[:10]
+    rrule = next((rule for rule in existing_event.get("recurrence") or [] if rule.startswith("RRULE:")), None)
+    if not rrule or not first_date:
+        return first_date, first_date
+
+    parts = dict(part.split("=", 1) for part in rrule[len("RRULE:"):].split(";") if "=" in part)
+    if "UNTIL" in parts:
+        until = parts["UNTIL"][:8]
+        return first_date, f"{until[:4]}-{until[4:6]}-{until[6:8]}"
+    if "COUNT" not in parts:
+        return first_date, "9999-12-31"
+    try:
+        weeks = (int(parts["COUNT"]) - 1) * int(parts.get("INTERVAL", "1"))
+        first = datetime.datetime.strptime(first_date, "%Y-%m-%d")
+    except ValueError:
+        return first_date, "9999-12-31"
+    return first_date, (first + datetime.timedelta(weeks=weeks)).strftime("%Y-%m-%d")
+
+
+def _is_series_occurrence(existing_event, event_date):
+    """Whether the existing weekly series has an occurrence (not removed by an EXDATE) on event_date ("YYYY-MM-DD")."""
+    recurrence = existing_event.get("recurrence") or []
+    rrule = next((rule for rule in recurrence if rule.startswith("RRULE:")), None)
+    first_date, last_date = _event_date_span(existing_event)
+    if not rrule or not first_date <= event_date <= last_date:
+        return False
+    parts = dict(part.split("=", 1) for part in rrule[len("RRULE:"):].split(";") if "=" in part)
+    try:
+        weeks = (datetime.datetime.strptime(event_date, "%Y-%m-%d")
+                 - datetime.datetime.strptime(first_date, "%Y-%m-%d")).days / 7
+        interval = int(parts.get("INTERVAL", "1"))
+    except ValueError:
+        return False
+    if weeks != int(weeks) or int(weeks) % interval:
+        return False
+    compact_date = event_date.replace("-", "")
+    for rule in recurrence:
+        if rule.startswith("EXDATE") and any(value[:8] == compact_date for value in rule.split(":", 1)[-1].split(",")):
+            return False
+    return True
+
+
+def _failed_week_ranges(failed_weeks):
+    """(first day, last day) of each failed week, given its Monday as "YYYY-MM-DD"."""
+    ranges = []
+    for monday in failed_weeks or ():
+        first = datetime.datetime.strptime(monday, "%Y-%m-%d")
+        ranges.append((monday, (first + datetime.timedelta(days=6)).strftime("%Y-%m-%d")))
+    return ranges
+
+
+def compute_sync_plan(scraped_events, existing_events, range_start, range_end, failed_weeks=()):
+    """
+    Diffs scraped events against events already in the calendar.
+
+    range_start and range_end are "YYYY-MM-DD" strings bounding the scraped period.
+    Existing events are only changed or deleted if they lie entirely inside it, so
+    syncing one month never removes another month's classes, and never cuts a
+    term-long series (which shares its sync key with the month's) down to a month.
+
+    failed_weeks holds the Mondays ("YYYY-MM-DD") of weeks in the period that could
+    not be scraped. Nothing is known about those weeks, so existing events that
+    touch one (including a series with an occurrence in one) are neither deleted
+    nor changed.
+
+    A range too short for a class to be collapsed into a series yields single
+    events. One that falls on an occurrence of an existing series which is being
+    left alone is already in the calendar, so it is not inserted again.
+
+    Returns a dict with "insert" (list of (scraped event, body)), "update" (list of
+    (event id, scraped event, body)), "delete" (list of event ids), "unchanged" (count,
+    including events left alone for either reason) and "invalid" (scraped
+    events that could not be turned into an event body).
+    """
+    plan = {"insert": [], "update": [], "delete": [], "unchanged": 0, "invalid": []}
+    failed_ranges = _failed_week_ranges(failed_weeks)
+
+    def reason_to_keep(existing):
+        """Why existing must be left as it is, or None if the scrape covers all of it."""
+        first_date, last_date = _event_date_span(existing)
+        if first_date < range_start or last_date > range_end:
+            return "it extends outside the synced dates"
+        if any(first_date <= week_end and week_start <= last_date for week_start, week_end in failed_ranges):
+            return "it has an occurrence in a week that could not be scraped"
+        return None
+
+    existing_by_key = {}
+    for existing in existing_events:
+        private = existing.get("extendedProperties", {}).get("private", {})
+        key = private.get(SYNC_KEY_PROPERTY)
+        if not key:
+            continue
+        if key in existing_by_key:
+            # Left over from an earlier duplicate import; keep one copy
+            plan["delete"].append(existing["id"])
+            continue
+        existing_by_key[key] = existing
+
+    seen_keys = set()
+    for event_data in scraped_events:
+        event_body = build_sync_event_body(event_data)
+        if not event_body:
+            plan["invalid"].append(event_data)
+            continue
+        key = event_body["extendedProperties"]["private"][SYNC_KEY_PROPERTY]
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+
+        existing = existing_by_key.get(key)
+        if existing is None:
+            series = None if event_data.get("recurrence") else existing_by_key.get(_series_sync_key(event_data))
+            if series is not None and _is_series_occurrence(series, event_data["date"]) and reason_to_keep(series):
+                logging.info(f"Not inserting {key}: it is an occurrence of series {series['id']}, which is kept.")
+                plan["unchanged"] += 1
+            else:
+                plan["insert"].append((event_data, event_body))
+            continue
+        if existing["extendedProperties"]["private"].get(SYNC_HASH_PROPERTY) == \
+                event_body["extendedProperties"]["private"][SYNC_HASH_PROPERTY]:
+            plan["unchanged"] += 1
+            continue
+        reason = reason_to_keep(existing)
+        if reason:
+            logging.info(f"Not updating event {existing['id']}: {reason}.")
+            plan["unchanged"] += 1
+        else:
+            plan["update"].append((existing["id"], event_data, event_body))
+
+    for key, existing in existing_by_key.items():
+        if key in seen_keys:
+            continue
+        start_date = _event_date_span(existing)[0]
+        if not range_start <= start_date <= range_end:
+            continue
+        reason = reason_to_keep(existing)
+        if reason:
+            logging.info(f"Not deleting event {existing['id']}: {reason}.")
+            plan["unchanged"] += 1
+            continue
+        plan["delete"].append(existing["id"])
+
+    return plan
+
+
+def sync_calendar_events(service, scraped_events, calendar_id, range_start, range_end, progress_callback=None,
+                         failed_weeks=()):
+    """
+    Incrementally syncs scraped events into a calendar: lists the events MosaicSync
+    created in the range with one paged query, then inserts, updates and deletes
+    only what changed, all through the batch endpoint. Re-running a sync with the
+    same schedule makes no writes.
+
+    range_start and range_end are "YYYY-MM-DD" strings bounding the scraped period;
+    events in failed_weeks (Mondays of weeks that could not be scraped) are left as
+    they are (see compute_sync_plan).
+    Returns a summary dict with "inserted", "updated", "deleted", "unchanged" and
+    "failed" counts, or None if the existing events could not be listed.
+    """
+    if not service:
+        logging.error("Calendar service is not available.")
+        return None
+
+    # Pad the query by a day on each side; compute_sync_plan filters on the exact dates
+    time_min = (datetime.datetime.strptime(range_start, "%Y-%m-%d") - datetime.timedelta(days=1)).strftime("%Y-%m-%dT00:00:00Z")
+    time_max = (datetime.datetime.strptime(range_end, "%Y-%m-%d") + datetime.timedelta(days=2)).strftime("%Y-%m-%dT00:00:00Z")
+    existing_events = list_synced_events(service, calendar_id, time_min, time_max)
+    if existing_events is None:
+        return None
+
+    plan = compute_sync_plan(scraped_events, existing_events, range_start, range_end, failed_weeks)
+    logging.info(
+        f"Sync plan for {calendar_id}: {len(plan['insert'])} to insert, {len(plan['update'])} to update, "
+        f"{len(plan['delete'])} to delete, {plan['unchanged']} unchanged."
+    )
+
+    requests = []
+    for index, (_, event_body) in enumerate(plan["insert"]):
+        insert_body = {**event_body, "id": gcal_ratelimit.new_event_id()}
+        requests.append((f"insert-{index}", service.events().insert(calendarId=calendar_id, body=insert_body)))
+    for index, (event_id, _, event_body) in enumerate(plan["update"]):
+        requests.append((f"update-{index}", service.events().patch(calendarId=calendar_id, eventId=event_id, body=event_body)))
+    for index, event_id in enumerate(plan["delete"]):
+        requests.append((f"delete-{index}", service.events().delete(calendarId=calendar_id, eventId=event_id)))
+
+    outcomes = execute_batch(service, requests, progress_callback=progress_callback)
+
+    logging.info(f"Sync requests finished. API metrics: {gcal_ratelimit.get_metrics()}")
+    summary = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": plan["unchanged"], "failed": len(plan["invalid"])}
+    counters = {"insert": "inserted", "update": "updated", "delete": "deleted"}
+    for request_id, (_, error) in outcomes.items():
+        if error:
+            logging.error(f"Sync request {request_id} failed: {error}")
+            summary["failed"] += 1
+        else:
+            summary[counters[request_id.split("-")[0]]] += 1
+    return summary
+
 def list_calendars(service):
-    """Lists the user's calendars."""
+    """Lists the user's calendars, following nextPageToken across pages."""
     if not service:
         logging.error("Calendar service is not available for listing calendars.")
         return []
+    calendars = []
+    page_token = None
     try:
-        calendar_list = service.calendarList().list().execute()
-        return calendar_list.get('items', [])
+        while True:
+            calendar_list = gcal_ratelimit.execute_with_retry(
+                service.calendarList().list(pageToken=page_token, maxResults=250)
+            )
+            calendars.extend(calendar_list.get('items', []))
+            page_token = calendar_list.get('nextPageToken')
+            if not page_token:
+                return calendars
     except HttpError as error:
         logging.error(f"An error occurred listing calendars: {error}")
         return []
@@ -190,6 +903,48 @@ def list_calendars(service):
         logging.error(f"An unexpected error occurred while listing calendars: {e}")
         return []
 
+
+def _calendar_cache_key(service):
+    """
+    Identifies the account behind service by its refresh token (or OAuth client id),
+    which stays the same when the access token in token.json is refreshed but
+    changes when a different account signs in. Hashed so no secret is kept as a key.
+    """
+    if API_ROOT:
+        return API_ROOT
+    creds = getattr(getattr(service, "_http", None), "credentials", None)
+    identity = getattr(creds, "refresh_token", None) or getattr(creds, "client_id", None)
+    if not identity:
+        return TOKEN_FILE
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def get_cached_calendars(service, ttl=CALENDAR_CACHE_TTL_SECONDS):
+    """
+    Returns list_calendars(service) from a per-account cache, listing again once the
+    entry is older than ttl seconds. Failed (empty) listings are not cached, and
+    expired entries are dropped whenever a new listing is stored.
+    """
+    key = _calendar_cache_key(service)
+    now = time.monotonic()
+    with _calendar_cache_lock:
+        cached = _calendar_cache.get(key)
+        if cached and now - cached[0] < ttl:
+            return cached[1]
+    calendars = list_calendars(service)
+    if calendars:
+        with _calendar_cache_lock:
+            for stale_key in [k for k, (listed, _) in _calendar_cache.items() if now - listed >= ttl]:
+                del _calendar_cache[stale_key]
+            _calendar_cache[key] = (now, calendars)
+    return calendars
+
+
+def invalidate_calendar_cache():
+    """Forgets every cached calendar list, e.g. when the user asks for a refresh."""
+    with _calendar_cache_lock:
+        _calendar_cache.clear()
+
 if __name__ == "__main__":
     # This is for testing the gcal_service.py module directly
     # 1. Make sure you have 'credentials.json' from Google Cloud Console
@@ -0,0 +1,147 @@
+"""
+Timing instrumentation for imports.
+
+Code that does slow work wraps it in a span:
+
+    with metrics.span("login"):
+        login_to_portal(driver, username, password)
+
+Every span is recorded in a process-wide histogram, rendered in the Prometheus
+text format by render_prometheus() for the /metrics route. A span also adds to
+the JobTimings of the import it runs under (see track_job), which the import
+reports in its progress so one slow job can be broken down by stage.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets; covers a fast API call up to a slow login
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# The JobTimings of the import the current thread is working for, if any
+_current_job = contextvars.ContextVar("metrics_current_job", default=None)
+
+
+class Histogram:
+    """Cumulative duration histogram with one label, in the Prometheus style."""
+
+    def __init__(self, name, help_text, label, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self._lock:
+            series = self._series.setdefault(label_value, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((value, list(series)) for value, series in self._series.items())
+        for label_value, series in series_items:
+            label = f'{self.label}="{_escape(label_value)}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {series[-1]}")
+        return lines
+
+
+class JobTimings:
+    """Per-stage totals for a single import."""
+
+    def __init__(self):
+        self._stages = {}  # stage -> [count, total seconds, max seconds]
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            totals = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def snapshot(self):
+        """Returns {stage: {"count", "total_seconds", "max_seconds"}} for the progress JSON."""
+        with self._lock:
+            return {
+                stage: {"count": count, "total_seconds": round(total, 3), "max_seconds": round(longest, 3)}
+                for stage, (count, total, longest) in self._stages.items()
+            }
+
+
+_stage_durations = Histogram(
+    "mosaicsync_stage_duration_seconds",
+    "Time spent in each import stage (browser, portal, parsing and Google Calendar).",
+    "stage",
+)
+
+
+def _escape(label_value):
+    return str(label_value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def observe(stage, seconds):
+    """Records a duration for stage, both globally and for the current import."""
+    _stage_durations.observe(stage, seconds)
+    job = _current_job.get()
+    if job is not None:
+        job.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Times the enclosed block as stage (also when it raises)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def track_job(timings):
+    """Attributes spans in this thread (and threads started with propagate_context) to timings."""
+    token = _current_job.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_job.reset(token)
+
+
+def propagate_context(function):
+    """
+    Wraps function so it runs in a copy of the caller's context, for handing work to
+    another thread (threads and executors start with an empty context otherwise).
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(function, *args, **kwargs)
+    return run
+
+
+def render_prometheus(counters=None, prefix="mosaicsync_"):
+    """
+    Renders the stage histogram, plus any monotonically increasing counters given as
+    a dict (e.g. gcal_ratelimit.get_metrics()), in the Prometheus text format.
+    """
+    lines = _stage_durations.render()
+    for name, value in sorted((counters or {}).items()):
+        if not isinstance(value, (int, float)) or math.isnan(value):
+            continue
+        metric = f"{prefix}{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
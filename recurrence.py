@@ -0,0 +1,140 @@
+"""
+Collapses the per-occurrence output of the scraper into recurring events.
+
+parse_html_to_events returns one dict per class meeting, so a weekly lecture
+shows up once for every week of the term. group_recurring_events groups those
+occurrences by course/type/weekday/time/location and turns each group into a
+single event carrying an RRULE, with EXDATEs for the weeks it does not meet
+(reading week, holidays, or any explicitly excluded dates).
+"""
+from datetime import datetime, timedelta
+from math import gcd
+import logging
+import re
+
+DEFAULT_TIMEZONE = "America/Toronto"
+
+
+def _group_key(event_data, event_date):
+    """Key identifying occurrences that belong to the same recurring event."""
+    return (
+        event_data.get("course"),
+        event_data.get("type"),
+        event_date.weekday(),
+        re.sub(r"\s+", "", event_data.get("time", "")),
+        event_data.get("location"),
+    )
+
+
+def _start_time_str(time_range_str):
+    """Returns the start of a "HH:MM - HH:MM" range as HHMMSS, e.g. "9:30 - 10:20" -> "093000"."""
+    if not isinstance(time_range_str, str):
+        raise ValueError(f"time range must be a string, not {time_range_str!r}")
+    start_hour, start_minute = map(int, time_range_str.split("-")[0].strip().split(":"))
+    return f"{start_hour:02d}{start_minute:02d}00"
+
+
+def _chronological_key(event_data):
+    """Sort key ordering events by date and then start time ("9:30" before "10:20")."""
+    try:
+        start_time = _start_time_str(event_data.get("time"))
+    except ValueError:
+        # Unparseable times sort after the valid ones on the same date
+        start_time = "999999"
+    return str(event_data.get("date") or ""), start_time
+
+
+def build_recurrence_rules(occurrence_dates, start_time, timezone=DEFAULT_TIMEZONE, unknown_dates=()):
+    """
+    Builds the RRULE/EXDATE lines for a sorted list of dates that share a weekday.
+    Gaps become EXDATEs unless they are in unknown_dates (weeks that could not be
+    scraped), where the series is assumed to continue.
+    Returns an empty list if the dates do not form a recurring series.
+    """
+    if len(occurrence_dates) < 2:
+        return []
+
+    # Biweekly labs and tutorials recur every other week, so use the largest
+    # interval that still lands on every occurrence.
+    interval = 0
+    for previous, current in zip(occurrence_dates, occurrence_dates[1:]):
+        interval = gcd(interval, (current - previous).days // 7)
+    if interval == 0:
+        return []
+
+    span_steps = (occurrence_dates[-1] - occurrence_dates[0]).days // (7 * interval)
+    rrule = f"RRULE:FREQ=WEEKLY;COUNT={span_steps + 1}"
+    if interval > 1:
+        rrule += f";INTERVAL={interval}"
+
+    present = set(occurrence_dates)
+    missing = []
+    for step in range(span_steps + 1):
+        step_date = occurrence_dates[0] + timedelta(days=7 * interval * step)
+        if step_date not in present and step_date not in unknown_dates:
+            missing.append(step_date)
+
+    rules = [rrule]
+    if missing:
+        exdates = ",".join(f"{missing_date.strftime('%Y%m%d')}T{start_time}" for missing_date in missing)
+        rules.append(f"EXDATE;TZID={timezone}:{exdates}")
+    return rules
+
+
+def group_recurring_events(scraped_events, excluded_dates=None, timezone=DEFAULT_TIMEZONE, failed_weeks=None):
+    """
+    Groups repeating weekly occurrences into recurring events.
+
+    scraped_events is the list of dicts produced by the scraper. excluded_dates is
+    an optional iterable of "YYYY-MM-DD" strings (holidays, reading week) on which
+    no class should be created even if the portal still lists one. failed_weeks is
+    an optional iterable of the Mondays ("YYYY-MM-DD") of weeks that could not be
+    scraped; a series is not given EXDATEs in those weeks, since nothing is known
+    about them.
+
+    Returns a new list of event dicts. Events that recur carry a "recurrence" list
+    of RRULE/EXDATE strings (consumed by gcal_service.build_event_body) and an
+    "occurrences" count; one-off events are returned unchanged.
+    """
+    excluded = {datetime.strptime(d, "%Y-%m-%d").date() for d in (excluded_dates or [])}
+    unknown = set()
+    for monday in failed_weeks or []:
+        first_day = datetime.strptime(monday, "%Y-%m-%d").date()
+        unknown.update(first_day + timedelta(days=offset) for offset in range(7))
+
+    groups = {}
+    passthrough = []
+    for event_data in scraped_events:
+        try:
+            event_date = datetime.strptime(event_data["date"], "%Y-%m-%d").date()
+            _start_time_str(event_data["time"])
+        except (KeyError, TypeError, ValueError) as e:
+            logging.warning(f"Cannot group event {event_data}: {e}. Keeping it as a single event.")
+            passthrough.append(event_data)
+            continue
+        groups.setdefault(_group_key(event_data, event_date), {})[event_date] = event_data
+
+    grouped_events = []
+    for occurrences in groups.values():
+        # Excluded dates become gaps in the series (and therefore EXDATEs)
+        kept_dates = [d for d in sorted(occurrences) if d not in excluded]
+        if not kept_dates:
+            continue
+        first = occurrences[kept_dates[0]]
+        start_time = _start_time_str(first["time"])
+
+        rules = build_recurrence_rules(kept_dates, start_time, timezone, unknown - excluded)
+        if not rules:
+            grouped_events.extend(occurrences[d] for d in kept_dates)
+            continue
+
+        grouped_events.append({
+            **first,
+            "recurrence": rules,
+            "occurrences": len(kept_dates),
+        })
+
+    grouped_events.extend(passthrough)
+    grouped_events.sort(key=_chronological_key)
+    logging.info(f"Collapsed {len(scraped_events)} scraped occurrences into {len(grouped_events)} calendar events.")
+    return grouped_events
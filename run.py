@@ -1,4 +1,5 @@
 from app import create_app
+from app.driver_pool import get_driver_pool
 import webbrowser
 import threading
 import sys
@@ -31,6 +32,11 @@ if __name__ == '__main__':
             print("Non-debug mode: Starting browser timer directly.")
             threading.Timer(3, open_browser).start()
             
+    # Start the pooled headless browsers in the process that will serve requests
+    # (with the reloader active, that is the reloaded process, not the initial one)
+    if app.config.get("DRIVER_POOL_PREWARM") and (not INTENDED_DEBUG_MODE or is_werkzeug_main_process):
+        get_driver_pool().prewarm_in_background()
+
     # Important: Using threaded=True to ensure background tasks work properly
     # Note: Using port 5000 for the main Flask app to avoid conflict with
     # Google OAuth flow which will use port 8080 for its temporary local server.
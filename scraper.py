@@ -1,39 +1,196 @@
 # mcmaster_schedule_scraper.py
 from datetime import datetime, timedelta
-import os, json, re
-import time
+import os, sys, json, re
+import argparse
 import logging
-from selenium.webdriver.common.keys import Keys
+import queue
+import threading
+import time
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin
+from week_cache import hash_grid_cells
+import metrics
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional; the parser falls back to BeautifulSoup
+    lxml = None
 
 # --- Configuration & Setup ---
 load_dotenv() # Load environment variables from .env file
 
 MACID = os.environ.get("MACID_USER")
 PASSWORD = os.environ.get("MACID_PASS")
-# For some reason, the first week of the term is not correctly parsed by the scraper, so start one week earlier (this is currently a workaround and done in routes.py)
 START_DATE = datetime(2025, 1, 6)
 END_DATE = datetime(2025, 1, 12)
+# 'http' fetches each week with a direct form POST using the browser's session cookies,
+# 'browser' drives the date box and refresh button in Chrome for every week
+FETCH_MODE = os.environ.get("SCRAPER_FETCH_MODE", "http").lower()
+
+# How browser scraping reads a week: 'script' runs SCHEDULE_CELLS_SCRIPT in the page and gets back
+# only the schedule cells; 'page_source' downloads the whole page and parses it in Python
+EXTRACT_MODE = os.environ.get("SCRAPER_EXTRACT_MODE", "script").lower()
+
+# Lean browser profile: headless, no extensions or GPU, a small window, eager page loads and
+# none of the resource types below, which the parser never looks at
+HEADLESS = os.environ.get("SCRAPER_HEADLESS", "true").lower() == "true"
+LEAN_DRIVER = os.environ.get("SCRAPER_LEAN_DRIVER", "true").lower() == "true"
+BLOCKED_RESOURCES = [t.strip().lower() for t in os.environ.get("SCRAPER_BLOCK_RESOURCES", "image,stylesheet,font,media").split(",") if t.strip()]
+WINDOW_SIZE = os.environ.get("SCRAPER_WINDOW_SIZE", "1024,768")
+# URL patterns (for the DevTools Network.setBlockedURLs command) of each blockable resource type.
+# PeopleSoft serves some images from extensionless cmd=viewattach URLs; images are also blocked by
+# content setting (see lean_chrome_options), which goes by type rather than URL.
+# benchmarks/bench_blocking.py lists the requests of blocked types that still get through.
+RESOURCE_URL_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp", "*.bmp", "*cmd=viewattach*"],
+    "stylesheet": ["*.css"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp3", "*.mp4", "*.webm", "*.ogg", "*.wav"],
+}
+
+# Number of logged-in sessions used to scrape weeks in parallel, capped so the portal isn't hammered
+MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", "2"))
+MAX_WORKERS_LIMIT = 4
+
+REFRESH_ACTION = "DERIVED_CLASS_S_SSR_REFRESH_CAL$8$"
+DATE_FIELD = "DERIVED_CLASS_S_START_DT"
+SCHEDULE_TABLE_ID = "WEEKLY_SCHED_HTMLAREA"
+# PeopleSoft shows this element while a server round-trip is in progress
+PROCESSING_INDICATOR_ID = "WAIT_win0"
+
+# "ENG 1P13 - C01 Lecture 9:30 - 10:20 BSB B136" -> course, type, time, location
+EVENT_TEXT_PATTERN = re.compile(
+    r"(?P<course>[A-Z\s]+\s+\w+)\s+-\s+\w+\s+"
+    r"(?P<type>Lecture|Tutorial|Lab|Laboratory|Core)\s+"
+    r"(?P<time>\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2})\s+"
+    r"(?P<location>.+)",
+    re.IGNORECASE | re.DOTALL
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Leading integer of a rowspan/colspan attribute, read like JavaScript's parseInt
+SPAN_PATTERN = re.compile(r"\s*[+-]?\d+")
+SCHEDULE_TABLE_START_PATTERN = re.compile(r"<table\b[^>]*\bid=[\"']?WEEKLY_SCHED_HTMLAREA\b", re.IGNORECASE)
+TABLE_TAG_PATTERN = re.compile(r"<(/?)table\b", re.IGNORECASE)
+WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Runs in the page and returns the schedule table (id in arguments[0]) as the same
+# [text, row_index, column_index, rowspan] cells as schedule_grid_cells, or null if
+# there is no table, so only a few KB cross the WebDriver wire instead of the page
+SCHEDULE_CELLS_SCRIPT = """
+const table = document.getElementById(arguments[0]);
+if (!table) {
+    return null;
+}
+const span = (cell, name) => {
+    const value = parseInt(cell.getAttribute(name) || "1", 10);
+    return Number.isNaN(value) || value < 1 ? 1 : value;
+};
+const cells = [];
+const occupiedUntil = {};
+for (let rowIndex = 0; rowIndex < table.rows.length; rowIndex++) {
+    let column = 0;
+    for (const cell of table.rows[rowIndex].cells) {
+        while ((occupiedUntil[column] ?? -1) >= rowIndex) {
+            column++;
+        }
+        const rowspan = span(cell, "rowspan");
+        const colspan = span(cell, "colspan");
+        const parts = [];
+        const walker = document.createTreeWalker(cell, NodeFilter.SHOW_TEXT);
+        while (walker.nextNode()) {
+            const text = walker.currentNode.nodeValue.trim();
+            if (text) {
+                parts.push(text);
+            }
+        }
+        cells.push([parts.join(" "), rowIndex, column, rowspan]);
+        for (let spanned = column; spanned < column + colspan; spanned++) {
+            occupiedUntil[spanned] = rowIndex + rowspan - 1;
+        }
+        column += colspan;
+    }
+}
+return cells;
+"""
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def setup_driver():
+def lean_chrome_options(headless=True, blocked_resources=BLOCKED_RESOURCES):
+    """Chrome options for the lean scraping profile (see LEAN_DRIVER)."""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument(f"--window-size={WINDOW_SIZE}")
+    if "image" in blocked_resources:
+        # Skips decoding too, not just the download
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    # Return from driver.get() once the DOM is parsed; every caller waits for the elements it needs
+    chrome_options.page_load_strategy = "eager"
+    return chrome_options
+
+
+def block_resources(driver, resource_types):
+    """
+    Stops the browser from downloading the given resource types (see RESOURCE_URL_PATTERNS).
+    Blocking by URL pattern is a best effort: Fetch.enable could match on resource type,
+    but every request it pauses must then be answered from a DevTools event listener,
+    which execute_cdp_cmd cannot provide, so a missed reply would stall the page.
+    """
+    patterns = []
+    for resource_type in resource_types:
+        patterns.extend(pattern for base in RESOURCE_URL_PATTERNS.get(resource_type, []) for pattern in (base, base + "?*"))
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        logging.warning(f"Could not block {', '.join(resource_types)} requests: {e}")
+
+
+def setup_driver(headless=HEADLESS, lean=LEAN_DRIVER, blocked_resources=BLOCKED_RESOURCES):
     """Initializes and returns the Selenium WebDriver."""
-    # chrome_options = Options()
-    # chrome_options.add_argument("--headless")
-    # chrome_options.add_argument("--disable-gpu")
-    # driver = webdriver.Chrome(options=chrome_options)
-    driver = webdriver.Chrome()  # or Edge/Firefox
-    return driver
+    with metrics.span("driver_start"):
+        if lean:
+            driver = webdriver.Chrome(options=lean_chrome_options(headless, blocked_resources))
+            block_resources(driver, blocked_resources)
+            return driver
+        if headless:
+            chrome_options = Options()
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--disable-gpu")
+            return webdriver.Chrome(options=chrome_options)
+        driver = webdriver.Chrome()  # or Edge/Firefox
+        return driver
+
+
+@contextmanager
+def new_driver_session():
+    """Starts a dedicated browser for one scraping session and quits it afterwards."""
+    driver = setup_driver()
+    try:
+        yield driver
+    finally:
+        logging.info("Closing browser.")
+        driver.quit()
 
 
 def login_to_portal(driver, username, password):
@@ -71,9 +228,12 @@ def navigate_to_weekly_schedule(driver):
         weekly_link = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.ID, "DERIVED_SSS_SCL_SS_WEEKLY_SCHEDULE"))
         )
-        time.sleep(1) # Brief pause before click
         weekly_link.click()
         logging.info("Clicked weekly schedule link.")
+        # The weekly schedule page is ready once its date box has been rendered
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.ID, DATE_FIELD))
+        )
         # The page is now within the iframe. We'll switch back to default_content after processing each week.
     except TimeoutException:
         logging.error("Timeout navigating to weekly schedule or finding elements.")
@@ -86,7 +246,13 @@ def navigate_to_weekly_schedule(driver):
 
 
 def parse_html_to_events(soup, base_date_for_week):
-    """Parses the HTML soup of a weekly schedule table and extracts event data."""
+    """
+    Parses the HTML soup of a weekly schedule table and extracts event data.
+    Legacy offset-based parser, kept for comparison; scraping uses parse_schedule_html.
+    It counts PSLEVEL3GRID cells instead of reading the header, so it relies on the
+    portal's exact layout (each hour's time label spanning two half-hour rows);
+    tests/test_parsers.py records where the two parsers differ off that layout.
+    """
     events_this_week = []
     selector = "table#WEEKLY_SCHED_HTMLAREA td[class*='PSLEVEL3GRID']"
     logging.debug(f"Using selector: '{selector}' for date: {base_date_for_week.strftime('%Y-%m-%d')}")
@@ -170,120 +336,600 @@ def parse_html_to_events(soup, base_date_for_week):
     return events_this_week
 
 
-def scrape_week_data(driver, current_monday):
-    """Inputs date, refreshes schedule, and parses data for the given week."""
+def extract_schedule_table_html(page_html):
+    """
+    Returns just the WEEKLY_SCHED_HTMLAREA table markup from a full portal page,
+    or None if the page has no schedule table. Scanning for the table's tags is far
+    cheaper than building a tree for the whole PeopleSoft page.
+    """
+    start_match = SCHEDULE_TABLE_START_PATTERN.search(page_html)
+    if not start_match:
+        return None
+    depth = 0
+    for tag in TABLE_TAG_PATTERN.finditer(page_html, start_match.start()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return page_html[start_match.start():page_html.index(">", tag.end()) + 1]
+    return page_html[start_match.start():]
+
+
+def _span(value):
+    """A rowspan/colspan attribute as a count of at least 1, treating malformed values as 1 like SCHEDULE_CELLS_SCRIPT."""
+    match = SPAN_PATTERN.match(value or "")
+    return max(1, int(match.group(0))) if match else 1
+
+
+def _table_rows(table_html):
+    """
+    Yields the rows of the schedule table as lists of (text, rowspan, colspan) cells,
+    using lxml when it is installed and BeautifulSoup otherwise.
+    """
+    if lxml is not None:
+        table = lxml.html.fragment_fromstring(table_html)
+        for row in table.xpath("./tr|./thead/tr|./tbody/tr"):
+            yield [
+                (" ".join(text.strip() for text in cell.itertext() if text.strip()),
+                 _span(cell.get("rowspan")),
+                 _span(cell.get("colspan")))
+                for cell in row.xpath("./td|./th")
+            ]
+    else:
+        table = BeautifulSoup(table_html, "html.parser").find("table")
+        for row in table.find_all("tr"):
+            if row.find_parent("table") is not table:
+                continue
+            yield [
+                (" ".join(cell.stripped_strings),
+                 _span(cell.get("rowspan")),
+                 _span(cell.get("colspan")))
+                for cell in row.find_all(["td", "th"], recursive=False)
+            ]
+
+
+def schedule_grid_cells(table_html):
+    """
+    Places every cell of the schedule table on an explicit grid, accounting for
+    cells from earlier rows that are still occupying a column through rowspan.
+    Returns a list of (text, row_index, column_index, rowspan) tuples.
+    """
+    cells = []
+    occupied_until = {}  # column -> last row index covered by a rowspan cell
+    for row_index, row in enumerate(_table_rows(table_html)):
+        column = 0
+        for text, rowspan, colspan in row:
+            while occupied_until.get(column, -1) >= row_index:
+                column += 1
+            cells.append((text, row_index, column, rowspan))
+            for spanned in range(column, column + colspan):
+                occupied_until[spanned] = row_index + rowspan - 1
+            column += colspan
+    return cells
+
+
+def events_from_grid_cells(cells, base_date_for_week):
+    """
+    Turns grid cells into event dicts. Columns are mapped to weekdays from the
+    header row ("Monday", "Tuesday", ...); without a recognisable header, column 0
+    is taken to be the time column and columns 1-7 to be Monday-Sunday.
+    """
+    column_days = {}
+    for text, _, column, _ in cells:
+        first_word = text.split(" ", 1)[0].lower()
+        if first_word in WEEKDAY_NAMES:
+            column_days[column] = WEEKDAY_NAMES.index(first_word)
+
+    events_this_week = []
+    for text, _, column, _ in cells:
+        if not text:
+            continue
+        m = EVENT_TEXT_PATTERN.match(text)
+        if not m:
+            continue
+        day_index = column_days.get(column, -1) if column_days else column - 1
+        if not 0 <= day_index <= 6:
+            logging.warning(f"Event '{text}' found outside the day columns (column {column}); skipping.")
+            continue
+        event_date = base_date_for_week + timedelta(days=day_index)
+        course_details = m.groupdict()
+        course_details["course"] = WHITESPACE_PATTERN.sub(" ", course_details["course"]).strip()
+        events_this_week.append({
+            "week_of": base_date_for_week.strftime("%Y-%m-%d"),
+            "date": event_date.strftime("%Y-%m-%d"),
+            **course_details
+        })
+    return events_this_week
+
+
+def parse_schedule_html(page_html, base_date_for_week, week_cache=None, cache_user=None):
+    """
+    Parses a weekly schedule page (raw HTML) into event dicts in a single pass over
+    just the schedule table. Produces the same dicts as parse_html_to_events.
+
+    With a week_cache (see week_cache.WeekCache) the table's grid cells are hashed
+    and, if cache_user's entry for this week has the same hash, its events are
+    returned instead of being rebuilt. Freshly parsed weeks are stored in the cache.
+    """
+    table_html = extract_schedule_table_html(page_html)
+    if table_html is None:
+        logging.warning(f"No schedule table found for week starting {base_date_for_week.strftime('%Y-%m-%d')}. The page might be empty or structure changed.")
+        return []
+    return _cached_week_events(schedule_grid_cells(table_html), base_date_for_week, week_cache, cache_user)
+
+
+def parse_schedule_cells(cells, base_date_for_week, week_cache=None, cache_user=None):
+    """
+    Turns the cells returned by SCHEDULE_CELLS_SCRIPT into event dicts, like
+    parse_schedule_html does for page HTML. Both key the week_cache on the same
+    grid cells, so a week read either way hits the same entry.
+    """
+    return _cached_week_events(cells, base_date_for_week, week_cache, cache_user)
+
+
+def _cached_week_events(cells, base_date_for_week, week_cache, cache_user):
+    """Returns the grid cells' events, from the week_cache if the cells hash the same as last time."""
+    if week_cache is None:
+        return events_from_grid_cells(cells, base_date_for_week)
+
+    grid_hash = hash_grid_cells(cells)
+    cached_events = week_cache.get(cache_user, base_date_for_week, grid_hash)
+    if cached_events is not None:
+        logging.info(f"Week of {base_date_for_week.strftime('%d/%m/%Y')} is unchanged; using cached events.")
+        return cached_events
+    weekly_events = events_from_grid_cells(cells, base_date_for_week)
+    week_cache.put(cache_user, base_date_for_week, grid_hash, weekly_events)
+    return weekly_events
+
+
+def wait_for_schedule_refresh(driver, old_table, timeout=10):
+    """
+    Waits until a refresh of the weekly schedule has finished rendering: the
+    previous schedule table (if there was one) has been detached from the page,
+    PeopleSoft's processing indicator has cleared, and the new table is present.
+    """
+    wait = WebDriverWait(driver, timeout)
+    if old_table is not None:
+        wait.until(EC.staleness_of(old_table))
+    wait.until(EC.invisibility_of_element_located((By.ID, PROCESSING_INDICATOR_ID)))
+    wait.until(EC.presence_of_element_located((By.ID, SCHEDULE_TABLE_ID)))
+
+
+def scrape_week_data(driver, current_monday, week_cache=None, cache_user=None, extract_mode=EXTRACT_MODE):
+    """
+    Inputs date, refreshes schedule, and parses data for the given week. With
+    extract_mode 'script' the schedule cells are read in the page (falling back to
+    the page source if the script fails); with 'page_source' the page is parsed here.
+    Returns None if the week could not be scraped, as opposed to [] for a week
+    without classes, so callers never mistake a failure for an empty week.
+    """
     logging.info(f"Scraping week of: {current_monday.strftime('%d/%m/%Y')}")
     try:
+        wait_started = time.perf_counter()
         # Ensure we are in the correct iframe for date input and refresh
         WebDriverWait(driver, 10).until(
             EC.frame_to_be_available_and_switch_to_it((By.NAME, "TargetContent"))
         )
 
         date_box = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "DERIVED_CLASS_S_START_DT"))
+            EC.presence_of_element_located((By.ID, DATE_FIELD))
         )
-        
-        # Clear the date box
-        current_value_len = len(date_box.get_attribute('value'))
-        for _ in range(current_value_len):
-            date_box.send_keys(Keys.BACKSPACE)
-        time.sleep(0.2) # Short pause after clearing
+        # Keep a handle on the current table so we can tell when the refresh replaces it
+        existing_tables = driver.find_elements(By.ID, SCHEDULE_TABLE_ID)
+        old_table = existing_tables[0] if existing_tables else None
 
+        # Select the current value so the typed date replaces it in one go
+        driver.execute_script("arguments[0].select();", date_box)
         date_box.send_keys(current_monday.strftime("%d/%m/%Y"))
-        time.sleep(0.2) # Short pause after sending keys
 
-        refresh_button = driver.find_element(By.ID, "DERIVED_CLASS_S_SSR_REFRESH_CAL$8$")
+        refresh_button = driver.find_element(By.ID, REFRESH_ACTION)
         refresh_button.click()
-        
-        # Wait for an element within the schedule to indicate it has reloaded.
-        # This could be the table itself or a specific known element.
-        # If the table reloads, an old reference to it would become stale.
-        # For simplicity, let's wait for the date box to update AND a brief pause for content to load.
-        # A more robust wait would be for a specific element in the schedule table to be present/visible again.
+
+        wait_for_schedule_refresh(driver, old_table)
         WebDriverWait(driver, 10).until(
-            EC.text_to_be_present_in_element_value((By.ID, "DERIVED_CLASS_S_START_DT"), current_monday.strftime("%d/%m/%Y"))
+            EC.text_to_be_present_in_element_value((By.ID, DATE_FIELD), current_monday.strftime("%d/%m/%Y"))
         )
-        # Add a slightly longer, more reliable wait for the table to actually refresh its content.
-        # This might involve waiting for a specific element in the table to be stale and then reappear,
-        # or simply waiting for the loading indicator (if any) to disappear.
-        # For now, a slightly increased explicit wait after the date is confirmed.
-        time.sleep(1.5) # Increased wait for schedule content to refresh after date input confirmation
 
+        metrics.observe("week_wait", time.perf_counter() - wait_started)
         logging.info(f"Refreshed schedule for week: {current_monday.strftime('%d/%m/%Y')}")
         
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        weekly_events = parse_html_to_events(soup, current_monday)
+        cells = None
+        if extract_mode == "script":
+            try:
+                with metrics.span("week_script"):
+                    cells = driver.execute_script(SCHEDULE_CELLS_SCRIPT, SCHEDULE_TABLE_ID)
+            except WebDriverException as e:
+                logging.warning(f"Schedule extraction script failed, reading the page source instead: {e}")
+        if cells is not None:
+            with metrics.span("week_parse"):
+                weekly_events = parse_schedule_cells(cells, current_monday, week_cache, cache_user)
+        else:
+            with metrics.span("week_page_source"):
+                page_html = driver.page_source
+            with metrics.span("week_parse"):
+                weekly_events = parse_schedule_html(page_html, current_monday, week_cache, cache_user)
         
         driver.switch_to.default_content() # Switch out of iframe
-        time.sleep(0.5) # Brief pause after switching from iframe
         return weekly_events
 
     except TimeoutException:
         logging.error(f"Timeout during scraping week {current_monday.strftime('%d/%m/%Y')}.")
         driver.switch_to.default_content() # Ensure we are not stuck in an iframe on error
-        return [] # Return empty list on error for this week
+        return None
     except NoSuchElementException:
         logging.error(f"Element not found during scraping week {current_monday.strftime('%d/%m/%Y')}.")
         driver.switch_to.default_content() # Ensure we are not stuck in an iframe on error
-        return [] # Return empty list on error for this week
+        return None
     except Exception as e:
         logging.error(f"An unexpected error occurred during scraping week {current_monday.strftime('%d/%m/%Y')}: {e}")
         driver.switch_to.default_content() # Ensure we are not stuck in an iframe on error
+        return None
+
+
+class WeeklyScheduleFetcher:
+    """
+    Fetches weekly schedule pages over plain HTTP after Selenium has logged in.
+
+    The browser is only used to authenticate and open the weekly schedule page once.
+    Its cookies and the PeopleSoft form state are then copied into a pooled requests
+    session, and each week is fetched by POSTing the date field and refresh action
+    directly, which takes a single round-trip instead of several seconds of clicking.
+    """
+
+    def __init__(self, page_url, page_html, cookies, user_agent=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        self.session.headers["Referer"] = page_url
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+
+        self.action_url = page_url
+        self.form_fields = {}
+        self._update_form_state(page_html, page_url)
+
+    def _update_form_state(self, page_html, page_url):
+        """Reads the action URL and current field values of the PeopleSoft form."""
+        form = BeautifulSoup(page_html, "html.parser").find("form", attrs={"name": "win0"})
+        if form is None:
+            raise ValueError("PeopleSoft form 'win0' not found in weekly schedule page.")
+        if form.get("action"):
+            self.action_url = urljoin(page_url, form["action"])
+
+        fields = {}
+        for field in form.find_all("input"):
+            name = field.get("name")
+            if not name:
+                continue
+            field_type = (field.get("type") or "text").lower()
+            if field_type in ("checkbox", "radio") and not field.has_attr("checked"):
+                continue
+            if field_type in ("button", "submit", "image", "file"):
+                continue
+            fields[name] = field.get("value", "")
+        for field in form.find_all("select"):
+            name = field.get("name")
+            if not name:
+                continue
+            selected = field.find("option", selected=True) or field.find("option")
+            fields[name] = selected.get("value", "") if selected else ""
+        self.form_fields = fields
+
+    def fetch_week_html(self, current_monday):
+        """POSTs the refresh form for the given week and returns the page HTML."""
+        data = dict(self.form_fields)
+        data["ICAction"] = REFRESH_ACTION
+        data[DATE_FIELD] = current_monday.strftime("%d/%m/%Y")
+
+        response = self.session.post(self.action_url, data=data, timeout=30)
+        response.raise_for_status()
+        page_html = response.text
+        if "WEEKLY_SCHED_HTMLAREA" not in page_html:
+            # Usually an expired session bouncing to the login page
+            raise ValueError("Response does not contain the weekly schedule table.")
+
+        # PeopleSoft rejects stale state numbers, so carry the new form state forward
+        self._update_form_state(page_html, response.url)
+        return page_html
+
+    def scrape_week(self, current_monday, week_cache=None, cache_user=None):
+        """
+        Fetches and parses one week. Returns the list of events, or None if the
+        HTTP fetch failed and the caller should fall back to scrape_week_data.
+        """
+        logging.info(f"Fetching week of: {current_monday.strftime('%d/%m/%Y')} over HTTP")
+        try:
+            with metrics.span("week_fetch"):
+                page_html = self.fetch_week_html(current_monday)
+        except (requests.RequestException, ValueError) as e:
+            logging.warning(f"HTTP fetch failed for week {current_monday.strftime('%d/%m/%Y')}: {e}")
+            return None
+        with metrics.span("week_parse"):
+            return parse_schedule_html(page_html, current_monday, week_cache, cache_user)
+
+
+def create_http_fetcher(driver):
+    """
+    Builds a WeeklyScheduleFetcher from a logged-in driver that has opened the weekly
+    schedule page (see navigate_to_weekly_schedule). Returns None if the page state
+    could not be captured, in which case callers should scrape with the browser.
+    """
+    try:
+        driver.switch_to.default_content()
+        WebDriverWait(driver, 10).until(
+            EC.frame_to_be_available_and_switch_to_it((By.NAME, "TargetContent"))
+        )
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.ID, DATE_FIELD))
+        )
+        page_url = driver.execute_script("return document.location.href;")
+        page_html = driver.page_source
+        user_agent = driver.execute_script("return navigator.userAgent;")
+        cookies = driver.get_cookies()
+        fetcher = WeeklyScheduleFetcher(page_url, page_html, cookies, user_agent)
+        logging.info("Captured portal session for direct HTTP fetching.")
+        return fetcher
+    except (WebDriverException, ValueError, KeyError, TypeError) as e:
+        # WebDriverException covers timeouts, missing elements and failing scripts; the
+        # others come from unexpected cookie or page data
+        logging.warning(f"Could not set up HTTP fetching, falling back to browser scraping: {e}")
+        return None
+    finally:
+        try:
+            driver.switch_to.default_content()
+        except WebDriverException as e:
+            logging.warning(f"Could not return to the top-level page: {e}")
+
+
+def week_mondays(start_date, end_date):
+    """Returns the Monday of every week from the week containing start_date up to end_date."""
+    current_monday = start_date - timedelta(days=start_date.weekday())
+    mondays = []
+    while current_monday <= end_date:
+        mondays.append(current_monday)
+        current_monday += timedelta(days=7)
+    return mondays
+
+
+def scrape_weeks_in_session(username, password, mondays, fetch_mode=FETCH_MODE, on_week_done=None, on_stage=None,
+                            driver_session=new_driver_session, collect_results=True, week_cache=None,
+                            extract_mode=EXTRACT_MODE):
+    """
+    Logs in with a browser session and scrapes the given weeks one after another.
+    Returns a dict mapping each Monday to its list of events, or to None if that
+    week could not be scraped (the dict is empty if collect_results is False, for
+    callers that consume weeks via on_week_done).
+
+    on_week_done(monday, events) is called after each week, with events None for a
+    week that could not be scraped; on_stage(stage, message)
+    is called as the session moves through the "driver", "login" and "navigate" stages.
+    driver_session is a context manager factory yielding the driver to use, e.g. a
+    lease from a driver pool; by default a new browser is started and quit.
+    With a week_cache, weeks whose schedule table is unchanged are not re-parsed.
+    extract_mode is how weeks scraped with the browser are read (see scrape_week_data).
+    """
+    def report_stage(stage, message):
+        if on_stage:
+            on_stage(stage, message)
+
+    results = {}
+    if not mondays:
+        return results
+    report_stage("driver", "Setting up browser driver...")
+    # Time from asking for a browser to having one, including any wait for a pooled driver
+    lease_started = time.perf_counter()
+    with driver_session() as driver:
+        metrics.observe("driver", time.perf_counter() - lease_started)
+        report_stage("login", "Logging into portal...")
+        with metrics.span("login"):
+            login_to_portal(driver, username, password)
+
+        report_stage("navigate", "Navigating to weekly schedule page...")
+        with metrics.span("navigate"):
+            navigate_to_weekly_schedule(driver)
+        if fetch_mode == "http":
+            with metrics.span("capture_session"):
+                fetcher = create_http_fetcher(driver)
+        else:
+            fetcher = None
+        driver.switch_to.default_content()
+
+        for current_monday in mondays:
+            weekly_events = None
+            if fetcher:
+                weekly_events = fetcher.scrape_week(current_monday, week_cache, username)
+                if weekly_events is None:
+                    # Usually an expired session, which every later fetch would also wait out
+                    logging.warning("HTTP fetching failed; scraping the remaining weeks with the browser.")
+                    fetcher = None
+            if weekly_events is None:
+                weekly_events = scrape_week_data(driver, current_monday, week_cache, username, extract_mode)
+            if weekly_events is None:
+                logging.warning(f"Week of {current_monday.strftime('%d/%m/%Y')} could not be scraped; reporting it as failed.")
+            if collect_results:
+                results[current_monday] = weekly_events
+            if on_week_done:
+                on_week_done(current_monday, weekly_events)
+    return results
+
+
+def scrape_weeks_parallel(username, password, mondays, max_workers=MAX_WORKERS, fetch_mode=FETCH_MODE,
+                          on_week_done=None, on_stage=None, driver_session=new_driver_session, collect_results=True,
+                          week_cache=None, extract_mode=EXTRACT_MODE, failed_weeks=None):
+    """
+    Scrapes the given weeks using up to max_workers independently logged-in sessions
+    and returns all events merged back into date order. Weeks that could not be
+    scraped contribute no events; if failed_weeks is a list, their Mondays are
+    appended to it so callers can leave those weeks alone instead of treating them
+    as weeks without classes.
+
+    Weeks are dealt round-robin to the workers so every worker finishes at about the
+    same time. max_workers is capped at MAX_WORKERS_LIMIT. Callbacks are the same as
+    scrape_weeks_in_session and may be called from worker threads. If any worker
+    fails (e.g. its login times out) the exception is re-raised once all workers stop.
+    With collect_results False nothing is kept and an empty list is returned.
+    """
+    if not mondays:
+        # Nothing to scrape, so do not lease a browser or log in
         return []
+    workers = max(1, min(max_workers, MAX_WORKERS_LIMIT, len(mondays)))
+    if workers == 1:
+        results = scrape_weeks_in_session(username, password, mondays, fetch_mode, on_week_done, on_stage, driver_session,
+                                          collect_results, week_cache, extract_mode)
+    else:
+        logging.info(f"Scraping {len(mondays)} weeks with {workers} parallel sessions.")
+        chunks = [mondays[worker::workers] for worker in range(workers)]
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as executor:
+            futures = [
+                executor.submit(metrics.propagate_context(scrape_weeks_in_session), username, password, chunk, fetch_mode, on_week_done, on_stage,
+                                driver_session, collect_results, week_cache, extract_mode)
+                for chunk in chunks
+            ]
+            for future in futures:
+                results.update(future.result())
 
-
-def main():
-    """Main function to orchestrate the scraping process."""
-    if not MACID or not PASSWORD:
-        logging.error("MACID_USER and MACID_PASS environment variables must be set.")
-        return
-
-    driver = setup_driver()
     all_schedule_data = []
+    for current_monday in sorted(results):
+        if results[current_monday] is None:
+            if failed_weeks is not None:
+                failed_weeks.append(current_monday)
+            continue
+        all_schedule_data.extend(results[current_monday])
+    return all_schedule_data
+
+
+class ScrapeStopped(Exception):
+    """Raised inside scraping workers when the consumer of scrape_range stops early."""
+
+
+def scrape_range(username, password, start_date, end_date, max_workers=MAX_WORKERS, fetch_mode=FETCH_MODE,
+                 on_stage=None, driver_session=new_driver_session, week_cache=None, extract_mode=EXTRACT_MODE):
+    """
+    Generator yielding (monday, events) for every week from start_date to end_date,
+    in date order, as soon as each week has been scraped (events is None for a week
+    that could not be scraped). Weeks are not kept once
+    yielded, so memory stays flat however long the range is. Closing the generator
+    early stops the scraping sessions after the week they are working on.
+    """
+    mondays = week_mondays(start_date, end_date)
+    finished = queue.Queue()
+    stop = threading.Event()
+
+    def on_week_done(monday, events):
+        if stop.is_set():
+            raise ScrapeStopped()
+        finished.put((monday, events))
+
+    def run():
+        try:
+            scrape_weeks_parallel(username, password, mondays, max_workers, fetch_mode, on_week_done, on_stage,
+                                  driver_session, collect_results=False, week_cache=week_cache,
+                                  extract_mode=extract_mode)
+            finished.put(None)
+        except Exception as e:
+            finished.put(e)
+
+    worker = threading.Thread(target=metrics.propagate_context(run), name="scrape-range", daemon=True)
+    worker.start()
+    # Parallel sessions can finish weeks out of order; hold early ones until their turn
+    waiting = {}
+    next_index = 0
     try:
-        login_to_portal(driver, MACID, PASSWORD)
-        navigate_to_weekly_schedule(driver) # Navigates and stays in iframe initially
-
-        current_monday = START_DATE
-        while current_monday <= END_DATE:
-            # The navigate_to_weekly_schedule leaves us in the iframe.
-            # scrape_week_data expects to switch into TargetContent itself,
-            # and switches out after it's done.
-            # So, before the first call and between calls, we should be in default_content.
-            # The first call to navigate_to_weekly_schedule handles getting into the iframe.
-            # Subsequent calls to scrape_week_data will handle iframe switching internally.
-
-            # If not the first iteration, ensure we are in default content before scrape_week_data
-            # (which will then switch into the iframe)
-            if current_monday != START_DATE:
-                 pass # scrape_week_data handles iframe switching
-
-            weekly_events = scrape_week_data(driver, current_monday)
-            if weekly_events:
-                all_schedule_data.extend(weekly_events)
-            
-            current_monday += timedelta(days=7)
-            # No need for explicit sleep here if WebDriverWait is used effectively within scrape_week_data
-            # However, a small politeness delay can be added if desired.
-            # time.sleep(1)
+        while next_index < len(mondays):
+            item = finished.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            monday, events = item
+            waiting[monday] = events
+            while next_index < len(mondays) and mondays[next_index] in waiting:
+                yield mondays[next_index], waiting.pop(mondays[next_index])
+                next_index += 1
+    finally:
+        stop.set()
+        worker.join()
+
+
+class ScheduleWriter:
+    """
+    Writes scraped events to a file as they arrive, flushing after every week so a
+    crash keeps everything written so far. "jsonl" writes one event per line;
+    "json" writes the original indented array (complete once close() is called).
+    """
+
+    def __init__(self, path, output_format="jsonl"):
+        self.output_format = output_format
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8")
+        if output_format == "json":
+            self._file.write("[")
+
+    def write_week(self, events):
+        for event in events:
+            if self.output_format == "json":
+                separator = "," if self.count else ""
+                indented = json.dumps(event, indent=2).replace("\n", "\n  ")
+                self._file.write(f"{separator}\n  {indented}")
+            else:
+                self._file.write(json.dumps(event) + "\n")
+            self.count += 1
+        self._file.flush()
 
+    def close(self):
+        if self.output_format == "json":
+            self._file.write("\n]\n" if self.count else "]\n")
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
-    except Exception as e:
-        logging.error(f"An error occurred in the main process: {e}")
-    finally:
-        logging.info("Closing browser.")
-        driver.quit()
 
-    if all_schedule_data:
-        output_filename = "schedule.json"
-        with open(output_filename, "w", encoding="utf-8") as f:
-            json.dump(all_schedule_data, f, indent=2)
-        logging.info(f"Wrote {len(all_schedule_data)} meeting blocks to {output_filename}")
+def main(argv=None):
+    """Scrapes the schedule and streams it to a JSON Lines (or JSON) file week by week."""
+    arg_parser = argparse.ArgumentParser(description="Scrape a McMaster weekly schedule from Mosaic.")
+    arg_parser.add_argument("--start", default=START_DATE.strftime("%Y-%m-%d"), help="First day (YYYY-MM-DD).")
+    arg_parser.add_argument("--end", default=END_DATE.strftime("%Y-%m-%d"), help="Last day (YYYY-MM-DD).")
+    arg_parser.add_argument("--format", choices=("jsonl", "json"), default="jsonl",
+                            help="jsonl: one event per line; json: a single indented array.")
+    arg_parser.add_argument("-o", "--output", help="Output file (default schedule.jsonl or schedule.json).")
+    arg_parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Parallel portal sessions.")
+    args = arg_parser.parse_args(argv)
+
+    if not MACID or not PASSWORD:
+        logging.error("MACID_USER and MACID_PASS environment variables must be set.")
+        return 1
+
+    output_filename = args.output or f"schedule.{args.format}"
+    start_date = datetime.strptime(args.start, "%Y-%m-%d")
+    end_date = datetime.strptime(args.end, "%Y-%m-%d")
+    exit_code = 0
+    with ScheduleWriter(output_filename, args.format) as writer:
+        try:
+            for monday, weekly_events in scrape_range(MACID, PASSWORD, start_date, end_date, max_workers=args.workers):
+                if weekly_events is None:
+                    logging.error(f"Week of {monday.strftime('%Y-%m-%d')} could not be scraped; it is missing from {output_filename}")
+                    exit_code = 1
+                    continue
+                writer.write_week(weekly_events)
+                logging.info(f"Wrote week of {monday.strftime('%Y-%m-%d')} ({len(weekly_events)} events) to {output_filename}")
+        except Exception as e:
+            logging.error(f"An error occurred in the main process: {e}")
+            exit_code = 1
+
+    if writer.count:
+        logging.info(f"Wrote {writer.count} meeting blocks to {output_filename}")
     else:
         logging.info("No schedule data was scraped.")
     
     logging.info("Done!")
+    return exit_code
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The application modules live in the repository root rather than an installed package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+
+@pytest.fixture
+def fake_gcal():
+    """Starts benchmarks/fake_gcal_server.py; call with its options, get back (state, api_root)."""
+    sys.path.insert(0, BENCHMARKS_DIR)
+    try:
+        import fake_gcal_server
+    finally:
+        sys.path.remove(BENCHMARKS_DIR)
+    servers = []
+
+    def start(**options):
+        server, api_root = fake_gcal_server.start_in_background(**options)
+        servers.append(server)
+        return server.RequestHandlerClass.state, api_root
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
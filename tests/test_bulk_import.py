@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import bulk_import
+
+
+def write_csv(tmp_path, *lines):
+    path = tmp_path / "accounts.csv"
+    path.write_text("\n".join(["macid,password_env,start_date,end_date,calendar_id,token_file", *lines]) + "\n",
+                    encoding="utf-8")
+    return str(path)
+
+
+def write_jsonl(tmp_path, *rows):
+    path = tmp_path / "accounts.jsonl"
+    path.write_text("\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n",
+                    encoding="utf-8")
+    return str(path)
+
+
+def test_csv_manifest_with_defaults(tmp_path):
+    path = write_csv(tmp_path,
+                     "student1,PASS_1,2025-01-06,2025-04-08,cal-1,tokens/student1.json",
+                     " student2 ,PASS_2,2025-01-06,2025-01-31,,")
+
+    assert bulk_import.load_manifest(path) == [
+        {"macid": "student1", "password_env": "PASS_1", "start_date": datetime(2025, 1, 6),
+         "end_date": datetime(2025, 4, 8), "calendar_id": "cal-1", "token_file": "tokens/student1.json"},
+        {"macid": "student2", "password_env": "PASS_2", "start_date": datetime(2025, 1, 6),
+         "end_date": datetime(2025, 1, 31), "calendar_id": "primary", "token_file": None},
+    ]
+
+
+def test_jsonl_manifest_skips_blank_lines(tmp_path):
+    path = write_jsonl(tmp_path,
+                       {"macid": "student1", "password_env": "PASS_1", "start_date": "2025-01-06", "end_date": "2025-01-12"},
+                       "",
+                       {"macid": "student2", "password_env": "PASS_2", "start_date": "2025-01-06", "end_date": "2025-01-12"})
+
+    assert [account["macid"] for account in bulk_import.load_manifest(path)] == ["student1", "student2"]
+
+
+@pytest.mark.parametrize("line, error", [
+    ("student1,,2025-01-06,2025-01-12,,", "row 2: missing password_env"),
+    ("student1,PASS_1,06/01/2025,2025-01-12,,", "row 2: dates must be YYYY-MM-DD"),
+    ("student1,PASS_1,2025-01-12,2025-01-06,,", "row 2: end_date is before start_date"),
+    ("STUDENT0,PASS_1,2025-01-06,2025-01-12,,", "row 2: STUDENT0 is listed more than once"),
+])
+def test_csv_manifest_errors_name_the_row(tmp_path, line, error):
+    path = write_csv(tmp_path, "student0,PASS_0,2025-01-06,2025-01-12,,", line)
+
+    with pytest.raises(ValueError, match=error):
+        bulk_import.load_manifest(path)
+
+
+@pytest.mark.parametrize("line, error", [
+    ('{"macid": "student1", ', "row 2: not valid JSON"),
+    ('["student1", "PASS_1"]', "row 2: expected an object"),
+])
+def test_malformed_jsonl_rows_name_the_row(tmp_path, line, error):
+    path = write_jsonl(tmp_path,
+                       {"macid": "student0", "password_env": "PASS_0", "start_date": "2025-01-06", "end_date": "2025-01-12"},
+                       line)
+
+    with pytest.raises(ValueError, match=error):
+        bulk_import.load_manifest(path)
@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+import gcal_async
+import gcal_ratelimit
+import gcal_service
+from test_sync_plan import scraped
+
+pytestmark = pytest.mark.skipif(gcal_async.aiohttp is None, reason="aiohttp is not installed")
+
+
+class Cancelled(Exception):
+    pass
+
+
+class RefreshableCredentials:
+    def __init__(self, token):
+        self.token = token
+
+
+@pytest.fixture
+def publisher():
+    publisher = gcal_async.AsyncCalendarPublisher(concurrency=4, timeout=5)
+    yield publisher
+    publisher.close()
+
+
+@pytest.fixture
+def oauth_api(fake_gcal, monkeypatch):
+    """The fake API reached as if it were Google's, with OAuth headers and an expired first token."""
+    state, api_root = fake_gcal(rejected_tokens={"expired"})
+    creds = RefreshableCredentials("expired")
+    refreshes = []
+    refresh_lock = threading.Lock()
+
+    def refresh_credentials(rejected_token):
+        # Serialized like gcal_service.refresh_credentials, which only refreshes a token still current
+        with refresh_lock:
+            if creds.token == rejected_token:
+                refreshes.append(rejected_token)
+                creds.token = f"fresh-{len(refreshes)}"
+        return creds
+
+    monkeypatch.setattr(gcal_service, "API_ROOT", None)
+    monkeypatch.setattr(gcal_async.AsyncCalendarPublisher, "_api_base", staticmethod(lambda: api_root + "calendar/v3"))
+    monkeypatch.setattr(gcal_service, "get_credentials", lambda: creds)
+    monkeypatch.setattr(gcal_service, "refresh_credentials", refresh_credentials)
+    monkeypatch.setattr(gcal_ratelimit, "_bucket", gcal_ratelimit.TokenBucket(rate=1000, capacity=1000))
+    return state, creds, refreshes
+
+
+def test_expired_token_is_refreshed_once_and_the_requests_retried(publisher, oauth_api):
+    state, creds, refreshes = oauth_api
+    events = [scraped(f"2025-01-{day:02d}") for day in range(6, 11)]
+
+    results = publisher.create_calendar_events(events)
+
+    assert all(result["created"] for result in results)
+    assert len(state.calendars["primary"]["events"]) == len(events)
+    assert creds.token == "fresh-1"
+    assert refreshes == ["expired"]
+
+
+def test_token_rejected_again_after_refresh_fails_the_request(publisher, oauth_api):
+    state, creds, refreshes = oauth_api
+    state.rejected_tokens.add("fresh-1")
+
+    results = publisher.create_calendar_events([scraped("2025-01-06")])
+
+    assert results[0]["created"] is None
+    assert results[0]["error"].startswith("<HttpError 401")
+    assert refreshes == ["expired"]
+
+
+@pytest.fixture
+def local_api(fake_gcal, monkeypatch):
+    """The fake API in local mode (no OAuth), with retries not waiting; returns the fake API state."""
+    state, api_root = fake_gcal()
+    monkeypatch.setattr(gcal_service, "API_ROOT", api_root)
+    monkeypatch.setattr(gcal_ratelimit, "_bucket", gcal_ratelimit.TokenBucket(rate=1000, capacity=1000))
+    monkeypatch.setattr(gcal_ratelimit, "backoff_delay", lambda attempt: 0)
+    return state
+
+
+def test_sync_applies_only_the_changes_and_a_rerun_is_a_no_op(publisher, local_api):
+    week = [scraped("2025-01-06"), scraped("2025-01-07", course="MATH 1ZA3"), scraped("2025-01-08", course="CHEM 1E03")]
+    assert publisher.sync_calendar_events(week, "primary", "2025-01-06", "2025-01-12")["inserted"] == 3
+
+    changed = [week[0], scraped("2025-01-07", course="MATH 1ZA3", location="JHE 376"), scraped("2025-01-09")]
+    summary = publisher.sync_calendar_events(changed, "primary", "2025-01-06", "2025-01-12")
+
+    assert summary == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1, "failed": 0}
+    rerun = publisher.sync_calendar_events(changed, "primary", "2025-01-06", "2025-01-12")
+    assert rerun == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 3, "failed": 0}
+
+
+def test_rate_limited_and_failing_requests_are_retried(publisher, local_api, monkeypatch):
+    # Requests get a 429 or a 503 until the first of them backs off
+    local_api.error_rate_429 = local_api.error_rate_503 = 0.5
+    backoffs = []
+
+    def backoff_delay(attempt):
+        backoffs.append(attempt)
+        local_api.error_rate_429 = local_api.error_rate_503 = 0.0
+        return 0
+    monkeypatch.setattr(gcal_ratelimit, "backoff_delay", backoff_delay)
+    events = [scraped(f"2025-01-{day:02d}", course=f"ENG 1P{day:02d}") for day in range(6, 16)]
+
+    results = publisher.create_calendar_events(events)
+
+    assert [result["error"] for result in results] == [None] * len(events)
+    assert len(local_api.calendars["primary"]["events"]) == len(events)
+    assert backoffs and set(backoffs) == {0}
+
+
+def test_a_failing_callback_cancels_the_outstanding_requests(publisher, local_api):
+    local_api.latency_ms = 200
+    events = [scraped(f"2025-01-{day:02d}", course=f"ENG 1P{day:02d}") for day in range(6, 31)]
+
+    def cancel(done, total):
+        if done:
+            raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        publisher.create_calendar_events(events, progress_callback=cancel)
+    assert len(local_api.calendars["primary"]["events"]) < len(events)
@@ -0,0 +1,111 @@
+import pytest
+
+import gcal_ratelimit
+import gcal_service
+from test_sync_plan import scraped
+
+
+@pytest.fixture
+def fake_api(fake_gcal, monkeypatch):
+    """A Calendar service on the fake API; returns (service, fake API state)."""
+    state, api_root = fake_gcal()
+    monkeypatch.setattr(gcal_service, "API_ROOT", api_root)
+    monkeypatch.setattr(gcal_service, "_service_cache",
+                        {"service": None, "creds": None, "token_mtime": None, "api_root": None})
+    monkeypatch.setattr(gcal_ratelimit, "_bucket", gcal_ratelimit.TokenBucket(rate=1000, capacity=1000))
+    return gcal_service.get_calendar_service(), state
+
+
+def before_retry(monkeypatch, action=lambda: None):
+    """Runs action() in place of the backoff sleep, between a failed attempt and its retry."""
+    attempts = []
+
+    def sleep_before_retry(attempt):
+        attempts.append(attempt)
+        action()
+    monkeypatch.setattr(gcal_ratelimit, "sleep_before_retry", sleep_before_retry)
+    return attempts
+
+
+def store_event(state, event_id, status="confirmed"):
+    body = gcal_service.build_sync_event_body(scraped("2025-01-06"))
+    state.calendars["primary"]["events"][event_id] = {**body, "id": event_id, "status": status}
+
+
+def insert_request(service, event_id):
+    body = {**gcal_service.build_sync_event_body(scraped("2025-01-06")), "id": event_id}
+    return service.events().insert(calendarId="primary", body=body)
+
+
+def delete_request(service, event_id):
+    return service.events().delete(calendarId="primary", eventId=event_id)
+
+
+def test_retried_insert_that_already_went_through_is_not_an_error(fake_api, monkeypatch):
+    service, state = fake_api
+    state.error_rate_429 = 1.0
+
+    def first_attempt_was_stored():
+        # As if the 429s had replaced responses lost after the events were created
+        for event_id in ("event1", "event2"):
+            store_event(state, event_id)
+        state.error_rate_429 = 0.0
+
+    before_retry(monkeypatch, first_attempt_was_stored)
+    outcomes = gcal_service.execute_batch(
+        service, [("a", insert_request(service, "event1")), ("b", insert_request(service, "event2"))]
+    )
+
+    assert outcomes == {"a": ({"id": "event1"}, None), "b": ({"id": "event2"}, None)}
+    assert len(state.calendars["primary"]["events"]) == 2
+
+
+def test_insert_conflict_on_the_first_attempt_is_an_error(fake_api):
+    service, state = fake_api
+    store_event(state, "taken")
+
+    response, error = gcal_service.execute_batch(service, [("a", insert_request(service, "taken"))])["a"]
+
+    assert response is None and "409" in error
+
+
+def test_retried_delete_of_a_missing_or_deleted_event_succeeds(fake_api, monkeypatch):
+    service, state = fake_api
+    store_event(state, "deleted")
+    store_event(state, "removed-elsewhere")
+    state.error_rate_503 = 1.0
+
+    def first_attempt_went_through():
+        # "deleted" is answered with 410 from now on, "removed-elsewhere" with 404
+        state.calendars["primary"]["events"]["deleted"]["status"] = "cancelled"
+        del state.calendars["primary"]["events"]["removed-elsewhere"]
+        state.error_rate_503 = 0.0
+
+    before_retry(monkeypatch, first_attempt_went_through)
+    outcomes = gcal_service.execute_batch(
+        service, [("gone", delete_request(service, "deleted")), ("missing", delete_request(service, "removed-elsewhere"))]
+    )
+
+    assert outcomes == {"gone": ({}, None), "missing": ({}, None)}
+
+
+def test_delete_of_a_missing_event_on_the_first_attempt_is_an_error(fake_api):
+    service, _ = fake_api
+
+    response, error = gcal_service.execute_batch(service, [("a", delete_request(service, "never-existed"))])["a"]
+
+    assert response is None and "404" in error
+
+
+def test_rate_limited_requests_back_off_then_give_up(fake_api, monkeypatch):
+    service, state = fake_api
+    state.error_rate_429 = 1.0
+    attempts = before_retry(monkeypatch)
+    requests = [(str(index), insert_request(service, f"event{index}")) for index in range(3)]
+
+    outcomes = gcal_service.execute_batch(service, requests, chunk_size=2, max_retries=2)
+
+    assert attempts == [0, 1]
+    # Each attempt sends every pending request again, in chunks of two
+    assert (state.stats["injected_429"], state.stats["batches"]) == (9, 6)
+    assert all(response is None and "429" in error for response, error in outcomes.values())
@@ -0,0 +1,55 @@
+import os
+import time
+from datetime import datetime
+
+from app.import_journal import ImportJournal
+
+MONDAY = datetime(2025, 1, 13)
+NEXT_MONDAY = datetime(2025, 1, 20)
+EVENTS = [{"week_of": "2025-01-13", "date": "2025-01-13", "course": "ENG 1P13", "type": "Lecture",
+           "time": "9:30 - 10:20", "location": "BSB 147"}]
+
+
+def open_journal(directory, max_age=3600):
+    return ImportJournal.open(str(directory), "MacID", MONDAY, NEXT_MONDAY, "primary", max_age=max_age)
+
+
+def test_a_retry_resumes_from_the_recorded_weeks_and_events(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_week(MONDAY, EVENTS)
+    journal.record_week(NEXT_MONDAY, [])
+    journal.record_created("sync-key", "event-1")
+
+    retry = open_journal(tmp_path)
+
+    assert retry.weeks == {MONDAY: EVENTS, NEXT_MONDAY: []}
+    assert retry.created == {"sync-key": "event-1"}
+
+
+def test_a_week_that_failed_to_scrape_is_not_checkpointed(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_week(MONDAY, None)
+    journal.record_week(NEXT_MONDAY, EVENTS)
+
+    assert open_journal(tmp_path).weeks == {NEXT_MONDAY: EVENTS}
+
+
+def test_a_truncated_last_record_is_ignored(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_week(MONDAY, EVENTS)
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "week", "monday": "2025-01-20", "ev')
+
+    assert open_journal(tmp_path).weeks == {MONDAY: EVENTS}
+
+
+def test_a_stale_journal_is_discarded(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_week(MONDAY, EVENTS)
+    an_hour_ago = time.time() - 3600
+    os.utime(journal.path, (an_hour_ago, an_hour_ago))
+
+    retry = open_journal(tmp_path, max_age=60)
+
+    assert retry.weeks == {}
+    assert not os.path.exists(journal.path)
@@ -0,0 +1,136 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from bs4 import BeautifulSoup
+
+import scraper
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, "fixtures")
+# Fixtures the legacy parser gets wrong (see make_fixtures.py)
+LEGACY_MISPARSED = {"first_week_sunday_lab"}
+FIXTURE_NAMES = sorted(name[:-len(".html")] for name in os.listdir(FIXTURES_DIR) if name.endswith(".html"))
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.html"), encoding="utf-8") as f:
+        page_html = f.read()
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as f:
+        golden = json.load(f)
+    return page_html, datetime.strptime(golden["week_of"], "%Y-%m-%d"), golden["events"]
+
+
+def by_date_and_time(events):
+    return sorted(events, key=lambda e: (e["date"], e["time"], e["course"], e["type"]))
+
+
+def parse_legacy(page_html, monday):
+    return scraper.parse_html_to_events(BeautifulSoup(page_html, "html.parser"), monday)
+
+
+@pytest.mark.parametrize("name", FIXTURE_NAMES)
+def test_golden_events_match_the_fixture_class_lists(name):
+    sys.path.insert(0, BENCHMARKS_DIR)
+    try:
+        import make_fixtures
+    finally:
+        sys.path.remove(BENCHMARKS_DIR)
+    _, monday, golden_events = load_fixture(name)
+    _, classes = make_fixtures.FIXTURES[name]
+
+    assert golden_events == make_fixtures.golden_events(monday, classes)
+
+
+@pytest.mark.parametrize("name", sorted(set(FIXTURE_NAMES) - LEGACY_MISPARSED))
+def test_grid_and_legacy_parsers_agree_on_portal_pages(name):
+    page_html, monday, golden_events = load_fixture(name)
+
+    grid_events = by_date_and_time(scraper.parse_schedule_html(page_html, monday))
+
+    assert grid_events == by_date_and_time(golden_events)
+    assert by_date_and_time(parse_legacy(page_html, monday)) == grid_events
+
+
+def test_grid_parser_fixes_the_first_week_misparse():
+    # A Sunday lab spanning several rows: the legacy parser carries its rowspan over
+    # into the next row's offsets and dates the later classes days late
+    page_html, monday, golden_events = load_fixture("first_week_sunday_lab")
+
+    grid_events = by_date_and_time(scraper.parse_schedule_html(page_html, monday))
+    legacy_events = by_date_and_time(parse_legacy(page_html, monday))
+
+    assert grid_events == by_date_and_time(golden_events)
+    assert legacy_events != grid_events
+    legacy_dates = {(event["course"], event["time"]): event["date"] for event in legacy_events}
+    assert legacy_dates[("MATH 1ZA3", "14:30 - 15:10")] != "2025-01-09"
+
+
+@pytest.mark.parametrize("use_lxml", [True, False])
+@pytest.mark.parametrize("rowspan", ["", "two", "0", "-3"])
+def test_malformed_spans_count_as_one_row(rowspan, use_lxml, monkeypatch):
+    if not use_lxml:
+        monkeypatch.setattr(scraper, "lxml", None)
+    table = (
+        '<table id="WEEKLY_SCHED_HTMLAREA"><tr><th>Time</th><th>Monday</th><th>Tuesday</th></tr>'
+        f'<tr><td>8:00</td><td rowspan="{rowspan}">CHEM 1E03 - C01<br />Lecture<br />8:00 - 8:40<br />TSH 120</td>'
+        '<td>&nbsp;</td></tr>'
+        '<tr><td>8:30</td><td>MATH 1ZA3 - C02<br />Lecture<br />8:30 - 9:10<br />HH 109</td><td>&nbsp;</td></tr>'
+        '</table>'
+    )
+    monday = datetime(2025, 1, 13)
+
+    assert [event["date"] for event in scraper.parse_schedule_html(table, monday)] == ["2025-01-13", "2025-01-13"]
+    assert [row[0][1:] for row in scraper._table_rows(table)] == [(1, 1), (1, 1), (1, 1)]
+
+
+def test_span_reads_attributes_like_parse_int():
+    assert [scraper._span(value) for value in (None, "3", " 2 ", "2abc", "x2", "0")] == [1, 3, 2, 2, 1, 1]
+
+
+def test_grid_parser_places_columns_by_header_where_legacy_counts_cells():
+    # Intended divergence: a table with a time label in every row (rather than one
+    # label spanning each hour's two rows). The grid parser maps columns to days from
+    # the header row; the legacy parser assumes alternating rows of 8 and 7 grid
+    # cells, so the Tuesday class in the second row is read as Wednesday's.
+    table = (
+        '<table id="WEEKLY_SCHED_HTMLAREA"><tr><th>Time</th>'
+        + "".join(f"<th>{day}</th>" for day in ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"))
+        + "</tr>"
+        + "".join(
+            '<tr><td class="PSLEVEL3GRIDODDROW">' + label + "</td>"
+            + "".join(
+                '<td class="PSLEVEL3GRIDODDROW">' + (text if day == class_day else "&nbsp;") + "</td>"
+                for day in range(7)
+            )
+            + "</tr>"
+            for label, class_day, text in (
+                ("8:00", -1, ""),
+                ("8:30", 1, "CHEM 1E03 - C01<br />Lecture<br />8:30 - 9:10<br />TSH 120"),
+            )
+        )
+        + "</table>"
+    )
+    monday = datetime(2025, 1, 13)
+
+    grid_events = scraper.parse_schedule_html(table, monday)
+    legacy_events = parse_legacy(table, monday)
+
+    assert [event["date"] for event in grid_events] == ["2025-01-14"]
+    assert [event["date"] for event in legacy_events] == ["2025-01-15"]
+
+
+def test_grid_parser_skips_events_outside_day_columns():
+    # Intended divergence: an event in the time column is dropped with a warning by
+    # the grid parser; the legacy parser dates it the Sunday before the week.
+    table = (
+        '<table id="WEEKLY_SCHED_HTMLAREA"><tr><th>Time</th><th>Monday</th></tr>'
+        '<tr><td class="PSLEVEL3GRIDODDROW">CHEM 1E03 - C01<br />Lecture<br />8:30 - 9:10<br />TSH 120</td>'
+        '<td class="PSLEVEL3GRIDODDROW">&nbsp;</td></tr></table>'
+    )
+    monday = datetime(2025, 1, 13)
+
+    assert scraper.parse_schedule_html(table, monday) == []
+    assert [event["date"] for event in parse_legacy(table, monday)] == ["2025-01-12"]
@@ -0,0 +1,62 @@
+import pytest
+
+import app.progress_store as progress_store
+from app.progress_store import MemoryProgressStore, SQLiteProgressStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def stores(request, tmp_path):
+    """Two handles on one store, as two server processes would see it."""
+    if request.param == "memory":
+        store = MemoryProgressStore(ttl=60)
+        return store, store
+    path = str(tmp_path / "progress.db")
+    return SQLiteProgressStore(path, ttl=60), SQLiteProgressStore(path, ttl=60)
+
+
+def test_one_claim_per_macid_until_released(stores):
+    first, second = stores
+
+    assert first.claim_job("macid", "session-1")
+    assert not second.claim_job("macid", "session-2")
+
+    first.release_job("macid")
+    assert second.claim_job("macid", "session-2")
+
+
+def test_cancel_reaches_the_process_running_the_import(stores):
+    running, receiving = stores
+    running.claim_job("macid", "session-1")
+
+    assert not receiving.request_cancel("other-session")
+    assert not running.is_cancel_requested("macid")
+    assert receiving.request_cancel("session-1")
+    assert running.is_cancel_requested("macid")
+
+
+def test_claims_from_a_lost_process_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(progress_store.time, "time", lambda: now[0])
+    path = str(tmp_path / "progress.db")
+    crashed, restarted = SQLiteProgressStore(path, ttl=60), SQLiteProgressStore(path, ttl=60)
+
+    assert crashed.claim_job("macid", "session-1")
+    now[0] += 61
+    assert not restarted.request_cancel("session-1")
+    assert restarted.claim_job("macid", "session-2")
+
+
+def test_refreshed_claims_outlive_the_ttl(stores, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(progress_store.time, "time", lambda: now[0])
+    running, receiving = stores
+    running.claim_job("macid", "session-1")
+
+    for _ in range(3):
+        now[0] += 45
+        running.refresh_jobs(["macid"])
+    assert not receiving.claim_job("macid", "session-2")
+    assert receiving.request_cancel("session-1")
+
+    now[0] += 61
+    assert receiving.claim_job("macid", "session-2")
@@ -0,0 +1,50 @@
+import pytest
+
+import gcal_ratelimit
+from gcal_ratelimit import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(gcal_ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_allows_a_burst_then_spaces_requests_at_the_rate(clock):
+    bucket = TokenBucket(rate=10, capacity=5)
+
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.reserve() == pytest.approx(0.1)
+    # Callers going into debt queue up behind each other
+    assert bucket.reserve(2) == pytest.approx(0.3)
+
+
+def test_bucket_refills_up_to_its_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.reserve(5)
+
+    clock[0] += 0.2
+    assert bucket.reserve(2) == 0.0
+    assert bucket.reserve() == pytest.approx(0.1)
+
+    clock[0] += 60
+    assert bucket.reserve(5) == 0.0
+    assert bucket.reserve() > 0
+
+
+def test_backoff_grows_exponentially_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(gcal_ratelimit.random, "uniform", lambda low, high: high)
+
+    assert [gcal_ratelimit.backoff_delay(attempt) for attempt in range(7)] == [1, 2, 4, 8, 16, 32, 32]
+
+
+@pytest.mark.parametrize("status, reasons, retryable", [
+    (429, (), True),
+    (503, (), True),
+    (403, {"rateLimitExceeded"}, True),
+    (403, {"forbidden"}, False),
+    (404, (), False),
+])
+def test_only_quota_and_server_errors_are_retried(status, reasons, retryable):
+    assert gcal_ratelimit.is_retryable_status(status, reasons) is retryable
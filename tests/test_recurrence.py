@@ -0,0 +1,78 @@
+import recurrence
+
+
+def lecture(date, time="9:30 - 10:20", location="BSB 147", course="ENG 1P13", event_type="Lecture"):
+    return {"week_of": date, "date": date, "course": course, "type": event_type, "time": time, "location": location}
+
+
+def test_weekly_occurrences_collapse_into_one_series():
+    events = [lecture("2025-01-06"), lecture("2025-01-13"), lecture("2025-01-20")]
+
+    grouped = recurrence.group_recurring_events(events)
+
+    assert len(grouped) == 1
+    assert grouped[0]["date"] == "2025-01-06"
+    assert grouped[0]["recurrence"] == ["RRULE:FREQ=WEEKLY;COUNT=3"]
+    assert grouped[0]["occurrences"] == 3
+
+
+def test_missing_and_excluded_weeks_become_exdates():
+    events = [lecture("2025-02-03"), lecture("2025-02-10"), lecture("2025-02-17"), lecture("2025-03-03")]
+
+    grouped = recurrence.group_recurring_events(events, excluded_dates=["2025-02-17"])
+
+    assert grouped[0]["recurrence"] == [
+        "RRULE:FREQ=WEEKLY;COUNT=5",
+        "EXDATE;TZID=America/Toronto:20250217T093000,20250224T093000",
+    ]
+    assert grouped[0]["occurrences"] == 3
+
+
+def test_biweekly_labs_use_an_interval():
+    events = [lecture(d, event_type="Laboratory") for d in ("2025-01-07", "2025-01-21", "2025-02-04")]
+
+    grouped = recurrence.group_recurring_events(events)
+
+    assert grouped[0]["recurrence"] == ["RRULE:FREQ=WEEKLY;COUNT=3;INTERVAL=2"]
+
+
+def test_single_occurrence_is_kept_as_is():
+    event = lecture("2025-01-08")
+
+    assert recurrence.group_recurring_events([event]) == [event]
+
+
+def test_malformed_events_are_passed_through_instead_of_aborting():
+    malformed = [
+        {"date": "2025-01-06", "course": "ENG 1P13", "type": "Lecture", "time": None},
+        {"date": "2025-01-06", "course": "ENG 1P13", "type": "Lecture"},
+        {"date": None, "course": "ENG 1P13", "type": "Lecture", "time": "9:30 - 10:20"},
+        {"date": "2025-01-06", "course": "ENG 1P13", "type": "Lecture", "time": "noon"},
+    ]
+    events = [lecture("2025-01-06"), lecture("2025-01-13")] + malformed
+
+    grouped = recurrence.group_recurring_events(events)
+
+    assert sum(1 for event in grouped if "recurrence" in event) == 1
+    assert all(event in grouped for event in malformed)
+
+
+def test_events_are_sorted_by_parsed_start_time():
+    events = [
+        lecture("2025-01-06", time="10:20 - 11:10", course="MATH 1ZA3"),
+        lecture("2025-01-06", time="9:30 - 10:20", course="ENG 1P13"),
+        lecture("2025-01-06", time="13:30 - 14:20", course="CHEM 1E03"),
+    ]
+
+    grouped = recurrence.group_recurring_events(events)
+
+    assert [event["course"] for event in grouped] == ["ENG 1P13", "MATH 1ZA3", "CHEM 1E03"]
+
+
+def test_failed_weeks_are_not_exdated():
+    # The week of 2025-01-13 could not be scraped, so its absence says nothing
+    events = [lecture("2025-01-06"), lecture("2025-01-20"), lecture("2025-01-27")]
+
+    grouped = recurrence.group_recurring_events(events, failed_weeks=["2025-01-13"])
+
+    assert grouped[0]["recurrence"] == ["RRULE:FREQ=WEEKLY;COUNT=4"]
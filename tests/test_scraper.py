@@ -0,0 +1,174 @@
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+import scraper
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+
+def unused_driver_session():
+    raise AssertionError("no browser should be leased for an empty range")
+
+
+def test_no_weeks_means_no_browser_or_login():
+    assert scraper.scrape_weeks_parallel("macid", "password", [], driver_session=unused_driver_session) == []
+    assert scraper.scrape_weeks_in_session("macid", "password", [], driver_session=unused_driver_session) == {}
+
+
+def log_entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}}), "level": "INFO"}
+
+
+def test_blocking_report_lists_requests_the_url_patterns_missed():
+    sys.path.insert(0, BENCHMARKS_DIR)
+    try:
+        import bench_blocking
+    finally:
+        sys.path.remove(BENCHMARKS_DIR)
+    performance_log = [
+        log_entry("Network.requestWillBeSent", requestId="1", type="Image", request={"url": "https://portal/logo.png"}),
+        log_entry("Network.loadingFailed", requestId="1", type="Image", blockedReason="inspector"),
+        log_entry("Network.requestWillBeSent", requestId="2", type="Image", request={"url": "https://portal/?cmd=photo"}),
+        log_entry("Network.loadingFinished", requestId="2", encodedDataLength=2048),
+        log_entry("Network.requestWillBeSent", requestId="3", type="Document", request={"url": "https://portal/schedule"}),
+        log_entry("Network.loadingFinished", requestId="3", encodedDataLength=4096),
+    ]
+
+    requests = bench_blocking.resource_requests(performance_log)
+
+    assert requests["1"]["blocked"] and not requests["2"]["blocked"]
+    assert bench_blocking.missed_requests(requests, ["image", "stylesheet"]) == [
+        {"type": "image", "url": "https://portal/?cmd=photo", "blocked": False, "bytes": 2048}
+    ]
+
+
+class StubDriver:
+    """A driver already on the schedule page whose scripts fail, as a crashed tab's would."""
+
+    def __init__(self):
+        self.switch_to = self
+
+    def default_content(self):
+        pass
+
+    def frame(self, reference):
+        pass
+
+    def find_element(self, by, value):
+        return object()
+
+    def execute_script(self, script, *args):
+        raise WebDriverException("javascript error: document is not defined")
+
+
+def test_http_fetcher_falls_back_when_the_browser_errors():
+    assert scraper.create_http_fetcher(StubDriver()) is None
+
+
+def test_a_failed_http_fetch_sends_the_remaining_weeks_to_the_browser(monkeypatch):
+    mondays = [datetime(2025, 1, 6), datetime(2025, 1, 13), datetime(2025, 1, 20)]
+    http_weeks, browser_weeks = [], []
+
+    class ExpiredSessionFetcher:
+        def scrape_week(self, monday, week_cache=None, cache_user=None):
+            http_weeks.append(monday)
+            return None
+
+    def scrape_week_data(driver, monday, *args):
+        browser_weeks.append(monday)
+        return []
+
+    @contextmanager
+    def driver_session():
+        yield StubDriver()
+
+    monkeypatch.setattr(scraper, "login_to_portal", lambda driver, username, password: None)
+    monkeypatch.setattr(scraper, "navigate_to_weekly_schedule", lambda driver: None)
+    monkeypatch.setattr(scraper, "create_http_fetcher", lambda driver: ExpiredSessionFetcher())
+    monkeypatch.setattr(scraper, "scrape_week_data", scrape_week_data)
+
+    results = scraper.scrape_weeks_in_session("macid", "password", mondays, fetch_mode="http",
+                                              driver_session=driver_session)
+
+    assert results == {monday: [] for monday in mondays}
+    assert http_weeks == mondays[:1]
+    assert browser_weeks == mondays
+
+
+def week_of(monday):
+    return [{"week_of": monday.strftime("%Y-%m-%d"), "date": monday.strftime("%Y-%m-%d"), "course": "ENG 1P13"}]
+
+
+def test_scrape_range_yields_weeks_in_date_order(monkeypatch):
+    failed_monday = datetime(2025, 1, 13)
+
+    def scrape_weeks_parallel(username, password, mondays, max_workers, fetch_mode, on_week_done, *args, **kwargs):
+        # Parallel sessions finish weeks in any order
+        for monday in reversed(mondays):
+            on_week_done(monday, None if monday == failed_monday else week_of(monday))
+    monkeypatch.setattr(scraper, "scrape_weeks_parallel", scrape_weeks_parallel)
+
+    weeks = list(scraper.scrape_range("macid", "password", datetime(2025, 1, 6), datetime(2025, 1, 26)))
+
+    assert weeks == [(datetime(2025, 1, 6), week_of(datetime(2025, 1, 6))), (failed_monday, None),
+                     (datetime(2025, 1, 20), week_of(datetime(2025, 1, 20)))]
+
+
+def test_closing_scrape_range_stops_the_scraper(monkeypatch):
+    reported, stopped = [], []
+    proceed = threading.Event()
+
+    def scrape_weeks_parallel(username, password, mondays, max_workers, fetch_mode, on_week_done, *args, **kwargs):
+        try:
+            for monday in mondays:
+                on_week_done(monday, week_of(monday))
+                reported.append(monday)
+                proceed.wait(5)
+        except scraper.ScrapeStopped:
+            stopped.append(True)
+            raise
+    monkeypatch.setattr(scraper, "scrape_weeks_parallel", scrape_weeks_parallel)
+
+    weeks = scraper.scrape_range("macid", "password", datetime(2025, 1, 6), datetime(2025, 4, 6))
+    assert next(weeks)[0] == datetime(2025, 1, 6)
+    # Let the scraper go on only once close() has asked it to stop
+    threading.Timer(0.1, proceed.set).start()
+    weeks.close()
+
+    assert reported == [datetime(2025, 1, 6)]
+    assert stopped == [True]
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "json"])
+def test_schedule_writer_flushes_every_week(tmp_path, output_format):
+    path = tmp_path / f"schedule.{output_format}"
+    first, second = week_of(datetime(2025, 1, 6)), week_of(datetime(2025, 1, 13))
+
+    with scraper.ScheduleWriter(str(path), output_format) as writer:
+        writer.write_week(first)
+        written = path.read_text(encoding="utf-8")
+        writer.write_week([])
+        writer.write_week(second)
+
+    assert '"ENG 1P13"' in written
+    text = path.read_text(encoding="utf-8")
+    if output_format == "jsonl":
+        assert [json.loads(line) for line in text.splitlines()] == first + second
+    else:
+        assert json.loads(text) == first + second
+    assert writer.count == 2
+
+
+def test_schedule_writer_writes_an_empty_json_array(tmp_path):
+    path = tmp_path / "schedule.json"
+    with scraper.ScheduleWriter(str(path), "json"):
+        pass
+
+    assert json.loads(path.read_text(encoding="utf-8")) == []
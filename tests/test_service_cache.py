@@ -0,0 +1,197 @@
+import threading
+
+import gcal_service
+
+
+class ValidCredentials:
+    valid = True
+    expiry = None
+
+
+def build_request(builder):
+    return builder(None, None, "https://www.googleapis.com/calendar/v3/users/me/calendarList")
+
+
+def test_requests_reuse_their_threads_connection():
+    builder = gcal_service._request_builder()
+    first, second = build_request(builder), build_request(builder)
+    other_thread = []
+    worker = threading.Thread(target=lambda: other_thread.append(build_request(builder)))
+    worker.start()
+    worker.join()
+
+    assert first.http is second.http
+    assert other_thread[0].http is not first.http
+
+
+def test_oauth_flow_runs_without_holding_the_service_cache_lock(monkeypatch):
+    flow_started = threading.Event()
+    finish_flow = threading.Event()
+    creds = ValidCredentials()
+    loads = []
+
+    def load_credentials():
+        loads.append(threading.current_thread())
+        flow_started.set()
+        finish_flow.wait(5)
+        return creds
+
+    monkeypatch.setattr(gcal_service, "API_ROOT", None)
+    monkeypatch.setattr(gcal_service, "_load_credentials", load_credentials)
+    monkeypatch.setattr(gcal_service, "build", lambda *args, **kwargs: "service")
+    monkeypatch.setattr(gcal_service, "_service_cache", dict(gcal_service._service_cache, service=None))
+
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(gcal_service.get_calendar_service())) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    assert flow_started.wait(5)
+    assert gcal_service._service_cache_lock.acquire(timeout=1)
+    gcal_service._service_cache_lock.release()
+
+    finish_flow.set()
+    for waiter in waiters:
+        waiter.join(5)
+    assert results == ["service", "service"]
+    assert len(loads) == 1
+    assert gcal_service._service_cache["creds"] is creds
+
+
+class FakeService:
+    """Stands in for a built service: googleapiclient keeps the authorized Http on _http."""
+
+    def __init__(self, refresh_token, access_token="access"):
+        credentials = type("Creds", (), {"refresh_token": refresh_token, "client_id": "client", "token": access_token})()
+        self._http = type("Http", (), {"credentials": credentials})()
+
+
+def test_calendar_cache_survives_token_refresh_and_drops_expired_accounts(monkeypatch):
+    listings = []
+
+    def list_calendars(service):
+        listings.append(service)
+        return [{"id": service._http.credentials.refresh_token}]
+
+    now = [1000.0]
+    monkeypatch.setattr(gcal_service, "API_ROOT", None)
+    monkeypatch.setattr(gcal_service, "list_calendars", list_calendars)
+    monkeypatch.setattr(gcal_service.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(gcal_service, "_calendar_cache", {})
+
+    first_account = FakeService("refresh-a", access_token="before")
+    assert gcal_service.get_cached_calendars(first_account, ttl=60) == [{"id": "refresh-a"}]
+    refreshed = FakeService("refresh-a", access_token="after")
+    assert gcal_service.get_cached_calendars(refreshed, ttl=60) == [{"id": "refresh-a"}]
+    assert listings == [first_account]
+
+    now[0] += 120
+    assert gcal_service.get_cached_calendars(FakeService("refresh-b"), ttl=60) == [{"id": "refresh-b"}]
+    assert list(gcal_service._calendar_cache) == [gcal_service._calendar_cache_key(FakeService("refresh-b"))]
+
+
+class ExpiringCredentials:
+    """Credentials still valid but inside the refresh margin; refresh() blocks until released."""
+
+    valid = True
+    refresh_token = "refresh"
+
+    def __init__(self):
+        self.expiry = gcal_service.datetime.datetime.now(gcal_service.datetime.timezone.utc).replace(tzinfo=None)
+        self.refresh_started = threading.Event()
+        self.finish_refresh = threading.Event()
+
+    def refresh(self, request):
+        self.refresh_started.set()
+        self.finish_refresh.wait(5)
+        self.expiry += gcal_service.datetime.timedelta(hours=1)
+
+
+def test_token_refresh_runs_without_holding_the_service_cache_lock(monkeypatch):
+    creds = ExpiringCredentials()
+    monkeypatch.setattr(gcal_service, "API_ROOT", None)
+    monkeypatch.setattr(gcal_service, "_save_credentials", lambda creds: None)
+    monkeypatch.setattr(gcal_service, "_token_mtime", lambda: 1.0)
+    monkeypatch.setattr(gcal_service, "_service_cache",
+                        {"service": "service", "creds": creds, "token_mtime": 1.0, "api_root": None})
+
+    refresher = threading.Thread(target=gcal_service.get_calendar_service)
+    refresher.start()
+    assert creds.refresh_started.wait(5)
+
+    assert gcal_service._service_cache_lock.acquire(timeout=1)
+    gcal_service._service_cache_lock.release()
+    # The token has not expired yet, so other callers do not wait for the refresh
+    assert gcal_service.get_calendar_service() == "service"
+
+    creds.finish_refresh.set()
+    refresher.join(5)
+    assert not gcal_service._expires_soon(creds)
+
+
+def token_paths(tmp_path, count):
+    """Token files that fall on different load locks."""
+    paths, stripes = [], set()
+    for index in range(100):
+        path = tmp_path / f"token{index}.json"
+        stripe = hash(str(path)) % len(gcal_service._token_load_locks)
+        if stripe not in stripes:
+            path.write_text("{}")
+            paths.append(str(path))
+            stripes.add(stripe)
+        if len(paths) == count:
+            return paths
+    raise AssertionError("could not find token paths on different locks")
+
+
+def test_slow_token_refresh_blocks_neither_other_accounts_nor_the_app(tmp_path, monkeypatch):
+    slow_path, fast_path = token_paths(tmp_path, 2)
+    slow_creds = ExpiringCredentials()
+    slow_creds.to_json = lambda: "{}"
+    monkeypatch.setattr(gcal_service, "API_ROOT", None)
+    monkeypatch.setattr(gcal_service.Credentials, "from_authorized_user_file",
+                        lambda path, scopes: slow_creds if path == slow_path else ValidCredentials())
+    monkeypatch.setattr(gcal_service, "build", lambda *args, **kwargs: kwargs["credentials"])
+    monkeypatch.setattr(gcal_service, "_token_services", gcal_service.OrderedDict())
+
+    slow = threading.Thread(target=gcal_service.get_calendar_service_for_token, args=(slow_path,))
+    slow.start()
+    assert slow_creds.refresh_started.wait(5)
+
+    assert gcal_service._service_cache_lock.acquire(timeout=1)
+    gcal_service._service_cache_lock.release()
+    assert isinstance(gcal_service.get_calendar_service_for_token(fast_path), ValidCredentials)
+
+    slow_creds.finish_refresh.set()
+    slow.join(5)
+    assert gcal_service._token_services[slow_path][1] is slow_creds
+
+
+def test_token_services_keep_only_the_most_recently_used(tmp_path, monkeypatch):
+    paths = token_paths(tmp_path, 3)
+    monkeypatch.setattr(gcal_service, "API_ROOT", None)
+    monkeypatch.setattr(gcal_service, "TOKEN_SERVICE_CACHE_SIZE", 2)
+    monkeypatch.setattr(gcal_service.Credentials, "from_authorized_user_file", lambda path, scopes: ValidCredentials())
+    monkeypatch.setattr(gcal_service, "build", lambda *args, **kwargs: object())
+    monkeypatch.setattr(gcal_service, "_token_services", gcal_service.OrderedDict())
+
+    first = gcal_service.get_calendar_service_for_token(paths[0])
+    gcal_service.get_calendar_service_for_token(paths[1])
+    assert gcal_service.get_calendar_service_for_token(paths[0]) is first
+    gcal_service.get_calendar_service_for_token(paths[2])
+
+    assert list(gcal_service._token_services) == [paths[0], paths[2]]
+
+
+def test_rejected_token_is_refreshed_only_if_still_current(monkeypatch):
+    creds = ExpiringCredentials()
+    creds.token = "rejected"
+    creds.finish_refresh.set()
+    monkeypatch.setattr(gcal_service, "_save_credentials", lambda creds: None)
+    monkeypatch.setattr(gcal_service, "get_credentials", lambda: creds)
+
+    assert gcal_service.refresh_credentials("rejected") is creds
+    assert creds.refresh_started.is_set()
+
+    creds.refresh_started.clear()
+    assert gcal_service.refresh_credentials("rejected-by-another-request") is creds
+    assert not creds.refresh_started.is_set()
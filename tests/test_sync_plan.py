@@ -0,0 +1,171 @@
+import gcal_service
+
+
+def scraped(date, time="9:30 - 10:20", location="BSB 147", course="ENG 1P13", event_type="Lecture", recurrence=None):
+    event = {"week_of": date, "date": date, "course": course, "type": event_type, "time": time, "location": location}
+    if recurrence:
+        event["recurrence"] = recurrence
+    return event
+
+
+def term_series_data():
+    """A lecture synced as one series for the whole twelve-week term."""
+    return scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;COUNT=12"])
+
+
+def existing(event_data, event_id, content_hash=None):
+    """A calendar event as list_synced_events returns it, created from event_data by an earlier sync."""
+    body = gcal_service.build_sync_event_body(event_data)
+    if content_hash is not None:
+        body["extendedProperties"]["private"][gcal_service.SYNC_HASH_PROPERTY] = content_hash
+    return {**body, "id": event_id}
+
+
+def test_new_changed_unchanged_and_removed_events():
+    kept = scraped("2025-01-06")
+    moved = scraped("2025-01-07", course="MATH 1ZA3")
+    removed = scraped("2025-01-08", course="CHEM 1E03")
+    added = scraped("2025-01-09", course="PHYS 1D03")
+    calendar = [existing(kept, "kept"), existing(moved, "moved", content_hash="stale"), existing(removed, "removed")]
+
+    plan = gcal_service.compute_sync_plan([kept, moved, added], calendar, "2025-01-06", "2025-01-12")
+
+    assert [event for event, _ in plan["insert"]] == [added]
+    assert [event_id for event_id, _, _ in plan["update"]] == ["moved"]
+    assert plan["delete"] == ["removed"]
+    assert plan["unchanged"] == 1
+
+
+def test_resync_of_the_same_schedule_is_a_no_op():
+    events = [scraped("2025-01-06"), scraped("2025-01-08", course="MATH 1ZA3")]
+    calendar = [existing(event, f"id{index}") for index, event in enumerate(events)]
+
+    plan = gcal_service.compute_sync_plan(events, calendar, "2025-01-06", "2025-01-12")
+
+    assert (plan["insert"], plan["update"], plan["delete"], plan["unchanged"]) == ([], [], [], 2)
+
+
+def test_events_outside_the_range_are_not_deleted():
+    calendar = [existing(scraped("2025-02-03"), "february")]
+
+    plan = gcal_service.compute_sync_plan([], calendar, "2025-01-06", "2025-01-12")
+
+    assert plan["delete"] == []
+
+
+def test_duplicate_copies_are_deleted():
+    event = scraped("2025-01-06")
+    calendar = [existing(event, "first"), existing(event, "second")]
+
+    plan = gcal_service.compute_sync_plan([event], calendar, "2025-01-06", "2025-01-12")
+
+    assert plan["delete"] == ["second"]
+    assert plan["unchanged"] == 1
+
+
+def test_events_in_a_failed_week_are_not_deleted():
+    # Week of 2025-01-13 failed to scrape: its classes are missing from the scrape but not gone
+    week_one = scraped("2025-01-06")
+    calendar = [existing(week_one, "week-one"), existing(scraped("2025-01-13"), "week-two")]
+
+    plan = gcal_service.compute_sync_plan([week_one], calendar, "2025-01-06", "2025-01-19",
+                                          failed_weeks=["2025-01-13"])
+
+    assert plan["delete"] == []
+    assert plan["unchanged"] == 2
+
+
+def test_series_with_an_occurrence_in_a_failed_week_is_not_changed():
+    series = existing(scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;COUNT=3"]), "series")
+    # Only the first week scraped; without the failed-week signal this would shrink the series to one week
+    rescraped = scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;COUNT=1"])
+
+    plan = gcal_service.compute_sync_plan([rescraped], [series], "2025-01-06", "2025-01-26",
+                                          failed_weeks=["2025-01-13", "2025-01-20"])
+
+    assert plan["update"] == []
+    assert plan["delete"] == []
+    assert plan["unchanged"] == 1
+
+
+def test_series_missing_from_scrape_is_kept_if_it_meets_in_a_failed_week():
+    series = existing(scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;COUNT=3"]), "series")
+
+    plan = gcal_service.compute_sync_plan([], [series], "2025-01-06", "2025-01-26", failed_weeks=["2025-01-20"])
+
+    assert plan["delete"] == []
+
+
+def test_failed_week_elsewhere_does_not_block_changes():
+    removed = existing(scraped("2025-01-06"), "removed")
+
+    plan = gcal_service.compute_sync_plan([], [removed], "2025-01-06", "2025-01-26", failed_weeks=["2025-01-20"])
+
+    assert plan["delete"] == ["removed"]
+
+
+def test_invalid_events_are_reported():
+    broken = {"date": "2025-01-06", "time": None, "course": "ENG 1P13", "type": "Lecture"}
+
+    plan = gcal_service.compute_sync_plan([broken], [], "2025-01-06", "2025-01-12")
+
+    assert plan["invalid"] == [broken]
+
+
+def test_sub_range_sync_does_not_shrink_a_term_long_series():
+    term_series = existing(term_series_data(), "term")
+    # Syncing just February scrapes the same class as a four-week series with the same sync key
+    february = scraped("2025-02-03", recurrence=["RRULE:FREQ=WEEKLY;COUNT=4"])
+    assert gcal_service.event_sync_key(february) == gcal_service.event_sync_key(term_series_data())
+
+    plan = gcal_service.compute_sync_plan([february], [term_series], "2025-02-03", "2025-03-02")
+
+    assert plan["update"] == []
+    assert plan["insert"] == []
+    assert plan["unchanged"] == 1
+
+
+def test_sub_range_sync_does_not_delete_a_series_that_continues_past_the_range():
+    term_series = existing(term_series_data(), "term")
+
+    plan = gcal_service.compute_sync_plan([], [term_series], "2025-01-06", "2025-01-19")
+
+    assert plan["delete"] == []
+
+
+def test_series_inside_the_range_is_still_updated_and_deleted():
+    series = existing(scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;COUNT=3"]), "series")
+    moved = scraped("2025-01-06", location="JHE 376", recurrence=["RRULE:FREQ=WEEKLY;COUNT=3"])
+
+    updated = gcal_service.compute_sync_plan([moved], [series], "2025-01-06", "2025-01-26")
+    deleted = gcal_service.compute_sync_plan([], [series], "2025-01-06", "2025-01-26")
+
+    assert [event_id for event_id, _, _ in updated["update"]] == ["series"]
+    assert deleted["delete"] == ["series"]
+
+
+def test_biweekly_series_span_follows_its_interval():
+    # COUNT=3 every other week ends on 2025-02-03, after a range ending 2025-01-26
+    series = existing(scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;COUNT=3;INTERVAL=2"]), "biweekly")
+
+    plan = gcal_service.compute_sync_plan([], [series], "2025-01-06", "2025-01-26")
+
+    assert plan["delete"] == []
+
+
+def test_single_week_sync_does_not_duplicate_a_series_occurrence():
+    calendar = [existing(term_series_data(), "series")]
+
+    plan = gcal_service.compute_sync_plan([scraped("2025-01-20")], calendar, "2025-01-20", "2025-01-26")
+
+    assert (plan["insert"], plan["update"], plan["delete"], plan["unchanged"]) == ([], [], [], 1)
+
+
+def test_single_event_off_the_series_schedule_is_inserted():
+    biweekly = scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=6"])
+    excluded = scraped("2025-01-06", recurrence=["RRULE:FREQ=WEEKLY;COUNT=12", "EXDATE:20250120T093000"])
+    for series_data in (biweekly, excluded):
+        plan = gcal_service.compute_sync_plan([scraped("2025-01-20" if series_data is excluded else "2025-01-13")],
+                                              [existing(series_data, "series")], "2025-01-13", "2025-01-26")
+
+        assert len(plan["insert"]) == 1
@@ -0,0 +1,205 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import app.progress_store as progress_store
+import gcal_service
+from app import task_manager
+from app.progress_store import MemoryProgressStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryProgressStore(ttl=60)
+    monkeypatch.setattr(progress_store, "_store", store)
+    return store
+
+
+class BlockingTask(task_manager.ImportTask):
+    """An import whose run() waits to be released, checking for cancellation like a real one."""
+
+    def __init__(self, macid, session_id=None):
+        super().__init__(None, session_id or f"session-{macid}", macid, "password",
+                         datetime(2025, 1, 6), datetime(2025, 1, 12), "primary")
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def run(self):
+        self.started.set()
+        while not self.release.wait(0.02):
+            self.check_cancelled()
+        self.update_progress("Done.", 100, "complete")
+
+
+def wait_for_status(session_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        progress = task_manager.get_task_progress(session_id)
+        if progress["status"] == status:
+            return progress
+        time.sleep(0.02)
+    raise AssertionError(f"{session_id} never reached {status}: {task_manager.get_task_progress(session_id)}")
+
+
+def wait_for_release(scheduler, task, timeout=5):
+    """Waits for the worker to let go of the task, which it does just after reporting the outcome."""
+    deadline = time.monotonic() + timeout
+    while task.dedup_key in scheduler._in_flight:
+        assert time.monotonic() < deadline, f"{task.session_id} was never released"
+        time.sleep(0.02)
+
+
+def test_submissions_beyond_the_queue_are_turned_away(store):
+    scheduler = task_manager.ImportScheduler(workers=1, queue_size=1)
+    running, queued, rejected = BlockingTask("first"), BlockingTask("second"), BlockingTask("third")
+
+    assert scheduler.submit(running) == "queued"
+    assert running.started.wait(5)
+    assert scheduler.submit(queued) == "queued"
+    assert task_manager.get_task_progress(queued.session_id)["queue_position"] == 1
+    assert scheduler.submit(rejected) == "queue_full"
+
+    running.release.set()
+    queued.release.set()
+    wait_for_status(queued.session_id, "complete")
+    assert store.claim_job(rejected.dedup_key, rejected.session_id)
+
+
+def test_one_import_per_macid_across_processes(store):
+    scheduler, other_process = task_manager.ImportScheduler(workers=1), task_manager.ImportScheduler(workers=1)
+    task = BlockingTask("Student1")
+
+    assert scheduler.submit(task) == "queued"
+    assert scheduler.submit(BlockingTask(" student1 ", "session-again")) == "duplicate"
+    assert other_process.submit(BlockingTask("student1", "session-elsewhere")) == "duplicate"
+
+    task.release.set()
+    wait_for_status(task.session_id, "complete")
+    wait_for_release(scheduler, task)
+    retry = BlockingTask("student1", "session-retry")
+    assert scheduler.submit(retry) == "queued"
+    retry.release.set()
+    wait_for_status(retry.session_id, "complete")
+
+
+def test_cancel_drops_a_queued_import_and_stops_a_running_one(store):
+    scheduler = task_manager.ImportScheduler(workers=1)
+    running, queued = BlockingTask("first"), BlockingTask("second")
+    scheduler.submit(running)
+    assert running.started.wait(5)
+    scheduler.submit(queued)
+
+    assert scheduler.cancel(queued.session_id)
+    assert task_manager.get_task_progress(queued.session_id)["status"] == "cancelled"
+    assert scheduler.cancel(running.session_id)
+    wait_for_status(running.session_id, "cancelled")
+    wait_for_release(scheduler, running)
+
+    assert not queued.started.is_set()
+    assert not scheduler.cancel("unknown-session")
+    assert store.claim_job(running.dedup_key, "new-session")
+    assert store.claim_job(queued.dedup_key, "new-session")
+
+
+def test_cancel_reaches_an_import_running_in_another_process(store):
+    scheduler, other_process = task_manager.ImportScheduler(workers=1), task_manager.ImportScheduler(workers=1)
+    task = BlockingTask("student1")
+    scheduler.submit(task)
+    assert task.started.wait(5)
+
+    assert other_process.cancel(task.session_id)
+    wait_for_status(task.session_id, "cancelled")
+
+
+def week_events(monday):
+    return [{"week_of": monday.strftime("%Y-%m-%d"), "date": (monday + timedelta(days=day)).strftime("%Y-%m-%d"),
+             "course": "ENG 1P13", "type": "Lecture", "time": "9:30 - 10:20", "location": "BSB 147"}
+            for day in range(2)]
+
+
+def calendar_dates(state):
+    return sorted(event["start"]["dateTime"][:10] for event in state.calendars["primary"]["events"].values()
+                  if event["status"] != "cancelled")
+
+
+@pytest.fixture
+def pipeline_app(store, fake_gcal, monkeypatch):
+    """A pipelined sync import against the fake Calendar API; returns (app, fake API state)."""
+    state, api_root = fake_gcal()
+    monkeypatch.setattr(gcal_service, "API_ROOT", api_root)
+    monkeypatch.setattr(task_manager, "get_driver_pool", lambda: SimpleNamespace(lease=None))
+    app = Flask(__name__)
+    app.config.update(IMPORT_MODE="sync", PIPELINE_IMPORTS=True, COLLAPSE_RECURRING_EVENTS=False,
+                      GCAL_PUBLISHER="batch", TOKEN_FILE="token.json")
+    return app, state
+
+
+def pipelined_task(app, end_date=datetime(2025, 1, 26)):
+    return task_manager.ImportTask(app, "session", "macid", "password", datetime(2025, 1, 6), end_date, "primary")
+
+
+def test_weeks_are_published_while_later_weeks_are_scraped(pipeline_app, monkeypatch):
+    app, state = pipeline_app
+    failed_monday = datetime(2025, 1, 13)
+    # Left alone because its week fails to scrape
+    kept = gcal_service.build_sync_event_body(week_events(failed_monday)[0])
+    state.calendars["primary"]["events"]["kept"] = {**kept, "id": "kept", "status": "confirmed"}
+
+    def scrape_weeks_parallel(macid, password, mondays, on_week_done=None, **kwargs):
+        for monday in mondays:
+            on_week_done(monday, None if monday == failed_monday else week_events(monday))
+            if monday != failed_monday:
+                # Would time out if publishing waited for the whole range to be scraped
+                deadline = time.monotonic() + 5
+                while monday.strftime("%Y-%m-%d") not in calendar_dates(state):
+                    assert time.monotonic() < deadline, f"week of {monday} was not published while scraping"
+                    time.sleep(0.02)
+    monkeypatch.setattr(task_manager.scraper, "scrape_weeks_parallel", scrape_weeks_parallel)
+
+    task = pipelined_task(app)
+    task.run()
+
+    progress = task_manager.get_task_progress(task.session_id)
+    assert progress["status"] == "complete_with_warnings", progress
+    assert "2025-01-13" in progress["message"]
+    assert calendar_dates(state) == ["2025-01-06", "2025-01-07", "2025-01-13", "2025-01-20", "2025-01-21"]
+
+
+def test_cancelling_stops_the_scraper_and_keeps_published_weeks(pipeline_app, monkeypatch):
+    app, state = pipeline_app
+    task = pipelined_task(app)
+    scraped = []
+
+    def scrape_weeks_parallel(macid, password, mondays, on_week_done=None, **kwargs):
+        for monday in mondays:
+            if monday == mondays[1]:
+                task.cancel_requested.set()
+            scraped.append(monday)
+            # Raises ImportCancelled once the cancel is seen, like the real scraper's callback
+            on_week_done(monday, week_events(monday))
+    monkeypatch.setattr(task_manager.scraper, "scrape_weeks_parallel", scrape_weeks_parallel)
+
+    task.run()
+
+    assert task_manager.get_task_progress(task.session_id)["status"] == "cancelled"
+    assert scraped == [datetime(2025, 1, 6), datetime(2025, 1, 13)]
+    assert set(calendar_dates(state)) <= {"2025-01-06", "2025-01-07"}
+
+
+def test_scraper_errors_end_the_pipeline(pipeline_app, monkeypatch):
+    app, _ = pipeline_app
+
+    def scrape_weeks_parallel(macid, password, mondays, on_week_done=None, **kwargs):
+        on_week_done(mondays[0], week_events(mondays[0]))
+        raise RuntimeError("portal went away")
+    monkeypatch.setattr(task_manager.scraper, "scrape_weeks_parallel", scrape_weeks_parallel)
+
+    task = pipelined_task(app)
+    task.run()
+
+    progress = task_manager.get_task_progress(task.session_id)
+    assert (progress["status"], progress["message"]) == ("error", "Error during scraping: portal went away")
@@ -0,0 +1,74 @@
+import os
+from datetime import datetime
+
+import scraper
+import week_cache
+from week_cache import WeekCache
+
+MONDAY = datetime(2025, 1, 13)
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+def clock(monkeypatch, start=1_000_000.0):
+    now = [start]
+    monkeypatch.setattr(week_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_expire_by_stored_time_however_often_they_are_read(tmp_path, monkeypatch):
+    now = clock(monkeypatch)
+    cache = WeekCache(str(tmp_path), ttl=100)
+    cache.put("macid", MONDAY, "grid", [{"course": "ENG 1P13"}])
+
+    for _ in range(3):
+        now[0] += 40
+        cache.get("macid", MONDAY, "grid")
+    assert cache.get("macid", MONDAY, "grid") is None
+
+    cache.evict()
+    assert os.listdir(tmp_path) == []
+
+
+def test_least_recently_read_entries_are_evicted_first(tmp_path, monkeypatch):
+    now = clock(monkeypatch)
+    cache = WeekCache(str(tmp_path), ttl=1000, max_entries=2)
+    users = ["first", "second", "third"]
+    for user in users:
+        now[0] += 1
+        cache.put(user, MONDAY, "grid", [])
+    now[0] += 1
+    cache.get("first", MONDAY, "grid")
+
+    cache.evict()
+
+    assert [cache.get(user, MONDAY, "grid") is not None for user in users] == [True, False, True]
+
+
+def test_publish_markers_survive_only_an_unchanged_grid(tmp_path):
+    cache = WeekCache(str(tmp_path))
+    cache.put("macid", MONDAY, "grid", [])
+    cache.mark_synced("macid", MONDAY, "primary")
+    assert cache.is_synced("macid", MONDAY, "primary")
+    assert not cache.is_synced("macid", MONDAY, "other-calendar")
+
+    cache.put("macid", MONDAY, "grid", [])
+    assert cache.is_synced("macid", MONDAY, "primary")
+    cache.put("macid", MONDAY, "changed-grid", [])
+    assert not cache.is_synced("macid", MONDAY, "primary")
+
+
+def test_page_html_and_script_cells_share_a_cache_entry(tmp_path, monkeypatch):
+    with open(os.path.join(FIXTURES_DIR, "multi_hour_labs.html"), encoding="utf-8") as f:
+        page_html = f.read()
+    cache = WeekCache(str(tmp_path))
+    events = scraper.parse_schedule_html(page_html, MONDAY, cache, "macid")
+
+    # The script returns JSON lists where the HTML parser builds tuples
+    cells = [list(cell) for cell in scraper.schedule_grid_cells(scraper.extract_schedule_table_html(page_html))]
+
+    def rebuild(*args):
+        raise AssertionError("the week should come from the cache")
+
+    monkeypatch.setattr(scraper, "events_from_grid_cells", rebuild)
+    assert events and scraper.parse_schedule_cells(cells, MONDAY, cache, "macid") == events
+    assert len(os.listdir(tmp_path)) == 1
@@ -0,0 +1,137 @@
+"""
+On-disk cache of scraped weeks, keyed by user and Monday.
+
+Each entry holds a hash of the week's schedule grid (the cells of the schedule
+table, however they were read) and the events parsed from it, so a re-scrape
+that finds an identical grid skips turning it into events. Entries also remember
+which grid hash was last published to each calendar target, so an import can
+skip syncing weeks that have not changed since.
+
+Entries expire `ttl` seconds after they were stored; beyond `max_entries` the
+least recently read are evicted. A file's mtime is its stored time and its atime
+the last read, so eviction needs no more than a stat per entry.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+# Run eviction after this many writes rather than on every one
+EVICT_EVERY = 50
+
+
+def hash_grid_cells(cells):
+    """
+    Hashes (text, row, column, rowspan) grid cells, as built by scraper.schedule_grid_cells
+    or returned by SCHEDULE_CELLS_SCRIPT, so both ways of reading a week share a cache entry.
+    """
+    normalized = [[" ".join(text.split()), row, column, rowspan] for text, row, column, rowspan in cells]
+    return hashlib.sha256(json.dumps(normalized, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class WeekCache:
+    """A directory of JSON files, one per (user, week)."""
+
+    def __init__(self, directory, ttl=7 * 24 * 3600, max_entries=500):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, user, monday):
+        # Hash the MacID so it does not appear in file names
+        raw = f"{user.strip().lower()}|{monday.strftime('%Y-%m-%d')}"
+        return os.path.join(self.directory, hashlib.sha1(raw.encode("utf-8")).hexdigest() + ".json")
+
+    def _read(self, user, monday):
+        path = self._path(user, monday)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("stored_at", 0) > self.ttl or "grid_hash" not in entry:
+            return None
+        return entry
+
+    def _write(self, user, monday, entry):
+        # Write to a temporary file and rename so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        # The mtime carries the stored time, so evict() expires entries by the same clock as _read()
+        os.utime(temp_path, (entry["stored_at"], entry["stored_at"]))
+        os.replace(temp_path, self._path(user, monday))
+        with self._lock:
+            self._writes += 1
+            evict_now = self._writes % EVICT_EVERY == 0
+        if evict_now:
+            self.evict()
+
+    def get(self, user, monday, grid_hash):
+        """Returns the cached events if the week's grid still hashes to grid_hash, else None."""
+        entry = self._read(user, monday)
+        if entry is None or entry["grid_hash"] != grid_hash:
+            return None
+        try:
+            # The access time drives LRU eviction; the mtime stays the stored time
+            os.utime(self._path(user, monday), (time.time(), entry["stored_at"]))
+        except OSError:
+            pass
+        return entry["events"]
+
+    def put(self, user, monday, grid_hash, events):
+        """Stores a freshly parsed week; publish markers survive only if the grid is unchanged."""
+        previous = self._read(user, monday) or {}
+        synced = previous.get("synced", {}) if previous.get("grid_hash") == grid_hash else {}
+        self._write(user, monday, {
+            "monday": monday.strftime("%Y-%m-%d"),
+            "grid_hash": grid_hash,
+            "events": events,
+            "stored_at": time.time(),
+            "synced": synced,
+        })
+
+    def is_synced(self, user, monday, target):
+        """Whether the week's current grid was already published to target (e.g. a calendar id)."""
+        entry = self._read(user, monday)
+        return bool(entry) and entry.get("synced", {}).get(target) == entry["grid_hash"]
+
+    def mark_synced(self, user, monday, target):
+        entry = self._read(user, monday)
+        if entry is None:
+            return
+        entry.setdefault("synced", {})[target] = entry["grid_hash"]
+        self._write(user, monday, entry)
+
+    def evict(self):
+        """Removes expired entries, then the least recently read beyond max_entries."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                self._remove(path)
+            else:
+                entries.append((max(stat.st_atime, stat.st_mtime), path))
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logging.warning(f"Could not evict week cache entry {path}: {e}")